@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Producto, Venta, Categoria # Importar Categoria
+from .models import Producto, Venta, VentaArchivada, Categoria, MovimientoStock, Tarea # Importar Categoria
 from django.utils.html import format_html 
+from .busqueda import filtrar_productos
+from .movimientos import guardar_producto, registrar_movimiento
 
 print(">>> ADMIN INVENTARIO CARGADO")
 
@@ -28,16 +30,28 @@ class ProductoAdmin(admin.ModelAdmin):
         'precio', 
         'stock', 
         'variacion', 
+        'codigo_barras',
         'imagen', 
         'imagen_preview'
     )
     
     # Filtrar productos por Categoría
     list_filter = ('categoria',)
+    list_select_related = ('categoria',)
     search_fields = ('nombre', 'variacion', 'categoria__nombre')
     
     readonly_fields = ('imagen_preview',)
 
+    # La búsqueda usa el índice FTS (sin tildes, por prefijo) en lugar de icontains con JOIN
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return filtrar_productos(queryset, search_term), False
+
+    # El stock editado entra al libro como ajuste relativo
+    def save_model(self, request, obj, form, change):
+        guardar_producto(obj, form.initial.get('stock') if change else None)
+
     # Método para mostrar la vista previa de la imagen
     def imagen_preview(self, obj):
         if obj.imagen:
@@ -47,15 +61,85 @@ class ProductoAdmin(admin.ModelAdmin):
     imagen_preview.short_description = 'Vista Previa'
 
 # -----------------------------------------------------------------
-# Admin para el modelo Venta (Actualizado)
+# Admin para el modelo Venta: solo consulta. Las ventas se registran en
+# la caja (inventario.ventas), que descuenta el stock, anota el libro y
+# suma al resumen diario; una venta creada o editada aquí no haría nada de eso
 # -----------------------------------------------------------------
 class VentaAdmin(admin.ModelAdmin):
     list_display = ('producto', 'cantidad', 'precio_unitario', 'total_venta', 'fecha_venta')
     # CAMBIO: 'producto__tipo' por 'producto__categoria'
     list_filter = ('fecha_venta', 'producto__categoria')
+    # El producto (y su categoría, que usa Producto.__str__) en la misma consulta del listado
+    list_select_related = ('producto__categoria',)
     search_fields = ('producto__nombre',)
     ordering = ('-fecha_venta',)
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# -----------------------------------------------------------------
+# Ventas archivadas (manage.py archivar_ventas): solo consulta
+# -----------------------------------------------------------------
+@admin.register(VentaArchivada)
+class VentaArchivadaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'producto', 'cantidad', 'precio_unitario', 'total_venta', 'fecha_venta')
+    date_hierarchy = 'fecha_venta'
+    list_select_related = ('producto__categoria',)
+    search_fields = ('producto__nombre',)
+    ordering = ('-fecha_venta', '-id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# -----------------------------------------------------------------
+# Libro de movimientos de stock: solo se agregan filas
+# -----------------------------------------------------------------
+@admin.register(MovimientoStock)
+class MovimientoStockAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'producto', 'tipo', 'cantidad', 'nota')
+    list_filter = ('tipo',)
+    list_select_related = ('producto__categoria',)
+    raw_id_fields = ('producto', 'venta')
+    fields = ('producto', 'tipo', 'cantidad', 'nota')
+    ordering = ('-id',)
+
+    # Los existentes se ven en solo lectura; un error se corrige con otro movimiento
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        # Recepciones, ajustes y devoluciones cargados a mano también mueven el stock
+        registrar_movimiento(obj.producto_id, obj.tipo, obj.cantidad, obj.nota)
+
+# -----------------------------------------------------------------
+# Tareas en segundo plano: consulta del estado, errores y reintentos
+# -----------------------------------------------------------------
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'progreso', 'intentos', 'usuario', 'creada', 'terminada')
+    list_filter = ('estado', 'tipo')
+    list_select_related = ('usuario',)
+    readonly_fields = [campo.name for campo in Tarea._meta.fields]
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
 # -----------------------------------------------------------------
 # Registro de Modelos - Se mantiene el patrón de registro
 # -----------------------------------------------------------------
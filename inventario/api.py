@@ -0,0 +1,141 @@
+"""
+API JSON de solo lectura del catálogo (v1), pensada para la tienda en línea
+y las pantallas de quiosco que consultan el catálogo cada pocos segundos.
+
+- Paginación por cursor sobre `id` (?despues=<cursor>&limite=N) y columnas
+  proyectadas con .values(): no se instancian modelos.
+- Respuestas condicionales: el ETag (fuerte) y Last-Modified salen de la
+  versión del catálogo (inventario.version_catalogo). Si el cliente manda
+  If-None-Match / If-Modified-Since y nada cambió, se responde 304 con una
+  sola lectura por clave primaria, sin consultar la tabla de productos.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .models import Categoria, Producto
+from .paginacion import decodificar_cursor, paginar_keyset
+from .routers import lectura_en_replica
+from .version_catalogo import obtener_estado
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+CAMPOS_PRODUCTO = ('id', 'nombre', 'variacion', 'precio', 'stock', 'categoria_id', 'categoria__nombre', 'imagen')
+CAMPOS_CATEGORIA = ('id', 'nombre', 'descripcion')
+CAMPOS_STOCK = ('id', 'stock')
+
+
+# =======================================================
+# --- RESPUESTAS CONDICIONALES ---
+# =======================================================
+
+def _estado(request):
+    # ETag y Last-Modified se calculan por separado: la fila se lee una sola vez
+    if not hasattr(request, '_estado_catalogo'):
+        request._estado_catalogo = obtener_estado()
+    return request._estado_catalogo
+
+
+def _etag(request, *args, **kwargs):
+    version, _ = _estado(request)
+    # Cada URL (con sus parámetros) es una representación distinta
+    huella = hashlib.sha1(request.get_full_path().encode('utf-8')).hexdigest()[:16]
+    return f'"v{version}-{huella}"'
+
+
+def _ultima_modificacion(request, *args, **kwargs):
+    return _estado(request)[1]
+
+
+def endpoint_catalogo(vista):
+    """ GET/HEAD condicional con ETag y Last-Modified del catálogo, revalidando siempre, leído de la réplica. """
+    # La versión y los datos salen de la misma base (réplica, salvo lectura propia)
+    condicional = require_safe(lectura_en_replica(
+        condition(etag_func=_etag, last_modified_func=_ultima_modificacion)(vista)
+    ))
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        respuesta = condicional(request, *args, **kwargs)
+        # Se puede guardar, pero hay que preguntar antes de reutilizar (un 304 es barato)
+        patch_cache_control(respuesta, public=True, no_cache=True)
+        return respuesta
+    return envoltura
+
+
+# =======================================================
+# --- SERIALIZACIÓN ---
+# =======================================================
+
+def _limite(request):
+    try:
+        limite = int(request.GET.get('limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        limite = LIMITE_POR_DEFECTO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def _producto(fila):
+    return {
+        'id': fila['id'],
+        'nombre': fila['nombre'],
+        'variacion': fila['variacion'],
+        'precio': int(fila['precio']),
+        'stock': fila['stock'],
+        'categoria': {'id': fila['categoria_id'], 'nombre': fila['categoria__nombre']} if fila['categoria_id'] else None,
+        'imagen': default_storage.url(fila['imagen']) if fila['imagen'] else None,
+    }
+
+
+def _listado(request, queryset, serializar):
+    despues = request.GET.get('despues')
+    # El catálogo HTML vuelve a la primera página; un cliente de la API debe enterarse del error
+    if despues and decodificar_cursor(despues, queryset.model, ('id',)) is None:
+        return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+    pagina = paginar_keyset(queryset, ('id',), despues=despues, tamano=_limite(request))
+    version, _ = _estado(request)
+    return JsonResponse({
+        'version': version,
+        'resultados': [serializar(fila) for fila in pagina],
+        'siguiente': pagina.siguiente,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+# =======================================================
+# --- ENDPOINTS ---
+# =======================================================
+
+@endpoint_catalogo
+def productos_api(request):
+    """ Productos por id ascendente. Filtros: ?categoria=<id>, ?disponibles=1 (stock > 0). """
+    productos = Producto.objects.values(*CAMPOS_PRODUCTO)
+    categoria_id = request.GET.get('categoria', '')
+    if categoria_id.isdigit():
+        productos = productos.filter(categoria_id=int(categoria_id))
+    if request.GET.get('disponibles') == '1':
+        productos = productos.filter(stock__gt=0)
+    return _listado(request, productos, _producto)
+
+
+@endpoint_catalogo
+def producto_detalle_api(request, pk):
+    fila = Producto.objects.filter(pk=pk).values(*CAMPOS_PRODUCTO).first()
+    if fila is None:
+        raise Http404("Producto no encontrado.")
+    return JsonResponse(_producto(fila), json_dumps_params={'ensure_ascii': False})
+
+
+@endpoint_catalogo
+def categorias_api(request):
+    return _listado(request, Categoria.objects.values(*CAMPOS_CATEGORIA), dict)
+
+
+@endpoint_catalogo
+def stock_api(request):
+    """ Solo id y stock: lo mínimo para que un quiosco refresque disponibilidad. """
+    return _listado(request, Producto.objects.values(*CAMPOS_STOCK), dict)
@@ -5,6 +5,16 @@ class InventarioConfig(AppConfig):
     name = 'inventario'
     verbose_name = 'Módulo de Inventario' 
 
+    def ready(self):
+        # Registra los receptores de señales (invalidación de caché, etc.)
+        from . import signals  # noqa: F401
+        # Registra los tipos de tarea en segundo plano (inventario.tareas)
+        from . import trabajos  # noqa: F401
+        # Conecta el publicador de eventos del dashboard a la invalidación de KPIs
+        from . import eventos  # noqa: F401
+        # Instala la medición de consultas en cada conexión nueva (inventario.metricas)
+        from . import metricas  # noqa: F401
+
 
 
 INSTALLED_APPS = [
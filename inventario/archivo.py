@@ -0,0 +1,165 @@
+"""
+Archivo de ventas: los meses cerrados salen de Venta y pasan a VentaArchivada.
+
+Venta guarda solo los meses recientes (VENTAS_MESES_ACTIVOS, por defecto 12),
+así el admin, el historial y cualquier consulta del día a día trabajan sobre
+un conjunto acotado. `manage.py archivar_ventas` mueve el resto mes a mes, en
+lotes: cada lote copia y borra en la misma transacción (INSERT ... SELECT y
+DELETE sobre el rango (fecha, id) del índice), así un corte a mitad de camino
+no pierde ni duplica ventas.
+
+Las ventas archivadas conservan su id, de modo que los movimientos de stock
+siguen apuntando a ellas. Los totales del resumen diario (VentaDiaria) no
+cambian al archivar; las lecturas que listan ventas sueltas usan
+ventas_en_rango() para recorrer ambas tablas.
+"""
+import heapq
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Venta, VentaArchivada
+
+COLUMNAS = [campo.column for campo in Venta._meta.concrete_fields]
+
+
+def meses_activos():
+    return getattr(settings, 'VENTAS_MESES_ACTIVOS', 12)
+
+
+def _primer_dia(fecha, meses_atras=0):
+    indice = fecha.year * 12 + fecha.month - 1 - meses_atras
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def fecha_corte(meses=None, hoy=None):
+    """ Primer día del mes más antiguo que sigue en Venta (lo anterior se archiva). """
+    meses = meses_activos() if meses is None else meses
+    return _primer_dia(hoy or date.today(), meses - 1)
+
+
+# =======================================================
+# --- ARCHIVADO ---
+# =======================================================
+
+def _mover_lote(desde, hasta, lote):
+    """ Mueve hasta `lote` ventas con fecha en [desde, hasta). Devuelve cuántas movió. """
+    with transaction.atomic():
+        ultima = (
+            Venta.objects.filter(fecha_venta__gte=desde, fecha_venta__lt=hasta)
+            .order_by('fecha_venta', 'id')
+            .values_list('fecha_venta', 'id')[lote - 1:lote]
+            .first()
+        )
+        if ultima is None:
+            # Quedan menos de `lote`: el último lote del mes llega hasta el final del rango
+            condicion, parametros = 'fecha_venta >= %s AND fecha_venta < %s', [desde, hasta]
+        else:
+            condicion = 'fecha_venta >= %s AND (fecha_venta < %s OR (fecha_venta = %s AND id <= %s))'
+            parametros = [desde, ultima[0], ultima[0], ultima[1]]
+
+        columnas = ', '.join(connection.ops.quote_name(columna) for columna in COLUMNAS)
+        origen = connection.ops.quote_name(Venta._meta.db_table)
+        destino = connection.ops.quote_name(VentaArchivada._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {destino} ({columnas}) SELECT {columnas} FROM {origen} WHERE {condicion}', parametros
+            )
+            cursor.execute(f'DELETE FROM {origen} WHERE {condicion}', parametros)
+            return cursor.rowcount
+
+
+def archivar_ventas(antes_de=None, lote=5000, progreso=None):
+    """
+    Archiva las ventas anteriores a `antes_de` (por defecto, fecha_corte()),
+    del mes más antiguo al más reciente y en lotes de `lote` filas.
+    `progreso(mes, movidas)` se llama al terminar cada mes. Devuelve el total.
+    """
+    antes_de = antes_de or fecha_corte()
+    primera = Venta.objects.filter(fecha_venta__lt=antes_de).order_by('fecha_venta', 'id').values_list(
+        'fecha_venta', flat=True
+    ).first()
+    total = 0
+    mes = _primer_dia(primera) if primera else antes_de
+    while mes < antes_de:
+        siguiente = min(_primer_dia(mes, -1), antes_de)
+        movidas = 0
+        while True:
+            movidas_lote = _mover_lote(mes, siguiente, lote)
+            movidas += movidas_lote
+            if movidas_lote < lote:
+                break
+        if movidas and progreso:
+            progreso(mes, movidas)
+        total += movidas
+        mes = siguiente
+    return total
+
+
+# =======================================================
+# --- LECTURA ---
+# =======================================================
+
+def ventas_en_rango(desde=None, hasta=None):
+    """
+    Querysets (activas, archivadas) limitados al rango de fechas (extremos
+    incluidos). Con el índice (fecha_venta, id) de cada tabla, la que no tiene
+    ventas en el rango se descarta sin recorrerla.
+    """
+    partes = []
+    for modelo in (Venta, VentaArchivada):
+        ventas = modelo.objects.all()
+        if desde:
+            ventas = ventas.filter(fecha_venta__gte=desde)
+        if hasta:
+            ventas = ventas.filter(fecha_venta__lte=hasta)
+        partes.append(ventas)
+    return tuple(partes)
+
+
+ENCABEZADOS_VENTAS = ['Fecha', 'Producto', 'Variación', 'Categoría', 'Cantidad', 'Precio Unitario', 'Total']
+
+
+def _por_bloques(filas, tamano=2000):
+    """
+    Recorre filas (fecha_venta, id, ...) en bloques por cursor (fecha, id). Cada
+    bloque es una consulta completa: entre bloques no queda ninguna lectura
+    abierta en SQLite, que de otro modo retendría el WAL todo el recorrido e
+    impediría escribir por la misma conexión (p. ej. el progreso de una tarea).
+    """
+    ultima = None
+    while True:
+        bloque = filas
+        if ultima is not None:
+            bloque = filas.filter(Q(fecha_venta__gt=ultima[0]) | Q(fecha_venta=ultima[0], id__gt=ultima[1]))
+        bloque = list(bloque[:tamano])
+        yield from bloque
+        if len(bloque) < tamano:
+            return
+        ultima = bloque[-1]
+
+
+def filas_ventas(desde=None, hasta=None, alias='default'):
+    """
+    Filas de la exportación de ventas (activas y archivadas), por (fecha, id),
+    leídas por bloques: la memoria no crece con el rango.
+    """
+    partes = [
+        _por_bloques(ventas.using(alias).order_by('fecha_venta', 'id').values_list(
+            'fecha_venta', 'id', 'producto__nombre', 'producto__variacion',
+            'producto__categoria__nombre', 'cantidad', 'precio_unitario',
+        ))
+        for ventas in ventas_en_rango(desde, hasta)
+    ]
+    for fecha, _, nombre, variacion, categoria, cantidad, precio in recorrer_en_orden(partes, lambda fila: fila[:2]):
+        yield fecha, nombre, variacion, categoria or 'Sin Clase', cantidad, precio, cantidad * precio
+
+
+def recorrer_en_orden(iterables, clave):
+    """
+    Mezcla iterables ya ordenados por `clave` en un único recorrido ordenado,
+    sin cargarlos en memoria (para exportaciones que cruzan el archivo).
+    """
+    return heapq.merge(*iterables, key=clave)
@@ -0,0 +1,181 @@
+"""
+Banco de carga reproducible para las vistas principales.
+
+Varios hilos (clientes concurrentes), cada uno con su propio django.test.Client
+y su propia conexión a la base de datos, recorren los escenarios durante un
+tiempo fijo. Se mide la latencia de cada petición dentro del proceso (vista,
+middleware, plantillas y base de datos; sin red ni servidor WSGI) y se informa
+p50/p95/p99 y rendimiento por escenario, para comparar cambios sobre el mismo
+volumen de datos (ver `manage.py poblar_datos`).
+"""
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.test import Client
+from django.urls import reverse
+
+from .models import Categoria, Producto
+
+# Escenarios de solo lectura; 'venta' escribe (registra ventas reales) y se pide aparte
+ESCENARIOS_LECTURA = ('catalogo', 'catalogo_categoria', 'busqueda', 'dashboard', 'reporte', 'api_stock')
+ESCENARIOS = ESCENARIOS_LECTURA + ('venta',)
+
+USUARIO_BENCHMARK = 'benchmark'
+
+TERMINOS_BUSQUEDA = ('pañal', 'huggies etapa', 'toallitas', 'crema', 'formula', 'body', 'chupo avent')
+
+
+def percentil(ordenados, p):
+    """ Percentil por rango más cercano sobre una lista ya ordenada. """
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+class Datos:
+    """ Ids de muestra que usan los escenarios (se leen una sola vez antes de medir). """
+
+    def __init__(self, semilla):
+        azar = random.Random(semilla)
+        ids = list(Producto.objects.filter(stock__gt=100).values_list('id', flat=True)[:5000])
+        self.productos_con_stock = ids or list(Producto.objects.filter(stock__gt=0).values_list('id', flat=True)[:5000])
+        self.categorias = list(Categoria.objects.values_list('id', flat=True))
+        azar.shuffle(self.productos_con_stock)
+
+
+def _peticion(escenario, cliente, datos, azar):
+    """ Ejecuta una petición del escenario y devuelve el código de estado. """
+    if escenario == 'catalogo':
+        respuesta = cliente.get(reverse('pagina_compra'))
+    elif escenario == 'catalogo_categoria':
+        respuesta = cliente.get(reverse('pagina_compra'), {'categoria': azar.choice(datos.categorias or [0])})
+    elif escenario == 'busqueda':
+        respuesta = cliente.get(reverse('pagina_compra'), {'q': azar.choice(TERMINOS_BUSQUEDA)})
+    elif escenario == 'dashboard':
+        respuesta = cliente.get(reverse('dashboard'))
+    elif escenario == 'reporte':
+        hasta = date.today() - timedelta(days=azar.randrange(0, 300))
+        respuesta = cliente.get(reverse('reporte_ventas'), {
+            'desde': (hasta - timedelta(days=30)).isoformat(), 'hasta': hasta.isoformat(),
+        })
+    elif escenario == 'api_stock':
+        respuesta = cliente.get(reverse('api_stock'), {'limite': 500})
+    elif escenario == 'venta':
+        producto_id = azar.choice(datos.productos_con_stock)
+        respuesta = cliente.post(reverse('venta_rapida', args=[producto_id]))
+    else:
+        raise ValueError(f"Escenario desconocido: {escenario}")
+    if respuesta.streaming:
+        b''.join(respuesta.streaming_content)
+    return respuesta.status_code
+
+
+def _cliente(usuario):
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente
+
+
+def ejecutar(escenarios, clientes=8, duracion=20.0, calentamiento=2, semilla=42):
+    """
+    Corre los escenarios con `clientes` hilos durante `duracion` segundos
+    (repartiéndolos por turnos) y devuelve el resultado por escenario.
+    """
+    for escenario in escenarios:
+        if escenario not in ESCENARIOS:
+            raise ValueError(f"Escenario desconocido: {escenario}")
+
+    usuario, _ = get_user_model().objects.get_or_create(
+        username=USUARIO_BENCHMARK, defaults={'is_staff': True},
+    )
+    datos = Datos(semilla)
+
+    # Calentamiento: cachés, plantillas compiladas y primeras conexiones fuera de la medición
+    cliente = _cliente(usuario)
+    azar = random.Random(semilla)
+    for escenario in escenarios:
+        for _ in range(calentamiento):
+            _peticion(escenario, cliente, datos, azar)
+
+    muestras = {escenario: [] for escenario in escenarios}
+    errores = {escenario: 0 for escenario in escenarios}
+    candado = threading.Lock()
+    fin = time.perf_counter() + duracion
+
+    def trabajar(numero):
+        azar = random.Random(semilla + numero)
+        cliente = _cliente(usuario)
+        propias = {escenario: [] for escenario in escenarios}
+        fallidas = {escenario: 0 for escenario in escenarios}
+        turno = numero
+        try:
+            while time.perf_counter() < fin:
+                escenario = escenarios[turno % len(escenarios)]
+                turno += 1
+                inicio = time.perf_counter()
+                try:
+                    estado = _peticion(escenario, cliente, datos, azar)
+                except Exception:
+                    estado = 500
+                propias[escenario].append(time.perf_counter() - inicio)
+                if estado >= 400:
+                    fallidas[escenario] += 1
+        finally:
+            close_old_connections()
+            with candado:
+                for escenario in escenarios:
+                    muestras[escenario].extend(propias[escenario])
+                    errores[escenario] += fallidas[escenario]
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=trabajar, args=(numero,), name=f'benchmark-{numero}') for numero in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - inicio
+
+    resultado = {}
+    for escenario in escenarios:
+        latencias = sorted(muestras[escenario])
+        resultado[escenario] = {
+            'peticiones': len(latencias),
+            'errores': errores[escenario],
+            'rps': round(len(latencias) / transcurrido, 1),
+            'p50_ms': round(percentil(latencias, 50) * 1000, 1),
+            'p95_ms': round(percentil(latencias, 95) * 1000, 1),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 1),
+            'max_ms': round(latencias[-1] * 1000, 1) if latencias else 0.0,
+        }
+    total = sum(fila['peticiones'] for fila in resultado.values())
+    return {
+        'clientes': clientes,
+        'duracion_s': round(transcurrido, 1),
+        'rps_total': round(total / transcurrido, 1),
+        'escenarios': resultado,
+    }
+
+
+def comparar(actual, base):
+    """ Diferencia porcentual de p50/p95/p99 y rps frente a un resultado guardado. """
+    cambios = {}
+    for escenario, fila in actual['escenarios'].items():
+        previa = base.get('escenarios', {}).get(escenario)
+        if not previa:
+            continue
+        cambios[escenario] = {
+            clave: round((fila[clave] - previa[clave]) / previa[clave] * 100, 1) if previa[clave] else None
+            for clave in ('p50_ms', 'p95_ms', 'p99_ms', 'rps')
+        }
+    return cambios
+
+
+def cargar(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
@@ -0,0 +1,198 @@
+"""
+Búsqueda de productos sobre el índice FTS5 `inventario_producto_fts`.
+
+El índice (nombre, variación y nombre de la categoría) lo mantienen al día
+triggers de SQLite, así que cubre también las escrituras masivas. Los crea
+la migración 0007. SQLite reconstruye la tabla en muchas migraciones (p. ej.
+al agregar un campo) y sus triggers se pierden: toda migración que
+reconstruya inventario_producto o inventario_categoria los quita antes y
+los vuelve a crear después, con su propia copia del SQL (las migraciones no
+importan este módulo; cambiar aquí un trigger exige una migración nueva
+que lo reemplace). El tokenizador quita tildes y eñes ("panal" encuentra
+"Pañal") y cada palabra buscada se trata como prefijo ("pan huggi" encuentra
+"Pañales Huggies"). Los resultados se ordenan por relevancia (bm25), con más
+peso para el nombre que para la variación o la categoría.
+
+En otros motores, o si la tabla FTS no existe, se cae a `icontains`.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLA_FTS = 'inventario_producto_fts'
+
+# Pesos bm25 de las columnas (nombre, variacion, categoria)
+PESOS = (10.0, 3.0, 1.0)
+
+# Tope de resultados rankeados (catálogo y dashboard)
+LIMITE_RESULTADOS = 100
+
+_disponible = {}
+
+SQL_TABLA = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        nombre, variacion, categoria, categoria_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+# Ningún trigger menciona inventario_producto en su cuerpo: SQLite lo revalidaría
+# al renombrar la tabla durante una migración y la migración fallaría.
+TRIGGERS = {
+    'inventario_producto_fts_insert': f"""
+        CREATE TRIGGER inventario_producto_fts_insert AFTER INSERT ON inventario_producto BEGIN
+            INSERT INTO {TABLA_FTS}(rowid, nombre, variacion, categoria, categoria_id)
+            VALUES (
+                new.id, new.nombre, new.variacion,
+                COALESCE((SELECT nombre FROM inventario_categoria WHERE id = new.categoria_id), ''),
+                new.categoria_id
+            );
+        END
+    """,
+    'inventario_producto_fts_delete': f"""
+        CREATE TRIGGER inventario_producto_fts_delete AFTER DELETE ON inventario_producto BEGIN
+            DELETE FROM {TABLA_FTS} WHERE rowid = old.id;
+        END
+    """,
+    # Solo columnas indexadas: los descuentos de stock de cada venta no tocan el índice
+    'inventario_producto_fts_update': f"""
+        CREATE TRIGGER inventario_producto_fts_update
+        AFTER UPDATE OF nombre, variacion, categoria_id ON inventario_producto BEGIN
+            UPDATE {TABLA_FTS} SET
+                nombre = new.nombre,
+                variacion = new.variacion,
+                categoria = COALESCE((SELECT nombre FROM inventario_categoria WHERE id = new.categoria_id), ''),
+                categoria_id = new.categoria_id
+            WHERE rowid = new.id;
+        END
+    """,
+    'inventario_categoria_fts_update': f"""
+        CREATE TRIGGER inventario_categoria_fts_update AFTER UPDATE OF nombre ON inventario_categoria BEGIN
+            UPDATE {TABLA_FTS} SET categoria = new.nombre WHERE categoria_id = new.id;
+        END
+    """,
+}
+
+
+SQL_LLENAR = (
+    f"INSERT INTO {TABLA_FTS}(rowid, nombre, variacion, categoria, categoria_id) "
+    "SELECT p.id, p.nombre, p.variacion, COALESCE(c.nombre, ''), p.categoria_id "
+    "FROM inventario_producto p LEFT JOIN inventario_categoria c ON c.id = p.categoria_id"
+)
+
+
+# =======================================================
+# --- CONSULTAS ---
+# =======================================================
+
+def indice_disponible():
+    """ True si la base de datos actual tiene el índice FTS5 (solo SQLite). """
+    alias = connection.alias
+    if alias not in _disponible:
+        _disponible[alias] = (
+            connection.vendor == 'sqlite'
+            and TABLA_FTS in connection.introspection.table_names(include_views=True)
+        )
+    return _disponible[alias]
+
+
+def consulta_fts(texto):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra
+    entre comillas (sin operadores ni sintaxis especial) y como prefijo.
+    Devuelve '' si no hay nada que buscar.
+    """
+    palabras = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{palabra}"*' for palabra in palabras[:10])
+
+
+def _filtro_icontains(texto):
+    filtro = Q()
+    for palabra in re.findall(r'\w+', texto or ''):
+        filtro &= (
+            Q(nombre__icontains=palabra)
+            | Q(variacion__icontains=palabra)
+            | Q(categoria__nombre__icontains=palabra)
+        )
+    return filtro
+
+
+def filtrar_productos(queryset, texto):
+    """
+    Restringe un queryset de Producto a los que coinciden con `texto`, sin
+    cambiar su orden ni traer ids a Python (subconsulta sobre el índice).
+    """
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return queryset
+    if not indice_disponible():
+        return queryset.filter(_filtro_icontains(texto))
+    return queryset.filter(pk__in=RawSQL(
+        f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", (consulta,)
+    ))
+
+
+def buscar_productos(queryset, texto, limite=LIMITE_RESULTADOS):
+    """
+    Productos de `queryset` que coinciden con `texto`, ordenados por relevancia
+    (hasta `limite`). Sin índice FTS se filtra con icontains y se ordena por nombre.
+    """
+    if not consulta_fts(texto):
+        return queryset.none()
+    if not indice_disponible():
+        return queryset.filter(_filtro_icontains(texto)).order_by('nombre', 'id')[:limite]
+
+    # El filtro de `queryset` (p. ej. categoría o stock > 0) va en la misma
+    # consulta que el MATCH: el tope se aplica después de filtrar, no antes
+    consulta = consulta_fts(texto)
+    relevancia = RawSQL(
+        f"SELECT bm25({TABLA_FTS}, %s, %s, %s) FROM {TABLA_FTS} "
+        f"WHERE {TABLA_FTS} MATCH %s AND rowid = \"{queryset.model._meta.db_table}\".\"id\"",
+        (*PESOS, consulta),
+    )
+    return filtrar_productos(queryset, texto).order_by(relevancia.asc(), 'id')[:limite]
+
+
+# =======================================================
+# --- MANTENIMIENTO ---
+# =======================================================
+
+def asegurar_indice(using=DEFAULT_DB_ALIAS):
+    """
+    Crea la tabla FTS y los triggers que falten (idempotente), p. ej. en una
+    base restaurada sin ellos. Si faltaba alguno, el índice pudo quedar
+    desfasado y se reconstruye. Devuelve True si tuvo que reparar algo.
+    """
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return False
+    tablas = conexion.introspection.table_names(include_views=True)
+    if 'inventario_producto' not in tablas or 'inventario_categoria' not in tablas:
+        return False
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        faltantes = [nombre for nombre in TRIGGERS if nombre not in existentes]
+        if TABLA_FTS in tablas and not faltantes:
+            return False
+        cursor.execute(SQL_TABLA)
+        for nombre in faltantes:
+            cursor.execute(TRIGGERS[nombre])
+    _disponible.pop(using, None)
+    reconstruir_indice(using)
+    return True
+
+
+def reconstruir_indice(using=DEFAULT_DB_ALIAS):
+    """ Vuelve a llenar el índice desde las tablas (p. ej. tras restaurar un respaldo). """
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return 0
+    with conexion.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        cursor.execute(SQL_LLENAR)
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {TABLA_FTS}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,187 @@
+"""
+Caché HTTP y compresión para servir en producción.
+
+- CompresionMiddleware: GZip solo de las respuestas de texto (HTML, JSON,
+  CSV...). No comprime imágenes ni descargas binarias: ya vienen comprimidas
+  y, con Range, el tamaño debe ser el del archivo. Tampoco comprime el flujo
+  SSE del dashboard, porque gzip retendría los eventos en su búfer.
+- Catálogo público: su ETag (débil) sale de la versión del catálogo
+  (inventario.version_catalogo), de la URL y del usuario. Un navegador o un
+  CDN que revalida recibe 304 tras una lectura por clave primaria, sin
+  consultar productos. Para anónimos: `public, max-age=CATALOGO_MAX_AGE`;
+  con sesión: `private, no-cache`; Vary: Cookie separa ambas versiones.
+- servir_media: archivos de MEDIA_ROOT con ETag, Last-Modified y Range de
+  una franja. Según MEDIA_ENTREGA, los bytes los envía el proxy
+  (X-Accel-Redirect de nginx, X-Sendfile de Apache/lighttpd). Solo los
+  nombres con huella de contenido (las variantes de inventario.imagenes) se
+  guardan un año como inmutables: su URL nunca cambia de contenido. El resto
+  (originales subidos, que pueden reemplazarse con el mismo nombre) se guarda
+  pero se revalida con un 304 barato.
+"""
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .imagenes import LARGO_HUELLA
+
+# Tipos que vale la pena comprimir (text/event-stream queda fuera a propósito)
+TIPOS_COMPRIMIBLES = {
+    'text/html', 'text/plain', 'text/csv', 'text/css', 'text/javascript',
+    'application/json', 'application/javascript', 'image/svg+xml',
+}
+
+# Un año: el máximo que respetan navegadores y CDN
+MEDIA_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# '...-mini.<huella>.webp': nombre con huella de contenido (ver imagenes.ruta_variante)
+NOMBRE_CON_HUELLA = re.compile(r'\.[0-9a-f]{%d}\.[a-z0-9]+$' % LARGO_HUELLA)
+
+
+class CompresionMiddleware(GZipMiddleware):
+    """ GZipMiddleware limitado a TIPOS_COMPRIMIBLES. """
+
+    def process_response(self, request, response):
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo not in TIPOS_COMPRIMIBLES:
+            return response
+        return super().process_response(request, response)
+
+
+# =======================================================
+# --- CATÁLOGO PÚBLICO ---
+# =======================================================
+
+def etag_catalogo(request, version):
+    """ ETag de una página del catálogo; incluye al usuario porque la cabecera muestra su nombre. """
+    huella = hashlib.sha1(f'{request.get_full_path()}|{request.user.pk or 0}'.encode('utf-8')).hexdigest()[:16]
+    return f'W/"c{version}-{huella}"'
+
+
+def politica_catalogo(request, respuesta, etag):
+    """ ETag, Cache-Control y Vary de una respuesta del catálogo (también de un 304). """
+    respuesta['ETag'] = etag
+    if request.user.is_authenticated:
+        patch_cache_control(respuesta, private=True, no_cache=True)
+    else:
+        patch_cache_control(respuesta, public=True, max_age=getattr(settings, 'CATALOGO_MAX_AGE', 60))
+    patch_vary_headers(respuesta, ('Cookie',))
+    return respuesta
+
+
+def no_modificado(request, etag):
+    """ HttpResponseNotModified si el cliente ya tiene esta versión (If-None-Match), o None. """
+    return get_conditional_response(request, etag=etag)
+
+
+# =======================================================
+# --- ARCHIVOS MEDIA ---
+# =======================================================
+
+def _franja(request, tamano, etag, modificado):
+    """
+    (inicio, fin) pedidos en la cabecera Range, o None para responder el
+    archivo entero (sin Range, varias franjas o un If-Range que ya no
+    coincide). ValueError si la franja cae fuera del archivo.
+    """
+    coincidencia = RANGO.match(request.META.get('HTTP_RANGE', '').strip())
+    if not coincidencia or tamano == 0:
+        return None
+    si_rango = request.META.get('HTTP_IF_RANGE')
+    if si_rango and si_rango not in (etag, http_date(modificado)):
+        return None
+
+    desde, hasta = coincidencia.groups()
+    if desde:
+        inicio, fin = int(desde), min(int(hasta), tamano - 1) if hasta else tamano - 1
+    elif hasta:
+        # bytes=-N: los últimos N bytes
+        inicio, fin = max(tamano - int(hasta), 0), tamano - 1
+        if int(hasta) == 0:
+            raise ValueError(request.META['HTTP_RANGE'])
+    else:
+        return None
+    if inicio >= tamano or inicio > fin:
+        raise ValueError(request.META['HTTP_RANGE'])
+    return inicio, fin
+
+
+def _leer(archivo, restante, bloque=FileResponse.block_size):
+    with archivo:
+        while restante > 0:
+            datos = archivo.read(min(bloque, restante))
+            if not datos:
+                return
+            restante -= len(datos)
+            yield datos
+
+
+def _respuesta_archivo(request, ruta, tamano, tipo, etag, modificado):
+    try:
+        franja = _franja(request, tamano, etag, modificado)
+    except ValueError:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{tamano}'
+        return respuesta
+    if franja is None:
+        return FileResponse(open(ruta, 'rb'), content_type=tipo)
+
+    inicio, fin = franja
+    archivo = open(ruta, 'rb')
+    archivo.seek(inicio)
+    respuesta = StreamingHttpResponse(_leer(archivo, fin - inicio + 1), status=206, content_type=tipo)
+    respuesta['Content-Length'] = fin - inicio + 1
+    respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    return respuesta
+
+
+@require_safe
+def servir_media(request, ruta):
+    """ Un archivo de MEDIA_ROOT con respuestas condicionales, Range y caché según su nombre. """
+    try:
+        completa = Path(safe_join(settings.MEDIA_ROOT, ruta))
+    except SuspiciousFileOperation:
+        raise Http404("Archivo no encontrado.")
+    if not completa.is_file():
+        raise Http404("Archivo no encontrado.")
+
+    estado = completa.stat()
+    etag = f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+    modificado = int(estado.st_mtime)
+    tipo = mimetypes.guess_type(completa.name)[0] or 'application/octet-stream'
+
+    respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if respuesta is None:
+        entrega = getattr(settings, 'MEDIA_ENTREGA', 'django')
+        if entrega == 'x-accel':
+            # nginx sirve los bytes (con Range) desde su location interna
+            respuesta = HttpResponse(content_type=tipo)
+            respuesta['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIJO', '/media-interna/') + quote(ruta)
+        elif entrega == 'x-sendfile':
+            respuesta = HttpResponse(content_type=tipo)
+            respuesta['X-Sendfile'] = str(completa)
+        else:
+            respuesta = _respuesta_archivo(request, completa, estado.st_size, tipo, etag, modificado)
+            if respuesta.status_code == 416:
+                return respuesta
+
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(modificado)
+    respuesta['Accept-Ranges'] = 'bytes'
+    if NOMBRE_CON_HUELLA.search(ruta):
+        patch_cache_control(respuesta, public=True, max_age=MEDIA_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(respuesta, public=True, no_cache=True)
+    return respuesta
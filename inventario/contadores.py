@@ -0,0 +1,176 @@
+"""
+Contadores desnormalizados por categoría: productos, productos con stock,
+unidades y valor del stock (stock * precio).
+
+La lista de categorías, los KPIs del dashboard y el reporte de valoración
+leen estas columnas de Categoria en lugar de agrupar toda la tabla de
+productos. Se mantienen con deltas, en la misma transacción de cada cambio:
+
+- altas, ediciones y bajas de productos (señales pre/post_save y post_delete),
+- movimientos de stock (inventario.movimientos.aplicar_movimientos),
+- ventas (inventario.ventas) e importaciones (inventario.importacion).
+
+Como con las señales de siempre, el código que escribe con UPDATE o
+bulk_create debe avisar por su cuenta. `manage.py verificar_contadores`
+compara con un recálculo completo y, con --reparar, corrige las diferencias.
+Los productos sin categoría no tienen fila donde contarse: se calculan al
+vuelo con el índice de categoría (son pocos).
+"""
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Categoria, Producto
+
+CAMPOS = Categoria.CONTADORES
+
+
+# =======================================================
+# --- DELTAS ---
+# =======================================================
+
+def sumar_producto(deltas, categoria_id, stock, precio, signo=1):
+    """ Acumula en `deltas` lo que un producto aporta (signo=1) o deja de aportar (signo=-1). """
+    if categoria_id is None:
+        return
+    actual = deltas.setdefault(categoria_id, [0, 0, 0, 0])
+    for posicion, valor in enumerate((1, 1 if stock > 0 else 0, stock, stock * precio)):
+        actual[posicion] += signo * valor
+
+
+def cambiar_producto(deltas, antes, despues):
+    """ Acumula el paso de un producto de `antes` a `despues`: tuplas (categoria_id, stock, precio) o None. """
+    if antes is not None:
+        sumar_producto(deltas, *antes, signo=-1)
+    if despues is not None:
+        sumar_producto(deltas, *despues)
+
+
+def aplicar_deltas(deltas):
+    """
+    Suma los deltas acumulados a las categorías con un único UPDATE relativo
+    (CASE por categoría). Debe llamarse dentro de la transacción del cambio.
+    """
+    deltas = {pk: valores for pk, valores in deltas.items() if any(valores)}
+    if not deltas:
+        return 0
+
+    def incremento(posicion, salida):
+        return F(CAMPOS[posicion]) + Case(
+            *[When(pk=pk, then=Value(valores[posicion])) for pk, valores in deltas.items()],
+            default=Value(0),
+            output_field=salida,
+        )
+
+    return Categoria.objects.filter(pk__in=list(deltas)).update(
+        productos_total=incremento(0, IntegerField()),
+        productos_con_stock=incremento(1, IntegerField()),
+        unidades_stock=incremento(2, IntegerField()),
+        valor_stock=incremento(3, DecimalField(max_digits=16, decimal_places=0)),
+    )
+
+
+# =======================================================
+# --- RECÁLCULO, VERIFICACIÓN Y REPARACIÓN ---
+# =======================================================
+
+def _agregados(productos):
+    return productos.aggregate(
+        productos_total=Count('id'),
+        productos_con_stock=Count('id', filter=Q(stock__gt=0)),
+        unidades_stock=Coalesce(Sum('stock'), 0),
+        valor_stock=Coalesce(Sum(F('stock') * F('precio'), output_field=DecimalField()), 0, output_field=DecimalField()),
+    )
+
+
+def contadores_reales():
+    """ {categoria_id: (productos, con stock, unidades, valor)} recalculado desde Producto. """
+    filas = Producto.objects.filter(categoria__isnull=False).values('categoria_id').annotate(
+        total=Count('id'),
+        con_stock=Count('id', filter=Q(stock__gt=0)),
+        unidades=Sum('stock'),
+        valor=Sum(F('stock') * F('precio'), output_field=DecimalField()),
+    ).order_by()
+    return {
+        fila['categoria_id']: (fila['total'], fila['con_stock'], fila['unidades'], fila['valor'])
+        for fila in filas
+    }
+
+
+def diferencias_contadores():
+    """ Categorías cuyos contadores no coinciden con sus productos: [(categoria, guardado, real)]. """
+    reales = contadores_reales()
+    diferencias = []
+    for categoria in Categoria.objects.order_by('id').only('id', 'nombre', *CAMPOS):
+        guardado = tuple(getattr(categoria, campo) for campo in CAMPOS)
+        real = reales.get(categoria.pk, (0, 0, 0, 0))
+        if guardado != real:
+            diferencias.append((categoria, guardado, real))
+    return diferencias
+
+
+def reparar_contadores(diferencias):
+    """ Reescribe los contadores de las categorías dadas con el valor real. """
+    categorias = []
+    for categoria, _, real in diferencias:
+        for campo, valor in zip(CAMPOS, real):
+            setattr(categoria, campo, valor)
+        categorias.append(categoria)
+    with transaction.atomic():
+        Categoria.objects.bulk_update(categorias, CAMPOS, batch_size=500)
+    return len(categorias)
+
+
+def recalcular_contadores():
+    """ Verifica y repara todas las categorías. Devuelve cuántas se corrigieron. """
+    with transaction.atomic():
+        return reparar_contadores(diferencias_contadores())
+
+
+# =======================================================
+# --- LECTURA ---
+# =======================================================
+
+def _totales_categorias():
+    return Categoria.objects.all(), {
+        'productos_total': Coalesce(Sum('productos_total'), 0),
+        'unidades_stock': Coalesce(Sum('unidades_stock'), 0),
+        'valor_stock': Coalesce(Sum('valor_stock'), 0, output_field=DecimalField()),
+    }
+
+
+def _totales_sin_categoria():
+    return Producto.objects.filter(categoria__isnull=True), {
+        'productos_total': Count('id'),
+        'unidades_stock': Coalesce(Sum('stock'), 0),
+        'valor_stock': Coalesce(Sum(F('stock') * F('precio'), output_field=DecimalField()), 0, output_field=DecimalField()),
+    }
+
+
+def _sumar(*parciales):
+    return {campo: sum(parcial[campo] for parcial in parciales) for campo in ('productos_total', 'unidades_stock', 'valor_stock')}
+
+
+def totales_inventario():
+    """ Productos, unidades y valor de todo el inventario (dos consultas, sin contar la tabla de productos). """
+    return _sumar(*(queryset.aggregate(**agregados) for queryset, agregados in (_totales_categorias(), _totales_sin_categoria())))
+
+
+async def atotales_inventario():
+    """ Versión async de totales_inventario() (las dos consultas, una tras otra). """
+    return _sumar(*[
+        await queryset.aaggregate(**agregados) for queryset, agregados in (_totales_categorias(), _totales_sin_categoria())
+    ])
+
+
+def valoracion_inventario():
+    """
+    Valoración por categoría (desde los contadores) más la fila de productos
+    sin categoría y los totales. Dos consultas, sin recorrer los productos
+    categorizados.
+    """
+    categorias = list(Categoria.objects.order_by('-valor_stock', 'nombre').values('id', 'nombre', *CAMPOS))
+    sin_categoria = _agregados(Producto.objects.filter(categoria__isnull=True))
+    filas = categorias + ([dict(sin_categoria, id=None, nombre='Sin Clase')] if sin_categoria['productos_total'] else [])
+    totales = {campo: sum(fila[campo] for fila in filas) for campo in CAMPOS}
+    return filas, totales
@@ -0,0 +1,227 @@
+"""
+Actualizaciones en vivo del dashboard por Server-Sent Events.
+
+Cada dashboard abierto mantiene una conexión SSE (vista async) suscrita al
+Publicador del proceso. El publicador, en un hilo propio, recalcula los KPIs
+una sola vez por cambio (obtener_kpis(), la misma caché que usa la página) y
+reparte a todos los suscriptores solo lo que cambió: los indicadores con su
+nuevo valor y los productos que entran o salen de la alerta de stock bajo o
+cambian de stock dentro de ella. N dashboards abiertos cuestan un cálculo
+por cambio, no N recargas de la página.
+
+El publicador despierta con la señal kpis_invalidados (ventas, productos,
+categorías e importaciones de este proceso) y además revisa la versión de
+los KPIs en la caché cada REVISION_SEGUNDOS: con CACHE_BACKEND=file ve
+también los cambios hechos por otros procesos (otro worker, procesar_tareas).
+Sin suscriptores no calcula nada.
+
+Los eventos del flujo son:
+- `inicio`: todos los indicadores y la alerta completa (al conectar, o para
+  resincronizar una conexión que se quedó atrás).
+- `cambios`: {'kpis': {campo: valor}, 'stock_bajo': {'entran', 'salen',
+  'cambian', 'total'}}, con solo las partes que cambiaron.
+"""
+import asyncio
+import json
+import logging
+import threading
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from .kpis import CLAVE_VERSION, kpis_invalidados, obtener_kpis
+
+# Cada cuánto revisa el publicador la versión de los KPIs aunque nadie le avise
+REVISION_SEGUNDOS = 5
+
+# Comentario SSE periódico: mantiene viva la conexión a través de proxies
+LATIDO_SEGUNDOS = 15
+
+# Espera que el navegador deja pasar antes de reconectar
+RECONEXION_MS = 3000
+
+# Eventos que una conexión lenta puede acumular; si se llena, se resincroniza
+MAXIMO_PENDIENTES = 50
+
+INDICADORES = (
+    'productos_totales', 'categorias_totales', 'total_ventas_hoy',
+    'transacciones_hoy', 'valor_inventario', 'unidades_inventario',
+)
+
+logger = logging.getLogger(__name__)
+
+
+def instantanea(kpis):
+    """ Lo que muestra el dashboard: los indicadores y la alerta de stock bajo. """
+    datos = {campo: kpis[campo] for campo in INDICADORES}
+    datos['alerta_stock_bajo'] = [dict(fila) for fila in kpis['alerta_stock_bajo']]
+    return datos
+
+
+def diferencias(antes, despues):
+    """ Cambios de `despues` respecto de `antes` (dos instantáneas); vacío si no hay. """
+    cambios = {}
+    indicadores = {campo: despues[campo] for campo in INDICADORES if antes[campo] != despues[campo]}
+    if indicadores:
+        cambios['kpis'] = indicadores
+
+    previos = {fila['id']: fila for fila in antes['alerta_stock_bajo']}
+    actuales = {fila['id']: fila for fila in despues['alerta_stock_bajo']}
+    alerta = {
+        'entran': [fila for pk, fila in actuales.items() if pk not in previos],
+        'salen': [pk for pk in previos if pk not in actuales],
+        'cambian': {
+            pk: fila['stock'] for pk, fila in actuales.items()
+            if pk in previos and previos[pk]['stock'] != fila['stock']
+        },
+    }
+    if any(alerta.values()):
+        alerta['total'] = len(actuales)
+        cambios['stock_bajo'] = alerta
+    return cambios
+
+
+class Publicador:
+    """
+    Reparte los cambios de los KPIs a los suscriptores. Un suscriptor es una
+    función `entregar(nombre, datos)` que se llama desde el hilo del
+    publicador (debe ser segura entre hilos y no bloquear).
+    """
+
+    def __init__(self):
+        self._suscriptores = set()
+        self._candado = threading.Lock()
+        self._aviso = threading.Event()
+        self._hilo = None
+        # Última instantánea repartida y la (versión, día) de la que salió
+        self.ultima = None
+        self._origen = None
+
+    def suscribir(self, entregar):
+        """ Agrega un suscriptor; si ya hay una instantánea, la recibe enseguida como 'inicio'. """
+        with self._candado:
+            self._suscriptores.add(entregar)
+            if self.ultima is not None:
+                entregar('inicio', self.ultima)
+        self.avisar()
+
+    def desuscribir(self, entregar):
+        with self._candado:
+            self._suscriptores.discard(entregar)
+            if not self._suscriptores:
+                # Sin nadie escuchando la instantánea envejece: se rehace al volver alguien
+                self.ultima = self._origen = None
+
+    def avisar(self):
+        """ Pide una revisión inmediata (desde cualquier hilo). """
+        self._aviso.set()
+
+    def revisar(self):
+        """
+        Si hay suscriptores y los KPIs cambiaron desde la última revisión, los
+        recalcula una vez y reparte las diferencias (o 'inicio' si es el primer cálculo).
+        """
+        with self._candado:
+            if not self._suscriptores:
+                return
+            origen = (cache.get(CLAVE_VERSION), date.today())
+            if origen == self._origen:
+                return
+
+        actual = instantanea(obtener_kpis())
+
+        with self._candado:
+            if not self._suscriptores:
+                return
+            if self.ultima is None:
+                evento = ('inicio', actual)
+            else:
+                evento = ('cambios', diferencias(self.ultima, actual))
+            self.ultima, self._origen = actual, origen
+            if not evento[1]:
+                return
+            for entregar in list(self._suscriptores):
+                try:
+                    entregar(*evento)
+                except RuntimeError:
+                    # El bucle de eventos de esa conexión ya se cerró
+                    self._suscriptores.discard(entregar)
+
+    def iniciar(self):
+        """ Arranca (una vez) el hilo que revisa y reparte. """
+        with self._candado:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._trabajar, name='eventos-dashboard', daemon=True)
+                self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            self._aviso.wait(REVISION_SEGUNDOS)
+            self._aviso.clear()
+            try:
+                self.revisar()
+            except Exception:
+                logger.exception("Error al repartir los cambios del dashboard")
+            finally:
+                close_old_connections()
+
+
+publicador = Publicador()
+
+
+@receiver(kpis_invalidados)
+def avisar_al_publicador(**kwargs):
+    publicador.avisar()
+
+
+# =======================================================
+# --- FLUJO SSE ---
+# =======================================================
+
+def formatear(nombre, datos):
+    """ Un evento en el formato de text/event-stream. """
+    return f"event: {nombre}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def flujo_eventos():
+    """
+    Generador async del cuerpo SSE. Cierra tras EVENTOS_DURACION_SEGUNDOS (el
+    navegador reconecta solo): así una conexión que el cliente abandonó no
+    queda suscrita indefinidamente.
+    """
+    loop = asyncio.get_running_loop()
+    cola = asyncio.Queue(MAXIMO_PENDIENTES)
+
+    def poner(nombre, datos):
+        try:
+            cola.put_nowait((nombre, datos))
+        except asyncio.QueueFull:
+            # La conexión no da abasto: se descarta lo pendiente y se manda todo de nuevo
+            while not cola.empty():
+                cola.get_nowait()
+            cola.put_nowait(('inicio', publicador.ultima))
+
+    def entregar(nombre, datos):
+        loop.call_soon_threadsafe(poner, nombre, datos)
+
+    limite = loop.time() + getattr(settings, 'EVENTOS_DURACION_SEGUNDOS', 300)
+    publicador.iniciar()
+    publicador.suscribir(entregar)
+    try:
+        yield f"retry: {RECONEXION_MS}\n\n"
+        while True:
+            restante = limite - loop.time()
+            if restante <= 0:
+                return
+            try:
+                nombre, datos = await asyncio.wait_for(cola.get(), min(restante, LATIDO_SEGUNDOS))
+            except asyncio.TimeoutError:
+                yield ": latido\n\n"
+                continue
+            yield formatear(nombre, datos)
+    finally:
+        publicador.desuscribir(entregar)
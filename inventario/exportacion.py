@@ -0,0 +1,91 @@
+"""
+Exportación en streaming (CSV y XLSX) para reportes grandes.
+
+Quien llama pasa un iterable de filas; el de ventas (archivo.filas_ventas)
+las lee por bloques con un cursor (fecha, id), una consulta por bloque, así
+que la memoria del worker no crece con el número de filas. El CSV se envía al
+cliente a medida que se genera con StreamingHttpResponse. El XLSX lo escribe
+openpyxl en modo solo escritura (Workbook(write_only=True)), que vuelca las
+filas a disco en vez de retenerlas; el archivo terminado se envía por bloques.
+
+Los mismos generadores escriben a un archivo (escribir_exportacion) cuando la
+exportación se hace en segundo plano (inventario.trabajos).
+"""
+import csv
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import StreamingHttpResponse
+
+# Bytes del XLSX terminado enviados en cada trozo de la respuesta
+TAMANO_BLOQUE_XLSX = 64 * 1024
+
+
+class _Eco:
+    """ Pseudo-archivo cuyo write() devuelve el texto en vez de guardarlo (patrón de la doc. de Django). """
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel abra bien las tildes y la ñ
+    yield '\ufeff' + escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def respuesta_csv(encabezados, filas, nombre_archivo):
+    """ StreamingHttpResponse con un CSV generado fila a fila. """
+    respuesta = StreamingHttpResponse(_csv(encabezados, filas), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return respuesta
+
+
+# --- XLSX (openpyxl en modo solo escritura) ---
+
+def _libro(encabezados, filas, hoja):
+    """
+    Libro de una hoja en modo write_only: openpyxl vuelca cada fila a un
+    archivo temporal al agregarla, así que la memoria no crece con las filas.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImproperlyConfigured("Para exportar XLSX instala openpyxl (pip install openpyxl).")
+    libro = Workbook(write_only=True)
+    datos = libro.create_sheet(title=hoja)
+    datos.append(encabezados)
+    for fila in filas:
+        datos.append(fila)
+    return libro
+
+
+def _xlsx(encabezados, filas, hoja):
+    # El ZIP solo puede cerrarse con todas las filas escritas: se arma en un
+    # temporal en disco y se envía por bloques
+    with tempfile.TemporaryFile() as salida:
+        _libro(encabezados, filas, hoja).save(salida)
+        salida.seek(0)
+        while bloque := salida.read(TAMANO_BLOQUE_XLSX):
+            yield bloque
+
+
+def respuesta_xlsx(encabezados, filas, nombre_archivo, hoja='Datos'):
+    """ StreamingHttpResponse con un libro XLSX de una hoja generado fila a fila. """
+    respuesta = StreamingHttpResponse(
+        _xlsx(encabezados, filas, hoja),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return respuesta
+
+
+def escribir_exportacion(destino, formato, encabezados, filas, hoja='Datos'):
+    """ Escribe el CSV o XLSX en un archivo binario ya abierto, bloque a bloque. """
+    if formato == 'csv':
+        for texto in _csv(encabezados, filas):
+            destino.write(texto.encode('utf-8'))
+    else:
+        _libro(encabezados, filas, hoja).save(destino)
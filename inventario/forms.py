@@ -3,6 +3,7 @@ from django import forms
 from .models import Producto, Venta, Categoria 
 from django.contrib.auth.forms import UserCreationForm 
 from django.contrib.auth import get_user_model
+from .widgets import ProductoAutocompleteWidget
 
 User = get_user_model() 
 
@@ -15,7 +16,7 @@ class ProductoForm(forms.ModelForm):
     class Meta:
         model = Producto
         # El campo 'categoria' es ahora la clave foránea a Categoria
-        fields = ['imagen', 'nombre', 'categoria', 'precio', 'stock', 'variacion']
+        fields = ['imagen', 'nombre', 'categoria', 'precio', 'stock', 'variacion', 'codigo_barras']
         widgets = {
             'imagen': forms.ClearableFileInput(attrs={'accept': 'image/*'})
         }
@@ -37,17 +38,64 @@ class CategoriaForm(forms.ModelForm):
 # 3. FORMULARIO PARA REGISTRAR VENTAS
 # -----------------------------------------------------------------
 class VentaForm(forms.ModelForm):
+    # El widget busca en el servidor: el queryset solo se usa para validar el id elegido
     producto = forms.ModelChoiceField(
-        queryset=Producto.objects.filter(stock__gt=0).order_by('nombre'), # Filtramos solo productos con stock
+        queryset=Producto.objects.filter(stock__gt=0), # Filtramos solo productos con stock
+        widget=ProductoAutocompleteWidget,
         label="Seleccionar Producto" 
     )
+    # Una cantidad negativa o cero "devolvería" stock al registrar la venta
+    cantidad = forms.IntegerField(min_value=1, label="Cantidad")
     
     class Meta:
         model = Venta
         fields = ['producto', 'cantidad']
 
 # -----------------------------------------------------------------
-# 4. FORMULARIO PARA REGISTRO DE USUARIOS
+# 4. FORMULARIO DE CANASTA (VARIAS LÍNEAS EN UNA SOLA VENTA)
+# -----------------------------------------------------------------
+class LineaCarritoForm(forms.Form):
+    producto = forms.ModelChoiceField(
+        queryset=Producto.objects.filter(stock__gt=0),
+        widget=ProductoAutocompleteWidget,
+        label="Producto"
+    )
+    cantidad = forms.IntegerField(min_value=1, initial=1, label="Cantidad")
+
+
+# Las filas vacías se ignoran; al menos una línea debe venir llena
+CarritoFormSet = forms.formset_factory(LineaCarritoForm, extra=5, min_num=1, validate_min=True)
+
+# -----------------------------------------------------------------
+# 5. FILTRO DE FECHAS DEL REPORTE DE VENTAS
+# -----------------------------------------------------------------
+class FiltroReporteForm(forms.Form):
+    desde = forms.DateField(required=False, label="Desde", widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, label="Hasta", widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        datos = super().clean()
+        if datos.get('desde') and datos.get('hasta') and datos['desde'] > datos['hasta']:
+            raise forms.ValidationError("La fecha 'Desde' no puede ser posterior a 'Hasta'.")
+        return datos
+
+# -----------------------------------------------------------------
+# 6. IMPORTACIÓN MASIVA DE PRODUCTOS / RECEPCIÓN DE STOCK
+# -----------------------------------------------------------------
+class ImportacionProductosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo CSV o XLSX",
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx'})
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Solo se aceptan archivos .csv o .xlsx.")
+        return archivo
+
+# -----------------------------------------------------------------
+# 7. FORMULARIO PARA REGISTRO DE USUARIOS
 # -----------------------------------------------------------------
 class CustomUserCreationForm(UserCreationForm):
     class Meta:
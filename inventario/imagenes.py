@@ -0,0 +1,127 @@
+"""
+Variantes redimensionadas (WebP + JPEG de respaldo) de las imágenes de producto.
+
+Al subir una imagen se guarda el original tal cual y, ya fuera de la
+petición, una tarea en segundo plano (inventario.tareas) genera las variantes `mini` y `medio` en
+`<carpeta>/variantes/`. Cuando terminan se marca `Producto.imagen_variantes`
+y el catálogo pasa a servir las variantes con `srcset` en lugar del original.
+Las imágenes existentes se procesan con `manage.py generar_variantes_imagenes`.
+
+Los nombres de las variantes llevan una huella de su contenido
+(`Producto.imagen_huella`): regenerarlas con otros tamaños o calidades crea
+archivos nuevos en lugar de reescribir los que los navegadores guardan como
+inmutables (ver inventario.cache_http). Las anteriores quedan en disco
+porque páginas aún en caché pueden citarlas.
+"""
+import hashlib
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .tareas import encolar
+from .version_catalogo import marcar_cambio_catalogo
+
+# Ancho máximo (px) de cada variante
+TAMANOS = {
+    'mini': 320,
+    'medio': 640,
+}
+
+# Formato moderno primero; JPEG para navegadores sin WebP
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Caracteres hexadecimales de la huella en el nombre de las variantes
+LARGO_HUELLA = 12
+
+
+def ruta_variante(nombre_imagen, tamano, formato, huella=''):
+    """
+    'productos/x/foto.png' -> 'productos/x/variantes/foto-mini.<huella>.webp'
+    (sin huella, el nombre de las variantes generadas antes de usarla).
+    """
+    carpeta, archivo = posixpath.split(nombre_imagen)
+    base = posixpath.splitext(archivo)[0]
+    sufijo = f'.{huella}' if huella else ''
+    return posixpath.join(carpeta, 'variantes', f'{base}-{tamano}{sufijo}.{formato}')
+
+
+def _guardar(nombre, contenido):
+    # Mismo nombre, misma huella: el archivo existente ya tiene este contenido
+    if not default_storage.exists(nombre):
+        default_storage.save(nombre, ContentFile(contenido))
+
+
+def generar_variantes(nombre_imagen):
+    """
+    Genera todas las variantes de una imagen guardada en el storage.
+    Es una función pura sobre archivos (no toca la base de datos), así que se
+    puede ejecutar en otro hilo o proceso. Devuelve la huella que llevan sus nombres.
+    """
+    with default_storage.open(nombre_imagen, 'rb') as archivo:
+        original = ImageOps.exif_transpose(Image.open(archivo))
+        original.load()
+
+    # JPEG no admite transparencia: se aplana sobre fondo blanco
+    if original.mode in ('RGBA', 'LA', 'P'):
+        original = original.convert('RGBA')
+        plano = Image.new('RGB', original.size, (255, 255, 255))
+        plano.paste(original, mask=original.getchannel('A'))
+    else:
+        plano = original.convert('RGB')
+
+    variantes = {}
+    for tamano, ancho in TAMANOS.items():
+        reducida = plano.copy()
+        reducida.thumbnail((ancho, ancho), Image.LANCZOS)
+        for formato, (formato_pil, opciones) in FORMATOS.items():
+            buffer = io.BytesIO()
+            reducida.save(buffer, formato_pil, **opciones)
+            variantes[tamano, formato] = buffer.getvalue()
+
+    # Una huella para todo el juego: el srcset cita las cuatro variantes
+    suma = hashlib.sha1()
+    for contenido in variantes.values():
+        suma.update(contenido)
+    huella = suma.hexdigest()[:LARGO_HUELLA]
+    for (tamano, formato), contenido in variantes.items():
+        _guardar(ruta_variante(nombre_imagen, tamano, formato, huella), contenido)
+    return huella
+
+
+def procesar_producto(producto_id):
+    """
+    Genera las variantes de un producto y marca el producto como listo. Si
+    falla, la excepción llega a la cola de tareas, que lo reintenta; mientras
+    tanto el catálogo sigue mostrando el original.
+    """
+    from .models import Producto
+
+    nombre = Producto.objects.filter(pk=producto_id).values_list('imagen', flat=True).first()
+    if not nombre:
+        return
+    huella = generar_variantes(nombre)
+    with transaction.atomic():
+        # Solo si la imagen no cambió mientras tanto (si cambió, ya hay otra tarea en cola)
+        if Producto.objects.filter(pk=producto_id, imagen=nombre).update(imagen_variantes=True, imagen_huella=huella):
+            # El catálogo pasa a mostrar las variantes: su ETag debe cambiar
+            marcar_cambio_catalogo()
+
+
+def programar_variantes(producto_id):
+    """ Encola la generación de variantes como tarea en segundo plano (fuera de la petición). """
+    return encolar('variantes_imagen', producto_id=producto_id)
+
+
+def srcset(nombre_imagen, formato, huella=''):
+    """ Atributo srcset con todas las variantes de un formato. """
+    return ', '.join(
+        f'{default_storage.url(ruta_variante(nombre_imagen, tamano, formato, huella))} {ancho}w'
+        for tamano, ancho in TAMANOS.items()
+    )
@@ -0,0 +1,274 @@
+"""
+Importación masiva de productos y recepción de stock desde CSV o XLSX.
+
+El archivo se lee fila a fila (sin cargarlo entero en memoria) y se aplica
+en lotes: por cada lote se resuelven las categorías y los productos
+existentes con un par de consultas, los nuevos se insertan con bulk_create,
+los cambios de precio/categoría van en un bulk_update y la entrada de stock
+es un único UPDATE con CASE (stock = stock + delta), sin leer el stock antes.
+Cada entrada queda además como recepción en el libro de stock.
+
+Columnas reconocidas (la primera fila es la cabecera):
+    nombre (obligatoria), variacion, categoria, precio, cantidad
+`cantidad` son las unidades recibidas y se suman al stock actual. Los
+productos se identifican por nombre + variación.
+"""
+import csv
+import io
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .contadores import aplicar_deltas, cambiar_producto, sumar_producto
+from .kpis import invalidar_kpis
+from .models import Categoria, MovimientoStock, Producto
+from .movimientos import aplicar_movimientos, anotar_movimientos
+from .version_catalogo import marcar_cambio_catalogo
+
+COLUMNAS = ('nombre', 'variacion', 'categoria', 'precio', 'cantidad')
+
+# Filas por transacción (también limita el tamaño de los IN (...) de cada lote)
+TAMANO_LOTE = 500
+
+# Límites de las columnas (SQLite no los hace cumplir: se validan al leer la fila)
+DIGITOS_PRECIO = Producto._meta.get_field('precio').max_digits
+MAXIMA_CANTIDAD = 2 ** 31 - 1
+
+
+class ErrorImportacion(Exception):
+    """ El archivo no se puede importar (formato no soportado, cabecera inválida...). """
+
+
+class ResultadoImportacion:
+    """ Contadores y errores por fila de una importación. """
+
+    def __init__(self):
+        self.creados = 0
+        self.actualizados = 0
+        self.categorias_creadas = 0
+        self.filas = 0
+        self.errores = []
+
+    def __str__(self):
+        return (
+            f"{self.filas} filas: {self.creados} productos nuevos, {self.actualizados} actualizados, "
+            f"{self.categorias_creadas} categorías nuevas, {len(self.errores)} errores."
+        )
+
+
+def _sin_tildes(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+
+def _normalizar_cabecera(cabecera):
+    # 'Variación' y 'Categoría' se aceptan igual que 'variacion' y 'categoria'
+    columnas = [_sin_tildes(str(c or '').strip().lower()) for c in cabecera]
+    if 'nombre' not in columnas:
+        raise ErrorImportacion("La cabecera debe incluir la columna 'nombre'.")
+    return columnas
+
+
+def leer_csv(archivo):
+    """ Itera las filas de un CSV (archivo binario o de texto) como diccionarios. """
+    if isinstance(archivo.read(0), bytes):
+        archivo = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    lector = csv.reader(archivo)
+    columnas = _normalizar_cabecera(next(lector, []))
+    for fila in lector:
+        yield dict(zip(columnas, fila))
+
+
+def leer_xlsx(archivo):
+    """ Itera las filas de la primera hoja de un XLSX en modo de solo lectura (streaming). """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErrorImportacion("Para importar XLSX instala openpyxl (pip install openpyxl).")
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        columnas = _normalizar_cabecera(next(filas, []))
+        for fila in filas:
+            yield dict(zip(columnas, fila))
+    finally:
+        libro.close()
+
+
+def leer_archivo(archivo, nombre):
+    """ Elige el lector según la extensión del nombre del archivo. """
+    extension = nombre.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return leer_csv(archivo)
+    if extension == 'xlsx':
+        return leer_xlsx(archivo)
+    raise ErrorImportacion("Formato no soportado: usa un archivo .csv o .xlsx.")
+
+
+def _texto(valor):
+    return str(valor).strip() if valor is not None else ''
+
+
+def _numero(texto, motivo):
+    """ Decimal finito de una celda; ValueError(motivo) si no lo es ('NaN' e 'Infinity' incluidos). """
+    try:
+        numero = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(motivo)
+    if not numero.is_finite():
+        raise ValueError(motivo)
+    return numero
+
+
+def _limpiar(fila):
+    """ Convierte una fila cruda en valores tipados o lanza ValueError. """
+    nombre = _texto(fila.get('nombre'))
+    if not nombre:
+        raise ValueError("falta el nombre")
+
+    precio = _texto(fila.get('precio')).replace('$', '').replace(' ', '')
+    if precio:
+        motivo = f"precio inválido '{fila.get('precio')}'"
+        try:
+            precio = _numero(precio, motivo).quantize(Decimal('1'))
+        except InvalidOperation:
+            # Más cifras de las que admite el contexto decimal
+            raise ValueError(motivo)
+        if len(precio.as_tuple().digits) > DIGITOS_PRECIO:
+            raise ValueError(f"precio fuera de rango '{fila.get('precio')}' (máximo {DIGITOS_PRECIO} cifras)")
+    else:
+        precio = None
+
+    cantidad = _texto(fila.get('cantidad'))
+    cantidad = int(_numero(cantidad, f"cantidad inválida '{fila.get('cantidad')}'")) if cantidad else 0
+    if abs(cantidad) > MAXIMA_CANTIDAD:
+        raise ValueError(f"cantidad fuera de rango '{fila.get('cantidad')}'")
+
+    return {
+        'nombre': nombre[:150],
+        'variacion': _texto(fila.get('variacion'))[:100],
+        'categoria': _texto(fila.get('categoria'))[:100],
+        'precio': precio,
+        'cantidad': cantidad,
+    }
+
+
+def _categorias(nombres, resultado):
+    """ Devuelve {nombre: id} creando de una vez las categorías que falten. """
+    existentes = dict(Categoria.objects.filter(nombre__in=nombres).values_list('nombre', 'id'))
+    faltantes = [nombre for nombre in nombres if nombre not in existentes]
+    if faltantes:
+        Categoria.objects.bulk_create([Categoria(nombre=nombre) for nombre in faltantes], ignore_conflicts=True)
+        resultado.categorias_creadas += len(faltantes)
+        existentes.update(Categoria.objects.filter(nombre__in=faltantes).values_list('nombre', 'id'))
+    return existentes
+
+
+def _aplicar_lote(lote, resultado):
+    # Filas repetidas dentro del lote: se suman las cantidades y gana el último precio
+    por_clave = {}
+    for numero, fila in lote:
+        clave = (fila['nombre'], fila['variacion'])
+        previa = por_clave.get(clave)
+        if previa:
+            fila = dict(fila, cantidad=previa['cantidad'] + fila['cantidad'],
+                        precio=fila['precio'] if fila['precio'] is not None else previa['precio'],
+                        categoria=fila['categoria'] or previa['categoria'])
+        por_clave[clave] = dict(fila, numero=numero)
+
+    with transaction.atomic():
+        categorias = _categorias({f['categoria'] for f in por_clave.values() if f['categoria']}, resultado)
+
+        existentes = {}
+        for producto in Producto.objects.filter(
+            nombre__in={nombre for nombre, _ in por_clave}
+        ).only('id', 'nombre', 'variacion', 'precio', 'stock', 'categoria_id').order_by('id'):
+            existentes.setdefault((producto.nombre, producto.variacion), producto)
+
+        nuevos, modificados, entradas, contadores = [], [], {}, {}
+        for clave, fila in por_clave.items():
+            categoria_id = categorias.get(fila['categoria']) if fila['categoria'] else None
+            producto = existentes.get(clave)
+            if producto is None:
+                if fila['precio'] is None:
+                    resultado.errores.append((fila['numero'], "producto nuevo sin precio"))
+                    continue
+                if fila['cantidad'] < 0:
+                    resultado.errores.append((fila['numero'], "producto nuevo con cantidad negativa"))
+                    continue
+                nuevos.append(Producto(
+                    nombre=fila['nombre'], variacion=fila['variacion'], categoria_id=categoria_id,
+                    precio=fila['precio'], stock=fila['cantidad'],
+                ))
+                continue
+
+            antes = (producto.categoria_id, producto.stock, producto.precio)
+            cambiado = False
+            if fila['precio'] is not None and fila['precio'] != producto.precio:
+                producto.precio = fila['precio']
+                cambiado = True
+            if categoria_id and categoria_id != producto.categoria_id:
+                producto.categoria_id = categoria_id
+                cambiado = True
+            if cambiado:
+                modificados.append(producto)
+                cambiar_producto(contadores, antes, (producto.categoria_id, producto.stock, producto.precio))
+            if fila['cantidad']:
+                entradas[producto.pk] = fila['cantidad']
+            if cambiado or fila['cantidad']:
+                resultado.actualizados += 1
+
+        if nuevos:
+            Producto.objects.bulk_create(nuevos)
+            for producto in nuevos:
+                sumar_producto(contadores, producto.categoria_id, producto.stock, producto.precio)
+            # El stock inicial ya va en el INSERT: solo se anota en el libro
+            anotar_movimientos([
+                MovimientoStock(producto_id=producto.pk, tipo=MovimientoStock.RECEPCION, cantidad=producto.stock, nota='Importación')
+                for producto in nuevos if producto.stock
+            ])
+        if modificados:
+            Producto.objects.bulk_update(modificados, ['precio', 'categoria'])
+        # Antes de las entradas: aplicar_movimientos ya las cuenta con el precio y la categoría nuevos
+        aplicar_deltas(contadores)
+        if entradas:
+            # Suma relativa en la base de datos: no pisa ventas hechas mientras se importa
+            aplicar_movimientos([
+                MovimientoStock(producto_id=pk, tipo=MovimientoStock.RECEPCION, cantidad=cantidad, nota='Importación')
+                for pk, cantidad in entradas.items()
+            ])
+        if nuevos or modificados or entradas:
+            marcar_cambio_catalogo()
+
+    resultado.creados += len(nuevos)
+
+
+def importar_productos(filas, tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Aplica un iterable de filas (diccionarios por columna) en lotes transaccionales.
+    Las filas inválidas se saltan y se informan en `resultado.errores` como
+    (número de fila, motivo); el resto del archivo se sigue importando.
+    `progreso(resultado)` se llama tras cada lote aplicado.
+    """
+    resultado = ResultadoImportacion()
+    lote = []
+    # La fila 1 es la cabecera
+    for numero, fila in enumerate(filas, start=2):
+        if not any(_texto(valor) for valor in fila.values()):
+            continue
+        resultado.filas += 1
+        try:
+            lote.append((numero, _limpiar(fila)))
+        except ValueError as error:
+            resultado.errores.append((numero, str(error)))
+        if len(lote) >= tamano_lote:
+            _aplicar_lote(lote, resultado)
+            lote = []
+            if progreso:
+                progreso(resultado)
+    if lote:
+        _aplicar_lote(lote, resultado)
+
+    # bulk_create / update no emiten señales
+    invalidar_kpis()
+    return resultado
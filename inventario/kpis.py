@@ -0,0 +1,167 @@
+"""
+KPIs del dashboard servidos desde la caché de Django.
+
+Los indicadores se recalculan solo cuando algo cambia: las señales de
+Producto, Categoria y Venta (y el servicio de ventas, que escribe con UPDATE
+y bulk_create) llaman a invalidar_kpis(), que cambia la versión guardada en
+la caché. Cuando la versión no coincide, un único proceso recalcula (toma un
+candado con cache.add) y el resto sirve el último valor conocido mientras
+tanto, así una ráfaga de recargas tras una venta no dispara N recálculos.
+Funciona con los backends locmem y de archivos, sin servicios externos.
+
+aobtener_kpis() es la variante para vistas async: mismo protocolo de caché y
+las mismas consultas, pero la espera no bloquea el bucle de eventos. No son
+más rápidas: el ORM async de Django corre cada consulta con sync_to_async
+(thread_sensitive=True), en un único hilo, una detrás de otra.
+
+Cada invalidación emite la señal kpis_invalidados (la escucha el publicador
+de eventos del dashboard, inventario.eventos).
+"""
+import asyncio
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.dispatch import Signal
+
+from .contadores import atotales_inventario, totales_inventario
+from .models import Categoria, Producto, VentaDiaria
+from .routers import leer_de_primaria
+
+CLAVE_KPIS = 'inventario:kpis'
+CLAVE_RESPALDO = 'inventario:kpis:respaldo'
+CLAVE_VERSION = 'inventario:kpis:version'
+CLAVE_CANDADO = 'inventario:kpis:candado'
+
+# Productos por debajo de este stock aparecen en la alerta del dashboard
+UMBRAL_STOCK_BAJO = 50
+
+# Máximo que se espera al proceso que recalcula cuando no hay respaldo (arranque en frío)
+ESPERA_MAXIMA = 2.0
+
+# Se emite tras cada invalidar_kpis() (sin argumentos)
+kpis_invalidados = Signal()
+
+
+def _ventas_del_dia(hoy):
+    return VentaDiaria.objects.filter(fecha=hoy)
+
+
+def _stock_bajo():
+    return Producto.objects.filter(stock__lt=UMBRAL_STOCK_BAJO).order_by('stock').values('id', 'nombre', 'variacion', 'stock')
+
+
+def _armar_kpis(hoy, ventas_hoy, categorias_totales, alerta_stock_bajo, inventario):
+    return {
+        'fecha': hoy,
+        'productos_totales': inventario['productos_total'],
+        'categorias_totales': categorias_totales,
+        'alerta_stock_bajo': alerta_stock_bajo,
+        'total_ventas_hoy': ventas_hoy['total_sum'] or 0,
+        'transacciones_hoy': ventas_hoy['total_transacciones'] or 0,
+        # Desde los contadores de las categorías (inventario.contadores)
+        'valor_inventario': inventario['valor_stock'],
+        'unidades_inventario': inventario['unidades_stock'],
+    }
+
+
+def calcular_kpis():
+    """ Calcula los indicadores directamente contra la base de datos. """
+    hoy = date.today()
+    return _armar_kpis(
+        hoy,
+        _ventas_del_dia(hoy).aggregate(total_sum=Sum('ingresos'), total_transacciones=Sum('transacciones')),
+        Categoria.objects.count(),
+        list(_stock_bajo()),
+        totales_inventario(),
+    )
+
+
+async def acalcular_kpis():
+    """ Como calcular_kpis(), con el ORM async (las consultas se ejecutan en serie). """
+    hoy = date.today()
+    return _armar_kpis(
+        hoy,
+        await _ventas_del_dia(hoy).aaggregate(total_sum=Sum('ingresos'), total_transacciones=Sum('transacciones')),
+        await Categoria.objects.acount(),
+        [fila async for fila in _stock_bajo()],
+        await atotales_inventario(),
+    )
+
+
+def _vigente(kpis, version):
+    return kpis is not None and kpis['version'] == version and kpis['fecha'] == date.today()
+
+
+def obtener_kpis():
+    """ Devuelve los KPIs desde la caché, recalculándolos una sola vez tras cada cambio. """
+    guardado = cache.get_many([CLAVE_KPIS, CLAVE_VERSION])
+    kpis, version = guardado.get(CLAVE_KPIS), guardado.get(CLAVE_VERSION)
+    if _vigente(kpis, version):
+        return kpis
+
+    duracion = getattr(settings, 'KPIS_CACHE_TIMEOUT', 300)
+    if cache.add(CLAVE_CANDADO, 1, timeout=30):
+        try:
+            # De la primaria: un valor de la réplica atrasada quedaría cacheado como vigente
+            with leer_de_primaria():
+                kpis = dict(calcular_kpis(), version=version)
+            cache.set(CLAVE_KPIS, kpis, timeout=duracion)
+            # El respaldo dura más: es lo que ven los demás mientras alguien recalcula
+            cache.set(CLAVE_RESPALDO, kpis, timeout=duracion * 12)
+        finally:
+            cache.delete(CLAVE_CANDADO)
+        return kpis
+
+    respaldo = cache.get(CLAVE_RESPALDO)
+    if respaldo is not None and respaldo['fecha'] == date.today():
+        return respaldo
+
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(0.05)
+        kpis = cache.get(CLAVE_KPIS)
+        if kpis is not None:
+            return kpis
+    with leer_de_primaria():
+        return dict(calcular_kpis(), version=version)
+
+
+async def aobtener_kpis():
+    """ Versión async de obtener_kpis() (mismas claves de caché y el mismo candado). """
+    guardado = await cache.aget_many([CLAVE_KPIS, CLAVE_VERSION])
+    kpis, version = guardado.get(CLAVE_KPIS), guardado.get(CLAVE_VERSION)
+    if _vigente(kpis, version):
+        return kpis
+
+    duracion = getattr(settings, 'KPIS_CACHE_TIMEOUT', 300)
+    if await cache.aadd(CLAVE_CANDADO, 1, timeout=30):
+        try:
+            with leer_de_primaria():
+                kpis = dict(await acalcular_kpis(), version=version)
+            await cache.aset(CLAVE_KPIS, kpis, timeout=duracion)
+            await cache.aset(CLAVE_RESPALDO, kpis, timeout=duracion * 12)
+        finally:
+            await cache.adelete(CLAVE_CANDADO)
+        return kpis
+
+    respaldo = await cache.aget(CLAVE_RESPALDO)
+    if respaldo is not None and respaldo['fecha'] == date.today():
+        return respaldo
+
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        await asyncio.sleep(0.05)
+        kpis = await cache.aget(CLAVE_KPIS)
+        if kpis is not None:
+            return kpis
+    with leer_de_primaria():
+        return dict(await acalcular_kpis(), version=version)
+
+
+def invalidar_kpis():
+    """ Marca los KPIs como desactualizados (el próximo acceso los recalcula). """
+    cache.set(CLAVE_VERSION, time.time_ns(), timeout=None)
+    kpis_invalidados.send(sender=None)
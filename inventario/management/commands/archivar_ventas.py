@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.archivo import archivar_ventas, fecha_corte, meses_activos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las ventas de los meses cerrados a la tabla de ventas archivadas, mes a mes y en lotes. "
+        "Pensado para correr a principio de cada mes desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses', type=int, default=None,
+            help=f"Meses (incluido el actual) que se quedan en Venta. Por defecto VENTAS_MESES_ACTIVOS ({meses_activos()}).",
+        )
+        parser.add_argument('--lote', type=int, default=5000, help="Ventas movidas por transacción.")
+
+    def handle(self, *args, **options):
+        if options['meses'] is not None and options['meses'] < 1:
+            raise CommandError("--meses debe ser al menos 1 (el mes en curso no se archiva).")
+        if options['lote'] < 1:
+            raise CommandError("--lote debe ser un número positivo.")
+
+        corte = fecha_corte(options['meses'])
+        movidas = archivar_ventas(
+            corte,
+            lote=options['lote'],
+            progreso=lambda mes, cantidad: self.stdout.write(f"  {mes:%Y-%m}: {cantidad:,} ventas archivadas"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"{movidas:,} ventas anteriores a {corte} archivadas."))
@@ -0,0 +1,72 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from inventario.benchmark import ESCENARIOS, ESCENARIOS_LECTURA, cargar, comparar, ejecutar
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95/p99) y rendimiento de catálogo, dashboard, reporte, API y ventas "
+        "con clientes concurrentes dentro del proceso. Usa la base de datos configurada: "
+        "genera volumen antes con `poblar_datos`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escenarios', default=','.join(ESCENARIOS_LECTURA),
+            help=f"Lista separada por comas entre: {', '.join(ESCENARIOS)}. 'venta' registra ventas reales.",
+        )
+        parser.add_argument('--clientes', type=int, default=8, help="Hilos concurrentes.")
+        parser.add_argument('--duracion', type=float, default=20.0, help="Segundos de medición.")
+        parser.add_argument('--calentamiento', type=int, default=2, help="Peticiones previas por escenario (no se miden).")
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--guardar', help="Guarda el resultado en este archivo JSON.")
+        parser.add_argument('--comparar', help="Resultado JSON previo contra el que comparar.")
+
+    def handle(self, *args, **options):
+        escenarios = tuple(e.strip() for e in options['escenarios'].split(',') if e.strip())
+        desconocidos = set(escenarios) - set(ESCENARIOS)
+        if not escenarios or desconocidos:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos)) or '(ninguno)'}.")
+        if options['clientes'] < 1 or options['duracion'] <= 0:
+            raise CommandError("--clientes y --duracion deben ser positivos.")
+
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING("DEBUG=True: las cifras incluyen el registro de consultas de depuración."))
+
+        # El cliente de pruebas usa el host 'testserver'
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            resultado = ejecutar(
+                escenarios,
+                clientes=options['clientes'],
+                duracion=options['duracion'],
+                calentamiento=options['calentamiento'],
+                semilla=options['semilla'],
+            )
+
+        self.stdout.write(
+            f"{resultado['clientes']} clientes, {resultado['duracion_s']} s, {resultado['rps_total']} pet/s en total\n"
+        )
+        self.stdout.write(f"{'escenario':<20}{'pet':>8}{'err':>6}{'pet/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for escenario, fila in resultado['escenarios'].items():
+            self.stdout.write(
+                f"{escenario:<20}{fila['peticiones']:>8}{fila['errores']:>6}{fila['rps']:>9}"
+                f"{fila['p50_ms']:>10}{fila['p95_ms']:>10}{fila['p99_ms']:>10}{fila['max_ms']:>10}"
+            )
+
+        if options['comparar']:
+            try:
+                base = cargar(options['comparar'])
+            except (OSError, ValueError) as error:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {error}")
+            self.stdout.write("\nCambio frente a la base (%; negativo en latencias es mejor):")
+            for escenario, cambio in comparar(resultado, base).items():
+                self.stdout.write(f"  {escenario:<20}" + '  '.join(f"{clave} {valor:+}" for clave, valor in cambio.items() if valor is not None))
+
+        if options['guardar']:
+            with open(options['guardar'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado guardado en {options['guardar']}."))
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from panalera_project.db_sqlite.benchmark import ANTES, medir
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento de escrituras concurrentes en SQLite con la configuración por "
+        "defecto de Django y con el perfil de producción de settings (WAL, BEGIN IMMEDIATE...). "
+        "Usa un archivo temporal: no toca la base de datos real."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=8, help="Hilos que registran ventas y ajustes.")
+        parser.add_argument('--lectores', type=int, default=4, help="Hilos que leen a la vez (catálogo/reportes).")
+        parser.add_argument('--duracion', type=float, default=5.0, help="Segundos por configuración.")
+        parser.add_argument('--directorio', help="Carpeta del archivo temporal (por defecto la del sistema; usa el mismo disco que producción).")
+
+    def handle(self, *args, **options):
+        opciones = settings.DATABASES['default'].get('OPTIONS', {})
+        if 'pragmas' not in opciones:
+            raise CommandError("DATABASES['default'] no usa el perfil panalera_project.db_sqlite.")
+        despues = {
+            'descripcion': "Perfil de settings: " + ', '.join(f"{k}={v}" for k, v in opciones['pragmas'].items())
+                           + f", BEGIN {opciones.get('transaction_mode', 'DEFERRED')}",
+            'pragmas': opciones['pragmas'],
+            'transaction_mode': opciones.get('transaction_mode', 'DEFERRED').upper(),
+        }
+
+        resultados = {}
+        for nombre, perfil in (('antes', ANTES), ('despues', despues)):
+            self.stdout.write(f"{nombre}: {perfil['descripcion']}")
+            resultados[nombre] = medir(
+                perfil,
+                escritores=options['escritores'],
+                lectores=options['lectores'],
+                duracion=options['duracion'],
+                directorio=options['directorio'],
+            )
+            fila = resultados[nombre]
+            self.stdout.write(
+                f"  {fila['escrituras_por_s']} escrituras/s ({fila['bloqueos']} 'database is locked'), "
+                f"{fila['lecturas_por_s']} lecturas/s ({fila['lecturas_bloqueadas']} bloqueadas)"
+            )
+
+        antes, despues = resultados['antes'], resultados['despues']
+        if antes['escrituras_por_s']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Escrituras: x{despues['escrituras_por_s'] / antes['escrituras_por_s']:.1f}; "
+                f"bloqueos: {antes['bloqueos']} -> {despues['bloqueos']}."
+            ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventario.movimientos import tomar_corte
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda un corte del libro de movimientos de stock (para los productos con movimientos nuevos). "
+        "Pensado para correr a diario desde cron: las consultas de stock solo suman lo posterior al último corte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help="Filas por inserción masiva.")
+
+    def handle(self, *args, **options):
+        creadas = tomar_corte(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Corte de stock guardado: {creadas} productos."))
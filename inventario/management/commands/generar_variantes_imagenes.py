@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from inventario.imagenes import generar_variantes
+from inventario.models import Producto
+from inventario.version_catalogo import marcar_cambio_catalogo
+
+
+class Command(BaseCommand):
+    help = "Genera en paralelo las miniaturas WebP/JPEG de las imágenes de producto existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help="Regenera también las que ya tienen variantes.")
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help="Procesos en paralelo.")
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        if not options['todas']:
+            productos = productos.filter(imagen_variantes=False)
+        pendientes = dict(productos.values_list('pk', 'imagen'))
+        if not pendientes:
+            self.stdout.write("No hay imágenes pendientes.")
+            return
+
+        listos, errores = {}, 0
+        # Cada proceso solo lee y escribe archivos; las marcas en BD se hacen aquí
+        with ProcessPoolExecutor(max_workers=options['procesos'], initializer=django.setup) as procesos:
+            futuros = {procesos.submit(generar_variantes, nombre): pk for pk, nombre in pendientes.items()}
+            for futuro in as_completed(futuros):
+                pk = futuros[futuro]
+                try:
+                    listos[pk] = futuro.result()
+                except Exception as error:
+                    errores += 1
+                    self.stderr.write(f"Producto {pk} ({pendientes[pk]}): {error}")
+
+        # Cada producto con la huella de sus variantes (va en los nombres de archivo)
+        Producto.objects.bulk_update(
+            [Producto(pk=pk, imagen_variantes=True, imagen_huella=huella) for pk, huella in listos.items()],
+            ['imagen_variantes', 'imagen_huella'],
+            batch_size=500,
+        )
+        if listos:
+            # El catálogo cita otras variantes: su ETag debe cambiar
+            marcar_cambio_catalogo()
+
+        self.stdout.write(self.style.SUCCESS(f"Variantes generadas: {len(listos)} productos, {errores} errores."))
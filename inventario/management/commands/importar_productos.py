@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.importacion import TAMANO_LOTE, ErrorImportacion, importar_productos, leer_archivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos y entradas de stock desde un CSV o XLSX "
+        "(columnas: nombre, variacion, categoria, precio, cantidad)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta al archivo .csv o .xlsx.")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas por transacción.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_productos(leer_archivo(archivo, options['archivo']), options['lote'])
+        except (OSError, ErrorImportacion) as error:
+            raise CommandError(str(error))
+
+        for numero, motivo in resultado.errores[:50]:
+            self.stderr.write(f"Fila {numero}: {motivo}")
+        if len(resultado.errores) > 50:
+            self.stderr.write(f"... y {len(resultado.errores) - 50} errores más.")
+        self.stdout.write(self.style.SUCCESS(str(resultado)))
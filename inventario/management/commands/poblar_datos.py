@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.sintetico import limpiar_inventario, poblar
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos a escala de producción (categorías, productos y ventas con "
+        "popularidad tipo Zipf y estacionalidad semanal) para pruebas de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', type=int, default=30)
+        parser.add_argument('--productos', type=int, default=100_000)
+        parser.add_argument('--ventas', type=int, default=1_000_000)
+        parser.add_argument('--dias', type=int, default=730, help="Días de historial de ventas hacia atrás desde hoy.")
+        parser.add_argument('--semilla', type=int, default=42, help="Misma semilla, mismos datos.")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por inserción masiva (y por transacción).")
+        parser.add_argument(
+            '--limpiar', action='store_true',
+            help="Borra antes TODAS las ventas, productos y categorías existentes.",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['categorias'], options['productos'], options['dias'], options['lote']) < 1 or options['ventas'] < 0:
+            raise CommandError("Los volúmenes deben ser positivos.")
+
+        if options['limpiar']:
+            self.stdout.write("Borrando el inventario existente...")
+            limpiar_inventario()
+
+        inicio = time.monotonic()
+        ultimo = {}
+
+        def progreso(etapa, hechos, total):
+            # Una línea cada ~10 % por etapa
+            paso = max(total // 10, 1)
+            if hechos // paso != ultimo.get(etapa) or hechos == total:
+                ultimo[etapa] = hechos // paso
+                self.stdout.write(f"  {etapa}: {hechos:,}/{total:,} ({time.monotonic() - inicio:.0f} s)")
+
+        creado = poblar(
+            categorias=options['categorias'],
+            productos=options['productos'],
+            ventas=options['ventas'],
+            dias=options['dias'],
+            semilla=options['semilla'],
+            lote=options['lote'],
+            progreso=progreso,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {time.monotonic() - inicio:.0f} s: {creado['categorias']} categorías, "
+            f"{creado['productos']:,} productos, {creado['ventas']:,} ventas, "
+            f"{creado['filas_resumen']:,} filas de resumen diario."
+        ))
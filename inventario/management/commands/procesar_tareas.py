@@ -0,0 +1,50 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from inventario.tareas import ejecutar_pendientes, purgar_terminadas, recuperar_abandonadas, trabajar
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta la cola de tareas en segundo plano (exportaciones, importaciones, variantes de imagen). "
+        "Se pueden correr varios procesos a la vez: cada tarea la toma uno solo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=2, help="Tareas en paralelo en este proceso.")
+        parser.add_argument('--espera', type=float, default=2.0, help="Segundos entre consultas con la cola vacía.")
+        parser.add_argument('--una-vez', action='store_true', help="Vacía la cola y termina (para cron o pruebas).")
+        parser.add_argument('--purgar', type=int, metavar='DIAS', help="Borra antes las tareas terminadas hace más de DIAS días.")
+
+    def handle(self, *args, **options):
+        if options['purgar'] is not None:
+            self.stdout.write(f"Tareas viejas borradas: {purgar_terminadas(options['purgar'])}.")
+        recuperadas = recuperar_abandonadas()
+        if recuperadas:
+            self.stdout.write(f"Tareas abandonadas recuperadas: {recuperadas}.")
+
+        if options['una_vez']:
+            self.stdout.write(self.style.SUCCESS(f"Tareas ejecutadas: {ejecutar_pendientes()}."))
+            return
+
+        detener = threading.Event()
+        hilos = [
+            threading.Thread(target=trabajar, args=(detener, options['espera']), name=f'tareas-{numero}')
+            for numero in range(options['hilos'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        self.stdout.write(f"Procesando tareas con {len(hilos)} hilos (Ctrl+C para terminar)...")
+        try:
+            while True:
+                # Cada tanto, las tareas de un trabajador caído vuelven a la cola
+                if detener.wait(60):
+                    break
+                recuperar_abandonadas()
+        except KeyboardInterrupt:
+            self.stdout.write("Terminando: se esperan las tareas en curso...")
+        finally:
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
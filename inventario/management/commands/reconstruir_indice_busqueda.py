@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from inventario.busqueda import asegurar_indice, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda (FTS5) de productos desde las tablas del inventario."
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("El índice FTS5 solo existe en SQLite; en otros motores la búsqueda usa icontains.")
+        with transaction.atomic():
+            # Crea la tabla y los triggers si faltan (p. ej. base restaurada sin ellos)
+            asegurar_indice()
+            indexados = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido: {indexados} productos."))
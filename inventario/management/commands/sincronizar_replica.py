@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from inventario.routers import ALIAS_REPLICA
+from panalera_project.db_sqlite.replica import copiar_base
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base primaria sobre la réplica de lectura (SQLITE_REPLICA_PATH) con la API de "
+        "backup de SQLite. Con --intervalo se repite indefinidamente, como una replicación local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=0, help="Segundos entre copias (0 = una sola copia).")
+        parser.add_argument('--paginas', type=int, default=-1, help="Páginas por paso de la copia (-1 = todas de una vez).")
+
+    def handle(self, *args, **options):
+        if ALIAS_REPLICA not in settings.DATABASES:
+            raise CommandError("No hay réplica configurada: define SQLITE_REPLICA_PATH.")
+        origen = settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        destino = settings.DATABASES[ALIAS_REPLICA]['NAME']
+        if str(origen) == str(destino):
+            raise CommandError("La réplica no puede ser el mismo archivo que la primaria.")
+        espera = settings.DATABASES[ALIAS_REPLICA]['OPTIONS'].get('pragmas', {}).get('busy_timeout', 5000)
+
+        try:
+            while True:
+                segundos = copiar_base(origen, destino, options['paginas'], espera)
+                self.stdout.write(f"{time.strftime('%H:%M:%S')} réplica actualizada en {segundos:.2f} s")
+                if options['intervalo'] <= 0:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Sincronización detenida.")
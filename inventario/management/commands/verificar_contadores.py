@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.contadores import diferencias_contadores, reparar_contadores
+
+
+class Command(BaseCommand):
+    help = "Compara los contadores de cada categoría (productos, con stock, unidades, valor) con sus productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help="Reescribe los contadores que no coinciden.")
+
+    def handle(self, *args, **options):
+        diferencias = diferencias_contadores()
+        for categoria, guardado, real in diferencias:
+            self.stdout.write(f"{categoria.nombre}: guardado {guardado}, real {real}")
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("Los contadores de las categorías están al día."))
+        elif options['reparar']:
+            reparadas = reparar_contadores(diferencias)
+            self.stdout.write(self.style.SUCCESS(f"Contadores reparados en {reparadas} categorías."))
+        else:
+            raise CommandError(f"{len(diferencias)} categorías con contadores desfasados (usa --reparar).")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.movimientos import diferencias_stock, reparar_stock
+
+
+class Command(BaseCommand):
+    help = "Compara Producto.stock con el libro de movimientos (último corte + movimientos posteriores)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help="Reescribe el stock de los productos que no coinciden.")
+        parser.add_argument('--mostrar', type=int, default=20, help="Diferencias a listar.")
+
+    def handle(self, *args, **options):
+        diferencias = diferencias_stock()
+        for producto_id, stock, stock_libro in diferencias[:options['mostrar']]:
+            self.stdout.write(f"Producto #{producto_id}: stock {stock}, libro {stock_libro}")
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("El stock coincide con el libro de movimientos."))
+        elif options['reparar']:
+            reparados = reparar_stock([producto_id for producto_id, _, _ in diferencias])
+            self.stdout.write(self.style.SUCCESS(f"Stock reparado desde el libro en {reparados} productos."))
+        else:
+            raise CommandError(f"{len(diferencias)} productos no coinciden con el libro (usa --reparar).")
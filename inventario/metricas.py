@@ -0,0 +1,186 @@
+"""
+Métricas SQL y de plantillas por petición.
+
+MetricasSQLMiddleware envuelve cada consulta con `connection.execute_wrapper`
+y cuenta consultas, tiempo total en la base de datos y consultas repetidas
+(la misma SQL con otros parámetros, la firma de un N+1). DjangoTemplatesMedidas
+(backend de plantillas) suma el tiempo de render. El resultado sale en la
+cabecera `Server-Timing` (visible en las DevTools del navegador) y en una
+línea de log JSON en el logger `inventario.metricas`.
+
+Se activa con METRICAS_SQL = True en settings (por defecto, igual que DEBUG).
+
+La medición de consultas se instala una vez en cada conexión que se abre
+(señal connection_created) y solo cuenta dentro de una petición medida: la
+petición en curso es un ContextVar, que sync_to_async lleva al hilo donde
+corre el ORM. Así el middleware funciona en modo síncrono y async, y bajo
+ASGI no obliga a Django a ejecutar la cadena de middlewares en un hilo.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# Métricas de la petición en curso (None fuera de una petición medida)
+_actual = ContextVar('metricas_peticion', default=None)
+
+
+class MetricasPeticion:
+    """ Acumulador de una petición: consultas, tiempos y SQL repetidas. """
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.sentencias = Counter()
+
+    @property
+    def repetidas(self):
+        """ Consultas de más: ejecuciones de una misma SQL después de la primera. """
+        return sum(veces - 1 for veces in self.sentencias.values() if veces > 1)
+
+    def mas_repetida(self):
+        if not self.sentencias:
+            return None, 0
+        return self.sentencias.most_common(1)[0]
+
+
+def metricas_actuales():
+    """ Métricas de la petición en curso, o None si no se están midiendo. """
+    return _actual.get()
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    metricas = _actual.get()
+    if metricas is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metricas.tiempo_sql += time.perf_counter() - inicio
+        metricas.consultas += 1
+        metricas.sentencias[sql] += 1
+
+
+@receiver(connection_created)
+def instalar_medicion(sender, connection, **kwargs):
+    # Una vez por conexión (el mismo objeto vuelve a conectarse tras cerrarse);
+    # fuera de una petición medida solo cuesta leer el ContextVar
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+class _PlantillaMedida:
+    """ Envuelve una plantilla del backend para sumar su tiempo de render. """
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        metricas = _actual.get()
+        if metricas is None:
+            return self.plantilla.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            metricas.tiempo_plantillas += time.perf_counter() - inicio
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """
+    Backend DjangoTemplates que mide el render de cada plantilla de primer
+    nivel (los {% include %} y {% extends %} quedan dentro de ese tiempo).
+    Ojo: incluye las consultas de los querysets que se evalúan en la plantilla.
+    """
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
+
+
+class MetricasSQLMiddleware:
+    """
+    Mide cada petición y publica Server-Timing y un log estructurado.
+    Funciona en modo síncrono y async (como PerfiladoMiddleware), así que
+    bajo ASGI las vistas async siguen corriendo en el bucle de eventos.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_SQL', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # A partir de cuántas repeticiones de una SQL se avisa como posible N+1
+        self.umbral_repetidas = getattr(settings, 'METRICAS_SQL_UMBRAL_REPETIDAS', 5)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metricas = MetricasPeticion()
+        token = _actual.set(metricas)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._terminar(request, response, metricas, inicio)
+
+    async def __acall__(self, request):
+        metricas = MetricasPeticion()
+        token = _actual.set(metricas)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._terminar(request, response, metricas, inicio)
+
+    def _terminar(self, request, response, metricas, inicio):
+        total = time.perf_counter() - inicio
+
+        # Las respuestas en streaming consultan al iterarse: aquí solo se mide hasta el primer byte
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metricas.tiempo_sql * 1000:.1f};desc="{metricas.consultas} consultas"',
+            f'tpl;dur={metricas.tiempo_plantillas * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        self._registrar(request, response, metricas, total)
+        return response
+
+    def _registrar(self, request, response, metricas, total):
+        sentencia, veces = metricas.mas_repetida()
+        registro = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'consultas': metricas.consultas,
+            'repetidas': metricas.repetidas,
+            'sql_ms': round(metricas.tiempo_sql * 1000, 1),
+            'plantillas_ms': round(metricas.tiempo_plantillas * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }
+        if veces >= self.umbral_repetidas:
+            registro['sql_mas_repetida'] = {'veces': veces, 'sql': sentencia[:300]}
+            logger.warning("posible N+1 %s", json.dumps(registro, ensure_ascii=False), extra={'metricas': registro})
+        else:
+            logger.info("peticion %s", json.dumps(registro, ensure_ascii=False), extra={'metricas': registro})
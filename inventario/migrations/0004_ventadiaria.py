@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def rellenar_textos_nulos(apps, schema_editor):
+    # Los campos dejan de aceptar NULL: las filas antiguas pasan a cadena vacía
+    apps.get_model('inventario', 'Categoria').objects.filter(descripcion__isnull=True).update(descripcion='')
+    apps.get_model('inventario', 'Producto').objects.filter(variacion__isnull=True).update(variacion='')
+
+
+def calcular_resumen_inicial(apps, schema_editor):
+    # Carga el resumen con el historial de ventas que ya existe
+    Venta = apps.get_model('inventario', 'Venta')
+    VentaDiaria = apps.get_model('inventario', 'VentaDiaria')
+    filas = Venta.objects.values('fecha_venta', 'producto_id').annotate(
+        total_unidades=models.Sum('cantidad'),
+        total_ingresos=models.Sum(models.F('cantidad') * models.F('precio_unitario'), output_field=models.DecimalField()),
+        total_transacciones=models.Count('id'),
+    ).order_by()
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(
+            fecha=fila['fecha_venta'],
+            producto_id=fila['producto_id'],
+            unidades=fila['total_unidades'],
+            ingresos=fila['total_ingresos'],
+            transacciones=fila['total_transacciones'],
+        )
+        for fila in filas.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_alter_producto_categoria'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_textos_nulos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='categoria',
+            name='descripcion',
+            field=models.TextField(blank=True, verbose_name='Descripción'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='variacion',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Variación (ej. Tamaño o Tipo)'),
+        ),
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('unidades', models.IntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('ingresos', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Ingresos')),
+                ('transacciones', models.IntegerField(default=0, verbose_name='Transacciones')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='inventario.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'unique_together': {('fecha', 'producto')},
+            },
+        ),
+        migrations.RunPython(calcular_resumen_inicial, migrations.RunPython.noop),
+    ]
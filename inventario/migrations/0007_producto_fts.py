@@ -0,0 +1,97 @@
+from django.db import migrations
+
+# Índice FTS5 de productos (solo SQLite). El SQL queda congelado aquí; el que
+# usa la aplicación en tiempo de ejecución está en inventario.busqueda.
+# Se mantiene sincronizado con triggers, así también lo cubren las escrituras
+# masivas (bulk_create, update) que no emiten señales de Django.
+# `remove_diacritics 2` hace que "panal" encuentre "pañal".
+
+SQL_TABLA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS inventario_producto_fts USING fts5(
+        nombre, variacion, categoria, categoria_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+# Ningún trigger menciona inventario_producto en su cuerpo: SQLite lo revalidaría
+# al renombrar la tabla durante una migración y la migración fallaría.
+TRIGGERS = {
+    'inventario_producto_fts_insert': """
+        CREATE TRIGGER inventario_producto_fts_insert AFTER INSERT ON inventario_producto BEGIN
+            INSERT INTO inventario_producto_fts(rowid, nombre, variacion, categoria, categoria_id)
+            VALUES (
+                new.id, new.nombre, new.variacion,
+                COALESCE((SELECT nombre FROM inventario_categoria WHERE id = new.categoria_id), ''),
+                new.categoria_id
+            );
+        END
+    """,
+    'inventario_producto_fts_delete': """
+        CREATE TRIGGER inventario_producto_fts_delete AFTER DELETE ON inventario_producto BEGIN
+            DELETE FROM inventario_producto_fts WHERE rowid = old.id;
+        END
+    """,
+    # Solo columnas indexadas: los descuentos de stock de cada venta no tocan el índice
+    'inventario_producto_fts_update': """
+        CREATE TRIGGER inventario_producto_fts_update
+        AFTER UPDATE OF nombre, variacion, categoria_id ON inventario_producto BEGIN
+            UPDATE inventario_producto_fts SET
+                nombre = new.nombre,
+                variacion = new.variacion,
+                categoria = COALESCE((SELECT nombre FROM inventario_categoria WHERE id = new.categoria_id), ''),
+                categoria_id = new.categoria_id
+            WHERE rowid = new.id;
+        END
+    """,
+    'inventario_categoria_fts_update': """
+        CREATE TRIGGER inventario_categoria_fts_update AFTER UPDATE OF nombre ON inventario_categoria BEGIN
+            UPDATE inventario_producto_fts SET categoria = new.nombre WHERE categoria_id = new.id;
+        END
+    """,
+}
+
+SQL_LLENAR = (
+    "INSERT INTO inventario_producto_fts(rowid, nombre, variacion, categoria, categoria_id) "
+    "SELECT p.id, p.nombre, p.variacion, COALESCE(c.nombre, ''), p.categoria_id "
+    "FROM inventario_producto p LEFT JOIN inventario_categoria c ON c.id = p.categoria_id"
+)
+
+
+def crear_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in TRIGGERS.values():
+        schema_editor.execute(sql)
+
+
+def quitar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(SQL_TABLA)
+    crear_triggers(apps, schema_editor)
+    schema_editor.execute(SQL_LLENAR)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    quitar_triggers(apps, schema_editor)
+    schema_editor.execute("DROP TABLE IF EXISTS inventario_producto_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_producto_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+# Triggers del índice de búsqueda (0007), copiados aquí: la migración no debe
+# cambiar si luego cambia inventario.busqueda. Los de una tabla desaparecen al
+# reconstruirla y los de la otra la nombran (impiden renombrar la copia), así
+# que se quitan antes y se crean otra vez después.
+#
+# Ningún trigger menciona inventario_producto en su cuerpo: SQLite lo revalidaría
+# al renombrar la tabla durante una migración y la migración fallaría.
+TRIGGERS = {
+    'inventario_producto_fts_insert': """
+        CREATE TRIGGER inventario_producto_fts_insert AFTER INSERT ON inventario_producto BEGIN
+            INSERT INTO inventario_producto_fts(rowid, nombre, variacion, categoria, categoria_id)
+            VALUES (
+                new.id, new.nombre, new.variacion,
+                COALESCE((SELECT nombre FROM inventario_categoria WHERE id = new.categoria_id), ''),
+                new.categoria_id
+            );
+        END
+    """,
+    'inventario_producto_fts_delete': """
+        CREATE TRIGGER inventario_producto_fts_delete AFTER DELETE ON inventario_producto BEGIN
+            DELETE FROM inventario_producto_fts WHERE rowid = old.id;
+        END
+    """,
+    # Solo columnas indexadas: los descuentos de stock de cada venta no tocan el índice
+    'inventario_producto_fts_update': """
+        CREATE TRIGGER inventario_producto_fts_update
+        AFTER UPDATE OF nombre, variacion, categoria_id ON inventario_producto BEGIN
+            UPDATE inventario_producto_fts SET
+                nombre = new.nombre,
+                variacion = new.variacion,
+                categoria = COALESCE((SELECT nombre FROM inventario_categoria WHERE id = new.categoria_id), ''),
+                categoria_id = new.categoria_id
+            WHERE rowid = new.id;
+        END
+    """,
+    'inventario_categoria_fts_update': """
+        CREATE TRIGGER inventario_categoria_fts_update AFTER UPDATE OF nombre ON inventario_categoria BEGIN
+            UPDATE inventario_producto_fts SET categoria = new.nombre WHERE categoria_id = new.id;
+        END
+    """,
+}
+
+
+def crear_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in TRIGGERS.values():
+        schema_editor.execute(sql)
+
+
+def quitar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_producto_fts'),
+    ]
+
+    # SQLite reconstruye inventario_producto para agregar la columna
+    operations = [
+        migrations.RunPython(quitar_triggers, crear_triggers),
+        migrations.AddField(
+            model_name='producto',
+            name='codigo_barras',
+            field=models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Código de Barras'),
+        ),
+        migrations.RunPython(crear_triggers, quitar_triggers),
+    ]
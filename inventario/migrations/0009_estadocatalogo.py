@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def crear_estado(apps, schema_editor):
+    apps.get_model('inventario', 'EstadoCatalogo').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_producto_codigo_barras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Versión')),
+                ('modificado', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Última Modificación')),
+            ],
+            options={
+                'verbose_name': 'Estado del Catálogo',
+                'verbose_name_plural': 'Estado del Catálogo',
+            },
+        ),
+        migrations.RunPython(crear_estado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def saldo_inicial(apps, schema_editor):
+    # El stock existente entra al libro como un ajuste por producto
+    Producto = apps.get_model('inventario', 'Producto')
+    MovimientoStock = apps.get_model('inventario', 'MovimientoStock')
+    pendientes = []
+    for producto_id, stock in Producto.objects.exclude(stock=0).values_list('id', 'stock').iterator(chunk_size=2000):
+        pendientes.append(MovimientoStock(producto_id=producto_id, tipo='ajuste', cantidad=stock, nota='Saldo inicial'))
+        if len(pendientes) >= 2000:
+            MovimientoStock.objects.bulk_create(pendientes)
+            pendientes = []
+    MovimientoStock.objects.bulk_create(pendientes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_estadocatalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('venta', 'Venta'), ('recepcion', 'Recepción'), ('ajuste', 'Ajuste'), ('devolucion', 'Devolución')], max_length=12, verbose_name='Tipo de Movimiento')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('nota', models.CharField(blank=True, max_length=200, verbose_name='Nota')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='inventario.producto', verbose_name='Producto')),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='inventario.venta', verbose_name='Venta')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'indexes': [models.Index(fields=['producto', 'id'], name='movimiento_producto_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CorteStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_movimiento', models.BigIntegerField(verbose_name='Último Movimiento Incluido')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha del Corte')),
+                ('stock', models.IntegerField(verbose_name='Stock al Corte')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cortes_stock', to='inventario.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Corte de Stock',
+                'verbose_name_plural': 'Cortes de Stock',
+                'indexes': [models.Index(fields=['producto', 'ultimo_movimiento'], name='corte_producto_idx'), models.Index(fields=['producto', 'fecha'], name='corte_producto_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(saldo_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_categoria_contadores'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientostock',
+            name='venta',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='movimientos', to='inventario.venta', verbose_name='Venta'),
+        ),
+        migrations.CreateModel(
+            name='VentaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('precio_unitario', models.DecimalField(decimal_places=0, max_digits=10, verbose_name='Precio Unitario de Venta')),
+                ('fecha_venta', models.DateField(verbose_name='Fecha de Venta')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_archivadas', to='inventario.producto', verbose_name='Producto Vendido')),
+            ],
+            options={
+                'verbose_name': 'Venta Archivada',
+                'verbose_name_plural': 'Ventas Archivadas',
+                'indexes': [models.Index(fields=['fecha_venta', 'id'], name='venta_archivada_fecha_idx')],
+            },
+        ),
+    ]
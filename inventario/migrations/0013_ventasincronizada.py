@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:37
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_ventaarchivada'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha_venta',
+            field=models.DateField(default=datetime.date.today, verbose_name='Fecha de Venta'),
+        ),
+        migrations.CreateModel(
+            name='VentaSincronizada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True, verbose_name='Clave de Idempotencia')),
+                ('terminal', models.CharField(blank=True, max_length=50, verbose_name='Caja')),
+                ('recibida', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Recibida')),
+                ('venta', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='sincronizaciones', to='inventario.venta', verbose_name='Venta')),
+            ],
+            options={
+                'verbose_name': 'Venta Sincronizada',
+                'verbose_name_plural': 'Ventas Sincronizadas',
+            },
+        ),
+    ]
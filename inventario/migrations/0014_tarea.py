@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventario', '0013_ventasincronizada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50, verbose_name='Tipo')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('terminada', 'Terminada'), ('fallida', 'Fallida')], default='pendiente', max_length=10, verbose_name='Estado')),
+                ('intentos', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('max_intentos', models.IntegerField(default=3, verbose_name='Intentos Máximos')),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible Desde')),
+                ('progreso', models.IntegerField(blank=True, null=True, verbose_name='Progreso (%)')),
+                ('mensaje', models.CharField(blank=True, max_length=200, verbose_name='Mensaje')),
+                ('resultado', models.CharField(blank=True, max_length=255, verbose_name='Archivo de Resultado')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('creada', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Creada')),
+                ('iniciada', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada')),
+                ('latido', models.DateTimeField(blank=True, null=True, verbose_name='Último Latido')),
+                ('terminada', models.DateTimeField(blank=True, null=True, verbose_name='Terminada')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas', to=settings.AUTH_USER_MODEL, verbose_name='Pedida por')),
+            ],
+            options={
+                'verbose_name': 'Tarea en Segundo Plano',
+                'verbose_name_plural': 'Tareas en Segundo Plano',
+                'indexes': [models.Index(fields=['estado', 'disponible_desde', 'id'], name='tarea_cola_idx')],
+            },
+        ),
+    ]
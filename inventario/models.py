@@ -1,5 +1,8 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User 
+from django.utils import timezone
 
 # Función para definir la ruta de subida de imágenes
 def producto_imagen_path(instance, filename):
@@ -12,6 +15,15 @@ class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True, verbose_name="Nombre de la Categoría")
     descripcion = models.TextField(blank=True, verbose_name="Descripción")
 
+    # Contadores desnormalizados de sus productos (inventario.contadores los mantiene
+    # en la misma transacción de cada cambio; `manage.py verificar_contadores` los repara)
+    productos_total = models.IntegerField(default=0, editable=False, verbose_name="Productos")
+    productos_con_stock = models.IntegerField(default=0, editable=False, verbose_name="Productos con Stock")
+    unidades_stock = models.IntegerField(default=0, editable=False, verbose_name="Unidades en Stock")
+    valor_stock = models.DecimalField(max_digits=16, decimal_places=0, default=0, editable=False, verbose_name="Valor del Stock")
+
+    CONTADORES = ('productos_total', 'productos_con_stock', 'unidades_stock', 'valor_stock')
+
     class Meta:
         verbose_name = "Categoría de Producto"
         # ¡CORRECCIÓN CLAVE! Atributo correcto
@@ -20,6 +32,16 @@ class Categoria(models.Model):
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        # Al editar (formulario, admin) no se escriben los contadores: la instancia
+        # se leyó al inicio de la petición y pisaría las ventas confirmadas desde entonces
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CONTADORES
+            ]
+        super().save(*args, **kwargs)
+
 
 # --- Modelo Producto Actualizado ---
 class Producto(models.Model):
@@ -36,16 +58,30 @@ class Producto(models.Model):
     )
     
     variacion = models.CharField(max_length=100, blank=True, verbose_name="Variación (ej. Tamaño o Tipo)") 
+    # EAN/UPC del empaque; la caja lo busca por coincidencia exacta al escanear
+    codigo_barras = models.CharField(max_length=32, blank=True, db_index=True, verbose_name="Código de Barras")
     
     precio = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Precio Unitario")
     stock = models.IntegerField(default=0, verbose_name="Stock Disponible")
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     imagen = models.ImageField(upload_to=producto_imagen_path, blank=True, null=True, verbose_name="Imagen del Producto")
+    # Lo marca el hilo de fondo cuando las miniaturas WebP/JPEG ya existen
+    imagen_variantes = models.BooleanField(default=False, editable=False, verbose_name="Variantes de Imagen Generadas")
+    # Huella del contenido de las variantes: va en sus nombres (caché inmutable)
+    imagen_huella = models.CharField(max_length=12, blank=True, editable=False, verbose_name="Huella de las Variantes")
 
     class Meta:
         verbose_name = "Producto"
         # ¡CORRECCIÓN CLAVE! Atributo correcto
         verbose_name_plural = "Productos"
+        indexes = [
+            # Orden del catálogo y del dashboard, y cursor (nombre, id) de la paginación
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_idx'),
+            # Catálogo filtrado por categoría, en el mismo orden
+            models.Index(fields=['categoria', 'nombre', 'id'], name='producto_cat_nombre_idx'),
+            # Alerta de stock bajo (stock < umbral ORDER BY stock)
+            models.Index(fields=['stock'], name='producto_stock_idx'),
+        ]
 
     def __str__(self):
         # Muestra el nombre de la categoría o 'Sin Clase' si es nula
@@ -57,12 +93,19 @@ class Venta(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, verbose_name="Producto Vendido")
     cantidad = models.IntegerField(verbose_name="Cantidad")
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Precio Unitario de Venta")
-    fecha_venta = models.DateField(auto_now_add=True, verbose_name="Fecha de Venta")
+    # Hoy por defecto; las cajas que sincronizan ventas hechas sin conexión traen su fecha
+    fecha_venta = models.DateField(default=datetime.date.today, verbose_name="Fecha de Venta")
 
     class Meta:
         verbose_name = "Venta"
         # ¡CORRECCIÓN CLAVE! Atributo correcto
         verbose_name_plural = "Ventas"
+        indexes = [
+            # Rangos de fecha del reporte y del admin, y cursor (fecha, id) del historial
+            models.Index(fields=['fecha_venta', 'id'], name='venta_fecha_idx'),
+            # Ventas de un producto en un rango de fechas
+            models.Index(fields=['producto', 'fecha_venta'], name='venta_producto_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"Venta de {self.cantidad}x {self.producto.nombre}"
@@ -70,3 +113,194 @@ class Venta(models.Model):
     @property
     def total_venta(self):
         return self.cantidad * self.precio_unitario
+
+
+# --- Ventas de meses cerrados, movidas fuera de Venta por `manage.py archivar_ventas` ---
+class VentaArchivada(models.Model):
+    # Mismo id que tenía en Venta: los movimientos de stock siguen apuntando a él
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ventas_archivadas', verbose_name="Producto Vendido")
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Precio Unitario de Venta")
+    fecha_venta = models.DateField(verbose_name="Fecha de Venta")
+
+    class Meta:
+        verbose_name = "Venta Archivada"
+        verbose_name_plural = "Ventas Archivadas"
+        indexes = [
+            models.Index(fields=['fecha_venta', 'id'], name='venta_archivada_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Venta archivada de {self.cantidad}x producto #{self.producto_id}"
+
+    @property
+    def total_venta(self):
+        return self.cantidad * self.precio_unitario
+
+
+# --- Claves de idempotencia de las ventas sincronizadas por las cajas (inventario.ventas) ---
+class VentaSincronizada(models.Model):
+    # La caja genera la clave al vender: un reintento con la misma clave no vuelve a registrar la venta
+    clave = models.CharField(max_length=64, unique=True, verbose_name="Clave de Idempotencia")
+    terminal = models.CharField(max_length=50, blank=True, verbose_name="Caja")
+    # Sin restricción en la base, como en MovimientoStock: la venta puede estar archivada
+    venta = models.ForeignKey(
+        Venta, on_delete=models.DO_NOTHING, db_constraint=False, related_name='sincronizaciones', verbose_name="Venta",
+    )
+    recibida = models.DateTimeField(default=timezone.now, verbose_name="Recibida")
+
+    class Meta:
+        verbose_name = "Venta Sincronizada"
+        verbose_name_plural = "Ventas Sincronizadas"
+
+    def __str__(self):
+        return f"{self.clave} -> venta #{self.venta_id}"
+
+
+# --- Resumen diario de ventas (tabla precalculada para KPIs y reportes) ---
+class VentaDiaria(models.Model):
+    # Una fila por producto y día; se actualiza en la misma transacción de cada venta
+    fecha = models.DateField(verbose_name="Fecha")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='resumenes_diarios', verbose_name="Producto")
+    unidades = models.IntegerField(default=0, verbose_name="Unidades Vendidas")
+    ingresos = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name="Ingresos")
+    transacciones = models.IntegerField(default=0, verbose_name="Transacciones")
+
+    class Meta:
+        verbose_name = "Resumen Diario de Ventas"
+        verbose_name_plural = "Resúmenes Diarios de Ventas"
+        unique_together = ('fecha', 'producto')
+
+    def __str__(self):
+        return f"{self.fecha} - producto {self.producto_id}: {self.unidades} uds"
+
+
+# --- Versión del catálogo (una sola fila) para las respuestas condicionales de la API ---
+class EstadoCatalogo(models.Model):
+    # Sube en la misma transacción que cualquier cambio de productos, categorías o stock
+    version = models.BigIntegerField(default=0, verbose_name="Versión")
+    modificado = models.DateTimeField(default=timezone.now, verbose_name="Última Modificación")
+
+    class Meta:
+        verbose_name = "Estado del Catálogo"
+        verbose_name_plural = "Estado del Catálogo"
+
+    def __str__(self):
+        return f"Catálogo v{self.version} ({self.modificado:%Y-%m-%d %H:%M:%S})"
+
+
+# --- Libro de movimientos de stock (solo se agregan filas) ---
+class MovimientoStock(models.Model):
+    VENTA = 'venta'
+    RECEPCION = 'recepcion'
+    AJUSTE = 'ajuste'
+    DEVOLUCION = 'devolucion'
+    TIPOS = [
+        (VENTA, 'Venta'),
+        (RECEPCION, 'Recepción'),
+        (AJUSTE, 'Ajuste'),
+        (DEVOLUCION, 'Devolución'),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos', verbose_name="Producto")
+    tipo = models.CharField(max_length=12, choices=TIPOS, verbose_name="Tipo de Movimiento")
+    # Con signo: positivo entra al stock, negativo sale
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+    fecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+    # Sin restricción en la base: al archivar la venta el id sigue siendo válido en VentaArchivada
+    venta = models.ForeignKey(
+        Venta, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+        related_name='movimientos', verbose_name="Venta",
+    )
+    nota = models.CharField(max_length=200, blank=True, verbose_name="Nota")
+
+    class Meta:
+        verbose_name = "Movimiento de Stock"
+        verbose_name_plural = "Movimientos de Stock"
+        indexes = [
+            # Movimientos de un producto posteriores a su último corte (el id da el orden del libro)
+            models.Index(fields=['producto', 'id'], name='movimiento_producto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad:+d} producto #{self.producto_id}"
+
+    def save(self, *args, **kwargs):
+        # El libro no se corrige editando filas: un error se compensa con otro movimiento
+        if not self._state.adding:
+            raise ValueError("Los movimientos de stock no se modifican; registra un ajuste.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Los movimientos de stock no se borran; registra un ajuste.")
+
+
+# --- Corte periódico del libro: stock de cada producto hasta un movimiento ---
+class CorteStock(models.Model):
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='cortes_stock', verbose_name="Producto")
+    # Incluye todos los movimientos del producto con id <= ultimo_movimiento
+    ultimo_movimiento = models.BigIntegerField(verbose_name="Último Movimiento Incluido")
+    fecha = models.DateTimeField(verbose_name="Fecha del Corte")
+    stock = models.IntegerField(verbose_name="Stock al Corte")
+
+    class Meta:
+        verbose_name = "Corte de Stock"
+        verbose_name_plural = "Cortes de Stock"
+        indexes = [
+            models.Index(fields=['producto', 'ultimo_movimiento'], name='corte_producto_idx'),
+            models.Index(fields=['producto', 'fecha'], name='corte_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Corte {self.fecha:%Y-%m-%d %H:%M} producto #{self.producto_id}: {self.stock}"
+
+
+# --- Cola de tareas en segundo plano (inventario.tareas) ---
+class Tarea(models.Model):
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    TERMINADA = 'terminada'
+    FALLIDA = 'fallida'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (TERMINADA, 'Terminada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    tipo = models.CharField(max_length=50, verbose_name="Tipo")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    usuario = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas', verbose_name="Pedida por"
+    )
+    intentos = models.IntegerField(default=0, verbose_name="Intentos")
+    max_intentos = models.IntegerField(default=3, verbose_name="Intentos Máximos")
+    # Un reintento espera hasta esta fecha antes de volver a tomarse
+    disponible_desde = models.DateTimeField(default=timezone.now, verbose_name="Disponible Desde")
+    progreso = models.IntegerField(null=True, blank=True, verbose_name="Progreso (%)")
+    mensaje = models.CharField(max_length=200, blank=True, verbose_name="Mensaje")
+    # Ruta relativa a TAREAS_DIR del archivo generado (exportaciones, errores de importación)
+    resultado = models.CharField(max_length=255, blank=True, verbose_name="Archivo de Resultado")
+    error = models.TextField(blank=True, verbose_name="Último Error")
+    creada = models.DateTimeField(default=timezone.now, verbose_name="Creada")
+    iniciada = models.DateTimeField(null=True, blank=True, verbose_name="Iniciada")
+    # Lo renueva el trabajador al informar progreso; sin latido reciente la tarea se da por abandonada
+    latido = models.DateTimeField(null=True, blank=True, verbose_name="Último Latido")
+    terminada = models.DateTimeField(null=True, blank=True, verbose_name="Terminada")
+
+    class Meta:
+        verbose_name = "Tarea en Segundo Plano"
+        verbose_name_plural = "Tareas en Segundo Plano"
+        indexes = [
+            # Siguiente tarea disponible: estado = pendiente, disponible_desde <= ahora, en orden
+            models.Index(fields=['estado', 'disponible_desde', 'id'], name='tarea_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def activa(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
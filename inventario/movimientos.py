@@ -0,0 +1,190 @@
+"""
+Libro de movimientos de stock (MovimientoStock) y cortes periódicos.
+
+Cada entrada o salida de unidades (venta, recepción, ajuste, devolución) se
+agrega al libro en la misma transacción que cambia `Producto.stock`, que pasa
+a ser un valor materializado del libro: se modifica siempre con un UPDATE
+relativo (stock = stock + n), nunca sobrescribiendo el número con save().
+
+Para no sumar toda la historia, `manage.py cortar_stock` guarda cortes
+(CorteStock): el stock de cada producto hasta un id del libro. El stock
+según el libro, actual o a una fecha, es el último corte más los
+movimientos posteriores a él. `manage.py verificar_stock` compara ese valor
+con `Producto.stock` y, con --reparar, corrige las diferencias.
+"""
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .contadores import aplicar_deltas, recalcular_contadores, sumar_producto
+from .kpis import invalidar_kpis
+from .models import CorteStock, MovimientoStock, Producto
+from .version_catalogo import marcar_cambio_catalogo
+
+
+# =======================================================
+# --- ESCRITURA ---
+# =======================================================
+
+def anotar_movimientos(movimientos):
+    """
+    Agrega al libro movimientos cuyo efecto en Producto.stock ya aplicó el
+    llamador (p. ej. el UPDATE condicional de las ventas). Debe llamarse dentro
+    de la misma transacción que ese UPDATE.
+    """
+    return MovimientoStock.objects.bulk_create(movimientos)
+
+
+def aplicar_movimientos(movimientos):
+    """
+    Suma cada movimiento a Producto.stock (un UPDATE relativo con CASE para
+    todo el lote) y lo agrega al libro, en una sola transacción. También
+    ajusta los contadores de las categorías afectadas y, como el stock es
+    parte del catálogo, sube su versión e invalida los KPIs.
+    """
+    deltas = {}
+    for movimiento in movimientos:
+        deltas[movimiento.producto_id] = deltas.get(movimiento.producto_id, 0) + movimiento.cantidad
+    deltas = {producto_id: delta for producto_id, delta in deltas.items() if delta}
+
+    with transaction.atomic():
+        if deltas:
+            Producto.objects.filter(pk__in=list(deltas)).update(stock=F('stock') + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ))
+            contadores = {}
+            for categoria_id, stock, precio, producto_id in Producto.objects.filter(
+                pk__in=list(deltas)
+            ).values_list('categoria_id', 'stock', 'precio', 'id'):
+                sumar_producto(contadores, categoria_id, stock - deltas[producto_id], precio, signo=-1)
+                sumar_producto(contadores, categoria_id, stock, precio)
+            aplicar_deltas(contadores)
+            marcar_cambio_catalogo()
+            transaction.on_commit(invalidar_kpis)
+        return anotar_movimientos(movimientos)
+
+
+def registrar_movimiento(producto_id, tipo, cantidad, nota=''):
+    """ Aplica y registra un único movimiento (recepción, ajuste, devolución...). """
+    return aplicar_movimientos([MovimientoStock(producto_id=producto_id, tipo=tipo, cantidad=cantidad, nota=nota)])[0]
+
+
+def _campos_sin_stock():
+    return [campo.name for campo in Producto._meta.concrete_fields if not campo.primary_key and campo.name != 'stock']
+
+
+def guardar_producto(producto, stock_anterior=None):
+    """
+    Guarda un producto editado en un formulario (vista o admin). Un producto
+    nuevo registra su stock inicial como recepción. En uno existente el resto
+    de campos se guarda sin tocar la columna stock y la diferencia con
+    `stock_anterior` se aplica como ajuste relativo, que queda en el libro.
+    """
+    with transaction.atomic():
+        if producto._state.adding:
+            producto.save()
+            if producto.stock:
+                anotar_movimientos([MovimientoStock(
+                    producto=producto, tipo=MovimientoStock.RECEPCION, cantidad=producto.stock, nota='Stock inicial',
+                )])
+            return producto
+
+        ajuste = producto.stock - stock_anterior if stock_anterior is not None else 0
+        producto.save(update_fields=_campos_sin_stock())
+        if ajuste:
+            registrar_movimiento(producto.pk, MovimientoStock.AJUSTE, ajuste, nota='Edición del producto')
+        producto.stock = Producto.objects.values_list('stock', flat=True).get(pk=producto.pk)
+    return producto
+
+
+# =======================================================
+# --- STOCK SEGÚN EL LIBRO ---
+# =======================================================
+
+def _ultimo_corte(producto, momento=None):
+    cortes = CorteStock.objects.filter(producto=producto)
+    if momento is not None:
+        cortes = cortes.filter(fecha__lte=momento)
+    return cortes.order_by('-ultimo_movimiento')
+
+
+def stock_segun_libro(momento=None, hasta_movimiento=None):
+    """
+    Expresión para anotar un queryset de Producto con su stock según el libro:
+    último corte (hasta `momento`) + movimientos posteriores a ese corte (hasta
+    `momento` y hasta el id `hasta_movimiento`). Con los índices
+    (producto, ultimo_movimiento) y (producto, id) solo se leen los movimientos
+    recientes de cada producto, no su historia completa.
+    """
+    desde = Coalesce(Subquery(_ultimo_corte(OuterRef(OuterRef('pk')), momento).values('ultimo_movimiento')[:1]), 0)
+    recientes = MovimientoStock.objects.filter(producto=OuterRef('pk'), id__gt=desde)
+    if momento is not None:
+        recientes = recientes.filter(fecha__lte=momento)
+    if hasta_movimiento is not None:
+        recientes = recientes.filter(id__lte=hasta_movimiento)
+    suma = recientes.values('producto').annotate(total=Sum('cantidad')).values('total')
+
+    base = Subquery(_ultimo_corte(OuterRef('pk'), momento).values('stock')[:1])
+    return Coalesce(base, 0) + Coalesce(Subquery(suma), 0)
+
+
+def stock_al(producto_id, momento):
+    """ Stock del producto al `momento` (datetime) dado, según el libro. """
+    return Producto.objects.filter(pk=producto_id).annotate(
+        stock_libro=stock_segun_libro(momento)
+    ).values_list('stock_libro', flat=True).get()
+
+
+def diferencias_stock():
+    """ Productos cuyo stock materializado no coincide con el libro: [(id, stock, stock_libro)]. """
+    return list(
+        Producto.objects.annotate(stock_libro=stock_segun_libro())
+        .exclude(stock=F('stock_libro'))
+        .order_by('id')
+        .values_list('id', 'stock', 'stock_libro')
+    )
+
+
+def reparar_stock(producto_ids):
+    """ Reescribe Producto.stock desde el libro para los productos dados (y recalcula los contadores). """
+    with transaction.atomic():
+        reparados = Producto.objects.filter(pk__in=producto_ids).update(stock=stock_segun_libro())
+        recalcular_contadores()
+    return reparados
+
+
+# =======================================================
+# --- CORTES ---
+# =======================================================
+
+def tomar_corte(lote=2000):
+    """
+    Guarda un corte del libro hasta su último movimiento, solo para los
+    productos con movimientos desde su corte anterior. La transacción toma
+    el candado de escritura (BEGIN IMMEDIATE): ninguna venta puede quedar a
+    medio confirmar con un id menor que el del corte. Devuelve las filas creadas.
+    """
+    with transaction.atomic():
+        ultimo = MovimientoStock.objects.order_by('-id').values_list('id', 'fecha').first()
+        if ultimo is None:
+            return 0
+        hasta, fecha = ultimo
+
+        desde = Coalesce(Subquery(_ultimo_corte(OuterRef('pk')).values('ultimo_movimiento')[:1]), 0)
+        con_movimientos = MovimientoStock.objects.filter(producto=OuterRef('pk'), id__gt=OuterRef('desde'))
+        productos = (
+            Producto.objects.annotate(desde=desde)
+            .filter(Exists(con_movimientos))
+            .annotate(stock_libro=stock_segun_libro(hasta_movimiento=hasta))
+            .values_list('id', 'stock_libro')
+        )
+
+        # Se materializa antes de insertar: la consulta lee la misma tabla de cortes
+        cortes = [
+            CorteStock(producto_id=producto_id, ultimo_movimiento=hasta, fecha=fecha, stock=stock)
+            for producto_id, stock in productos
+        ]
+        CorteStock.objects.bulk_create(cortes, batch_size=lote)
+    return len(cortes)
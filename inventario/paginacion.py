@@ -0,0 +1,179 @@
+"""
+Paginación por conjunto de claves (keyset / seek) para listados grandes.
+
+En lugar de OFFSET (que obliga a la base de datos a recorrer y descartar
+todas las filas anteriores), cada página se pide "a partir de" los valores
+de ordenación de la última fila vista. Con un índice sobre esas columnas el
+coste de cualquier página es el mismo, sea la primera o la número mil.
+
+También se puede paginar sobre varios querysets a la vez (p. ej. ventas
+activas y archivadas): cada uno trae su página con el mismo cursor y las
+filas se mezclan en Python, sin UNION ni ordenar todo en la base de datos.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+def codificar_cursor(valores):
+    """ Convierte una lista de valores de ordenación en un token seguro para la URL. """
+    crudo = json.dumps(valores, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(crudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, modelo, nombres):
+    """
+    Devuelve la lista de valores del cursor, convertidos al tipo de cada campo
+    de ordenación (`nombres`) de `modelo`, o None si el token no es válido.
+    El cursor viaja en la URL: uno alterado a mano no debe llegar al filtro.
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(nombres):
+        return None
+    try:
+        return [_convertir(modelo._meta.get_field(nombre), valor) for nombre, valor in zip(nombres, valores)]
+    except (ValueError, OverflowError, ValidationError):
+        return None
+
+
+def _convertir(campo, valor):
+    if valor is None:
+        raise ValueError("Cursor con un valor nulo.")
+    valor = campo.to_python(valor)
+    campo.run_validators(valor)
+    # SQLite no declara rango para sus enteros (no hay validador): 64 bits con signo
+    if isinstance(valor, int) and not -2 ** 63 <= valor < 2 ** 63:
+        raise OverflowError("Entero fuera de rango en el cursor.")
+    return valor
+
+
+def _campos(orden):
+    """ Separa ('-fecha', 'id') en [('fecha', True), ('id', False)]. """
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+
+
+def _filtro_seek(campos, valores, hacia_atras):
+    """
+    Construye la condición "fila posterior al cursor" para un orden compuesto:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    condicion = Q()
+    for posicion, (campo, descendente) in enumerate(campos):
+        # Un campo descendente avanza hacia valores menores; al retroceder se invierte
+        operador = 'lt' if descendente != hacia_atras else 'gt'
+        tramo = Q(**{f'{campo}__{operador}': valores[posicion]})
+        for previo in range(posicion):
+            tramo &= Q(**{campos[previo][0]: valores[previo]})
+        condicion |= tramo
+    return condicion
+
+
+def _valor(item, campo):
+    """ Lee un campo tanto de instancias de modelo como de diccionarios de .values(). """
+    if isinstance(item, dict):
+        return item[campo]
+    return getattr(item, campo)
+
+
+class PaginaKeyset:
+    """ Resultado de una página: los elementos y los cursores para moverse. """
+
+    def __init__(self, items, siguiente=None, anterior=None):
+        self.items = items
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def tiene_siguiente(self):
+        return self.siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.anterior is not None
+
+
+def _consulta_keyset(querysets, orden, despues, antes, tamano):
+    """ Devuelve (querysets de la página con una fila de más, campos, valores del cursor, hacia_atras). """
+    campos = _campos(orden)
+    modelo, nombres = querysets[0].model, [campo for campo, _ in campos]
+    valores_antes = decodificar_cursor(antes, modelo, nombres)
+    if valores_antes is not None:
+        orden_inverso = [campo.lstrip('-') if campo.startswith('-') else f'-{campo}' for campo in orden]
+        seek = _filtro_seek(campos, valores_antes, hacia_atras=True)
+        return [qs.filter(seek).order_by(*orden_inverso)[:tamano + 1] for qs in querysets], campos, valores_antes, True
+
+    valores_despues = decodificar_cursor(despues, modelo, nombres)
+    if valores_despues is not None:
+        seek = _filtro_seek(campos, valores_despues, hacia_atras=False)
+        querysets = [qs.filter(seek) for qs in querysets]
+    return [qs.order_by(*orden)[:tamano + 1] for qs in querysets], campos, valores_despues, False
+
+
+def _como_lista(queryset):
+    return list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+
+
+def _mezclar(partes, campos, hacia_atras, tamano):
+    """ Une las filas de cada queryset en el orden de la consulta (ordenaciones estables, del último campo al primero). """
+    if len(partes) == 1:
+        return partes[0]
+    filas = [fila for parte in partes for fila in parte]
+    for campo, descendente in reversed(campos):
+        filas.sort(key=lambda fila: _valor(fila, campo), reverse=descendente != hacia_atras)
+    return filas[:tamano + 1]
+
+
+def _armar_pagina(filas, campos, valores_cursor, hacia_atras, tamano):
+    nombres = [campo for campo, _ in campos]
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    if hacia_atras:
+        filas.reverse()
+        anterior = codificar_cursor([_valor(filas[0], c) for c in nombres]) if hay_mas and filas else None
+        siguiente = codificar_cursor([_valor(filas[-1], c) for c in nombres]) if filas else None
+        return PaginaKeyset(filas, siguiente=siguiente, anterior=anterior)
+
+    siguiente = codificar_cursor([_valor(filas[-1], c) for c in nombres]) if hay_mas else None
+    anterior = codificar_cursor([_valor(filas[0], c) for c in nombres]) if valores_cursor is not None and filas else None
+    return PaginaKeyset(filas, siguiente=siguiente, anterior=anterior)
+
+
+def paginar_keyset(queryset, orden, despues=None, antes=None, tamano=24):
+    """
+    Devuelve una PaginaKeyset de `queryset` ordenado por `orden`. `queryset`
+    puede ser una lista de querysets con los mismos campos de ordenación.
+
+    `orden` debe terminar en una columna única (normalmente 'id') para que el
+    orden sea total. `despues` y `antes` son cursores devueltos por una página
+    previa; si ninguno es válido se devuelve la primera página.
+    """
+    consultas, campos, valores, hacia_atras = _consulta_keyset(_como_lista(queryset), orden, despues, antes, tamano)
+    filas = _mezclar([list(qs) for qs in consultas], campos, hacia_atras, tamano)
+    return _armar_pagina(filas, campos, valores, hacia_atras, tamano)
+
+
+async def apaginar_keyset(queryset, orden, despues=None, antes=None, tamano=24):
+    """ Versión async de paginar_keyset (para vistas async; usa el ORM async). """
+    consultas, campos, valores, hacia_atras = _consulta_keyset(_como_lista(queryset), orden, despues, antes, tamano)
+
+    async def filas(qs):
+        return [fila async for fila in qs]
+
+    partes = [await filas(qs) for qs in consultas]
+    return _armar_pagina(_mezclar(partes, campos, hacia_atras, tamano), campos, valores, hacia_atras, tamano)
@@ -0,0 +1,255 @@
+"""
+Perfilado a pedido de una petición (solo staff).
+
+Cuando una página va lenta en producción, un usuario staff la vuelve a pedir
+con ?perfilar=1 (o con la cabecera X-Perfilar: 1). PerfiladoMiddleware
+ejecuta esa petición bajo cProfile, anota cada consulta SQL con su duración
+y guarda ambos en PERFILES_DIR: el .prof (formato pstats; snakeviz o
+speedscope lo muestran como flame graph) y un .json con la ruta, los tiempos
+y el log de SQL. Se conservan los PERFILES_MAXIMO más recientes y se
+consultan en /perfiles/. La respuesta perfilada lleva la cabecera X-Perfil
+con la página de su perfil.
+
+Sin la marca el middleware solo mira la query string y una cabecera: no
+activa ningún perfilador ni consulta la base de datos. Se perfila una
+petición a la vez por proceso; si ya hay una en curso, la nueva se sirve sin
+perfilar (X-Perfil: ocupado).
+
+Las vistas async se perfilan completas: su corrutina corre en un bucle de
+eventos propio (con su propio perfil) y el trabajo síncrono que hace con
+sync_to_async (ORM, búsquedas) vuelve al hilo de la petición, que es el que
+anota el SQL. Las respuestas en streaming solo se miden hasta el primer byte.
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+# Consultas que se anotan como máximo por perfil
+MAXIMO_CONSULTAS = 2000
+
+# Funciones del resumen de texto (por tiempo acumulado)
+FUNCIONES_RESUMEN = 40
+
+NOMBRE_VALIDO = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{6}-[0-9a-f]{4}$')
+
+logger = logging.getLogger(__name__)
+
+# Una sola petición perfilada a la vez por proceso
+_candado = threading.Lock()
+
+
+def directorio_perfiles():
+    return Path(getattr(settings, 'PERFILES_DIR', Path(settings.BASE_DIR) / 'perfiles'))
+
+
+def pedido(request):
+    """ ¿La petición pide ser perfilada? (no mira al usuario: eso cuesta una consulta) """
+    return 'perfilar' in request.GET or 'HTTP_X_PERFILAR' in request.META
+
+
+# =======================================================
+# --- CAPTURA ---
+# =======================================================
+
+class Perfil:
+    """ Perfiles cProfile (uno por hilo que participa) y log SQL de una petición. """
+
+    def __init__(self, request):
+        self.request = request
+        self.perfiles = []
+        self.consultas = []
+        self.inicio = time.perf_counter()
+
+    def _anotar(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.consultas) < MAXIMO_CONSULTAS:
+                self.consultas.append({
+                    'sql': sql,
+                    'ms': round((time.perf_counter() - inicio) * 1000, 2),
+                    'alias': context['connection'].alias,
+                })
+
+    @contextmanager
+    def en_este_hilo(self, sql=True):
+        """ Perfila este hilo (y, con `sql`, anota las consultas de sus conexiones) mientras dure el bloque. """
+        perfil = cProfile.Profile()
+        self.perfiles.append(perfil)
+        with ExitStack() as pila:
+            if sql:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(self._anotar))
+            perfil.enable()
+            try:
+                yield
+            finally:
+                perfil.disable()
+
+    def guardar(self, respuesta):
+        """ Escribe el .prof y el .json en PERFILES_DIR, aplica la retención y devuelve el nombre. """
+        duracion = time.perf_counter() - self.inicio
+        # Fecha y hora con microsegundos: el orden alfabético de los nombres es el cronológico
+        nombre = f"{timezone.localtime():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:4]}"
+        carpeta = directorio_perfiles()
+        carpeta.mkdir(parents=True, exist_ok=True)
+
+        pstats.Stats(*self.perfiles).dump_stats(carpeta / f'{nombre}.prof')
+        datos = {
+            'nombre': nombre,
+            'creado': timezone.now().isoformat(),
+            'metodo': self.request.method,
+            'ruta': self.request.get_full_path(),
+            'usuario': self.request.user.get_username(),
+            'estado': respuesta.status_code,
+            'total_ms': round(duracion * 1000, 1),
+            'sql_ms': round(sum(consulta['ms'] for consulta in self.consultas), 1),
+            'consultas': self.consultas,
+        }
+        (carpeta / f'{nombre}.json').write_text(json.dumps(datos, ensure_ascii=False), encoding='utf-8')
+        purgar_perfiles()
+        return nombre
+
+
+# =======================================================
+# --- ALMACÉN ---
+# =======================================================
+
+def ruta_perfil(nombre, extension):
+    """ Ruta del .prof o .json de un perfil; FileNotFoundError si el nombre no es válido o no existe. """
+    ruta = directorio_perfiles() / f'{nombre}.{extension}'
+    if not NOMBRE_VALIDO.match(nombre) or not ruta.exists():
+        raise FileNotFoundError(nombre)
+    return ruta
+
+
+def leer_perfil(nombre):
+    return json.loads(ruta_perfil(nombre, 'json').read_text(encoding='utf-8'))
+
+
+def listar_perfiles():
+    """ Perfiles guardados, del más reciente al más antiguo (sin el log SQL). """
+    perfiles = []
+    for ruta in sorted(directorio_perfiles().glob('*.json'), reverse=True):
+        datos = json.loads(ruta.read_text(encoding='utf-8'))
+        datos['total_consultas'] = len(datos.pop('consultas'))
+        perfiles.append(datos)
+    return perfiles
+
+
+def resumen_funciones(nombre, limite=FUNCIONES_RESUMEN):
+    """ Texto de pstats con las funciones de más tiempo acumulado. """
+    salida = io.StringIO()
+    pstats.Stats(str(ruta_perfil(nombre, 'prof')), stream=salida).strip_dirs().sort_stats('cumulative').print_stats(limite)
+    return salida.getvalue()
+
+
+def purgar_perfiles(maximo=None):
+    """ Borra los perfiles más antiguos por encima de PERFILES_MAXIMO. Devuelve cuántos borró. """
+    maximo = getattr(settings, 'PERFILES_MAXIMO', 50) if maximo is None else maximo
+    sobrantes = sorted(directorio_perfiles().glob('*.json'), reverse=True)[maximo:]
+    for ruta in sobrantes:
+        ruta.unlink(missing_ok=True)
+        ruta.with_suffix('.prof').unlink(missing_ok=True)
+    return len(sobrantes)
+
+
+# =======================================================
+# --- MIDDLEWARE ---
+# =======================================================
+
+class PerfiladoMiddleware:
+    """
+    Perfila las peticiones marcadas de usuarios staff. Va al final de
+    MIDDLEWARE (necesita request.user) y funciona en modo síncrono y async,
+    así que no obliga a Django a pasar las vistas async a un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILES', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        else:
+            # Bajo WSGI Django ejecuta las vistas async en un bucle propio, en otro
+            # hilo: se las envuelve aquí para perfilar también ese hilo
+            self.process_view = self._perfilar_vista_async
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not pedido(request) or not request.user.is_staff:
+            return self.get_response(request)
+        if not _candado.acquire(blocking=False):
+            return self._ocupado(self.get_response(request))
+        try:
+            perfil = request._perfil = Perfil(request)
+            with perfil.en_este_hilo():
+                respuesta = self.get_response(request)
+            return self._terminar(perfil, respuesta)
+        finally:
+            _candado.release()
+
+    async def __acall__(self, request):
+        if not pedido(request) or not await sync_to_async(lambda: request.user.is_staff)():
+            return await self.get_response(request)
+        if not _candado.acquire(blocking=False):
+            return self._ocupado(await self.get_response(request))
+        return await sync_to_async(self._perfilar_asincrono, thread_sensitive=False)(request)
+
+    def _perfilar_asincrono(self, request):
+        # En un hilo propio: la cadena async corre en un bucle nuevo y lo síncrono vuelve a este hilo
+        perfil = Perfil(request)
+        try:
+            with perfil.en_este_hilo():
+                respuesta = async_to_sync(self._cadena_perfilada, force_new_loop=True)(perfil, request)
+            return self._terminar(perfil, respuesta)
+        finally:
+            connections.close_all()
+            _candado.release()
+
+    async def _cadena_perfilada(self, perfil, request):
+        with perfil.en_este_hilo(sql=False):
+            return await self.get_response(request)
+
+    def _perfilar_vista_async(self, request, vista, args, kwargs):
+        perfil = getattr(request, '_perfil', None)
+        if perfil is None or not iscoroutinefunction(vista):
+            return None
+
+        async def vista_perfilada():
+            with perfil.en_este_hilo(sql=False):
+                return await vista(request, *args, **kwargs)
+        return async_to_sync(vista_perfilada)()
+
+    def _terminar(self, perfil, respuesta):
+        try:
+            nombre = perfil.guardar(respuesta)
+        except OSError:
+            logger.exception("No se pudo guardar el perfil de %s", perfil.request.path)
+            return respuesta
+        respuesta['X-Perfil'] = reverse('perfil_detalle', args=[nombre])
+        return respuesta
+
+    def _ocupado(self, respuesta):
+        respuesta['X-Perfil'] = 'ocupado'
+        return respuesta
@@ -0,0 +1,94 @@
+"""
+Resumen diario de ventas por producto (tabla VentaDiaria).
+
+Los KPIs y reportes leen esta tabla (una fila por producto y día) en lugar
+de sumar toda la tabla Venta en cada carga. Se mantiene de forma incremental
+desde inventario.ventas y se puede reconstruir con el comando
+`manage.py reconstruir_resumen_ventas` (que también lee las ventas archivadas).
+"""
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+
+from .archivo import recorrer_en_orden, ventas_en_rango
+from .models import VentaDiaria
+
+
+def acumular_ventas(ventas):
+    """
+    Suma un lote de ventas recién insertadas al resumen diario.
+    Debe llamarse dentro de la misma transacción que insertó las ventas.
+    """
+    acumulado = {}
+    for venta in ventas:
+        clave = (venta.fecha_venta, venta.producto_id)
+        unidades, ingresos, transacciones = acumulado.get(clave, (0, 0, 0))
+        acumulado[clave] = (unidades + venta.cantidad, ingresos + venta.total_venta, transacciones + 1)
+
+    nuevos = []
+    for (fecha, producto_id), (unidades, ingresos, transacciones) in acumulado.items():
+        actualizados = VentaDiaria.objects.filter(fecha=fecha, producto_id=producto_id).update(
+            unidades=F('unidades') + unidades,
+            ingresos=F('ingresos') + ingresos,
+            transacciones=F('transacciones') + transacciones,
+        )
+        if not actualizados:
+            nuevos.append(VentaDiaria(
+                fecha=fecha,
+                producto_id=producto_id,
+                unidades=unidades,
+                ingresos=ingresos,
+                transacciones=transacciones,
+            ))
+    if nuevos:
+        VentaDiaria.objects.bulk_create(nuevos)
+
+
+def filas_resumen(ventas):
+    """ Agrupa un queryset de Venta (o VentaArchivada) en filas (fecha, producto) listas para VentaDiaria. """
+    return ventas.values('fecha_venta', 'producto_id').annotate(
+        total_unidades=Sum('cantidad'),
+        total_ingresos=Sum(F('cantidad') * F('precio_unitario'), output_field=DecimalField()),
+        total_transacciones=Count('id'),
+    ).order_by('fecha_venta', 'producto_id')
+
+
+def reconstruir_resumen(desde=None, hasta=None, lote=1000):
+    """
+    Recalcula el resumen para el rango de fechas dado (ambos extremos incluidos;
+    sin rango se recalcula todo). Devuelve el número de filas escritas.
+    """
+    resumenes = VentaDiaria.objects.all()
+    if desde:
+        resumenes = resumenes.filter(fecha__gte=desde)
+    if hasta:
+        resumenes = resumenes.filter(fecha__lte=hasta)
+
+    # Activas y archivadas, mezcladas en orden; un día puede tener ventas en ambas tablas
+    clave = lambda fila: (fila['fecha_venta'], fila['producto_id'])
+    filas = recorrer_en_orden(
+        [filas_resumen(ventas).iterator(chunk_size=lote) for ventas in ventas_en_rango(desde, hasta)], clave
+    )
+
+    escritas = 0
+    with transaction.atomic():
+        resumenes.delete()
+        pendientes = []
+        for (fecha, producto_id), grupo in groupby(filas, key=clave):
+            grupo = list(grupo)
+            pendientes.append(VentaDiaria(
+                fecha=fecha,
+                producto_id=producto_id,
+                unidades=sum(fila['total_unidades'] for fila in grupo),
+                ingresos=sum(fila['total_ingresos'] for fila in grupo),
+                transacciones=sum(fila['total_transacciones'] for fila in grupo),
+            ))
+            if len(pendientes) >= lote:
+                VentaDiaria.objects.bulk_create(pendientes)
+                escritas += len(pendientes)
+                pendientes = []
+        if pendientes:
+            VentaDiaria.objects.bulk_create(pendientes)
+            escritas += len(pendientes)
+    return escritas
@@ -0,0 +1,108 @@
+"""
+Réplica de lectura para los caminos pesados (reportes, catálogo, API).
+
+- ReplicaRouter: las escrituras van siempre a 'default'. Las lecturas de los
+  modelos del inventario van a 'replica' solo dentro de una vista marcada con
+  @lectura_en_replica (o del bloque `with leer_de_replica():`). Sesiones y
+  usuarios se leen siempre de la primaria.
+- Leer lo propio: tras cualquier petición que escribe (POST, etc.) el
+  middleware deja una cookie durante REPLICA_RETRASO_SEGUNDOS. Mientras exista,
+  ese cliente lee de la primaria y ve su venta aunque la réplica vaya atrasada.
+
+Sin 'replica' en settings.DATABASES todo se lee de la primaria. En local la
+réplica es otro archivo SQLite que `manage.py sincronizar_replica` mantiene
+al día con la API de backup de SQLite.
+"""
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.deprecation import MiddlewareMixin
+
+ALIAS_REPLICA = 'replica'
+
+COOKIE_LECTURA_PROPIA = 'leer_primaria'
+
+_en_replica = ContextVar('leer_de_replica', default=False)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def alias_lectura():
+    """
+    Alias del que se leería ahora mismo. Sirve para fijarlo con .using() en
+    respuestas en streaming, que se consumen después de que la vista retorna.
+    """
+    return ALIAS_REPLICA if _en_replica.get() and replica_configurada() else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def leer_de_replica(activa=True):
+    token = _en_replica.set(activa)
+    try:
+        yield
+    finally:
+        _en_replica.reset(token)
+
+
+def leer_de_primaria():
+    """ Fuerza la primaria dentro de una vista en réplica (p. ej. para llenar una caché). """
+    return leer_de_replica(False)
+
+
+def lectura_en_replica(vista):
+    """ Decorador de vista: sus lecturas del inventario van a la réplica (si el cliente no acaba de escribir). """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            with leer_de_replica(COOKIE_LECTURA_PROPIA not in request.COOKIES):
+                return await vista(request, *args, **kwargs)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        with leer_de_replica(COOKIE_LECTURA_PROPIA not in request.COOKIES):
+            return vista(request, *args, **kwargs)
+    return envoltura
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'inventario' and _en_replica.get() and replica_configurada():
+            return ALIAS_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sin esto Django guardaría en la base de la que se leyó la instancia
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplica tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # La réplica recibe el esquema con la copia, no con migrate
+        return db != ALIAS_REPLICA
+
+
+class LecturaPropiaMiddleware(MiddlewareMixin):
+    """
+    Marca con una cookie a los clientes que acaban de escribir (ver el docstring
+    del módulo). Con MiddlewareMixin sirve tanto en WSGI como en ASGI sin
+    forzar a Django a pasar las vistas async a un hilo.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.segundos = getattr(settings, 'REPLICA_RETRASO_SEGUNDOS', 30)
+
+    def process_response(self, request, response):
+        if replica_configurada() and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(COOKIE_LECTURA_PROPIA, '1', max_age=self.segundos, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,85 @@
+"""
+Receptores de señales del inventario.
+
+Se conectan en InventarioConfig.ready(). Ojo: las escrituras masivas
+(QuerySet.update, bulk_create) no emiten estas señales; el código que las usa
+(p. ej. inventario.ventas) debe avisar por su cuenta.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .contadores import aplicar_deltas, cambiar_producto
+from .imagenes import programar_variantes
+from .kpis import invalidar_kpis
+from .models import Categoria, Producto, Venta
+from .version_catalogo import marcar_cambio_catalogo
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+def invalidar_kpis_al_cambiar(sender, **kwargs):
+    # Tras el commit: así nadie vuelve a cachear datos que aún no son visibles
+    transaction.on_commit(invalidar_kpis)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def subir_version_catalogo(sender, **kwargs):
+    # Dentro de la transacción del cambio: la API nunca ve datos nuevos con una versión vieja
+    marcar_cambio_catalogo()
+
+
+@receiver(pre_save, sender=Producto)
+def recordar_valores_para_contadores(sender, instance, **kwargs):
+    # Los valores guardados, no los del formulario (la instancia pudo leerse hace rato)
+    if not instance._state.adding:
+        instance._contadores_antes = Producto.objects.filter(pk=instance.pk).values_list(
+            'categoria_id', 'stock', 'precio'
+        ).first()
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_contadores_al_guardar(sender, instance, created, update_fields, **kwargs):
+    antes = None if created else getattr(instance, '_contadores_antes', None)
+    despues = [instance.categoria_id, instance.stock, instance.precio]
+    if antes is not None and update_fields is not None:
+        # Con update_fields (p. ej. guardar_producto, que no escribe stock) lo demás no cambió
+        for posicion, campo in enumerate(('categoria', 'stock', 'precio')):
+            if campo not in update_fields:
+                despues[posicion] = antes[posicion]
+    contadores = {}
+    cambiar_producto(contadores, antes, tuple(despues))
+    aplicar_deltas(contadores)
+
+
+@receiver(post_delete, sender=Producto)
+def actualizar_contadores_al_borrar(sender, instance, **kwargs):
+    contadores = {}
+    cambiar_producto(contadores, (instance.categoria_id, instance.stock, instance.precio), None)
+    aplicar_deltas(contadores)
+
+
+@receiver(pre_save, sender=Producto)
+def detectar_imagen_nueva(sender, instance, **kwargs):
+    # Un archivo sin "_committed" es una subida nueva: sus variantes aún no existen
+    if instance.imagen and not instance.imagen._committed:
+        instance.imagen_variantes, instance.imagen_huella = False, ''
+        instance._programar_variantes = True
+    elif not instance.imagen:
+        instance.imagen_variantes, instance.imagen_huella = False, ''
+
+
+@receiver(post_save, sender=Producto)
+def generar_variantes_en_segundo_plano(sender, instance, **kwargs):
+    if getattr(instance, '_programar_variantes', False):
+        instance._programar_variantes = False
+        producto_id = instance.pk
+        transaction.on_commit(lambda: programar_variantes(producto_id))
+
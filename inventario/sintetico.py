@@ -0,0 +1,160 @@
+"""
+Datos sintéticos a escala de producción para pruebas de carga.
+
+Genera categorías, productos y ventas con inserciones masivas (bulk_create en
+lotes, una transacción por lote) y una distribución realista:
+- Popularidad de productos tipo Zipf: unos pocos productos concentran la
+  mayoría de las ventas y hay una cola larga que casi no se vende.
+- Fechas con tendencia creciente hacia hoy y más movimiento en fin de semana.
+Con la misma semilla el resultado es el mismo. Al terminar se reconstruye el
+resumen diario y se invalidan los KPIs y la versión del catálogo.
+"""
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.db import connection, transaction
+
+from .contadores import recalcular_contadores
+from .kpis import invalidar_kpis
+from .models import Categoria, CorteStock, MovimientoStock, Producto, Venta, VentaArchivada, VentaDiaria
+from .resumenes import reconstruir_resumen
+from .version_catalogo import marcar_cambio_catalogo
+
+TIPOS = (
+    'Pañal', 'Pañal Pants', 'Toallitas Húmedas', 'Crema Antipañalitis', 'Shampoo Bebé',
+    'Jabón Líquido', 'Colonia', 'Aceite Corporal', 'Biberón', 'Chupo', 'Fórmula Infantil',
+    'Compota', 'Cereal Infantil', 'Body Algodón', 'Medias', 'Babero', 'Protector de Cama',
+)
+MARCAS = (
+    'Huggies', 'Pequeñín', 'Winny', 'Pampers', 'Babysec', 'Johnson', 'Avent', 'NUK',
+    'Mustela', 'Arrurrú', 'Nestlé', 'Gerber', 'Tena', 'Chicco', 'Baby Dove',
+)
+LINEAS = ('Active Sec', 'Natural Care', 'Supreme', 'Premium', 'Clásico', 'Ultra', 'Comfort', 'Eco', 'Plus', 'Etapa')
+VARIACIONES = (
+    'RN', 'Etapa 1', 'Etapa 2', 'Etapa 3', 'Etapa 4', 'Etapa 5', 'Etapa 6', 'x30', 'x50', 'x80',
+    'x100', '200 ml', '400 ml', '1 L', '0-3 meses', '3-6 meses', '6-12 meses', 'Talla M', 'Talla G', 'Talla XG',
+)
+CATEGORIAS = (
+    'Pañales', 'Pañitos y Toallitas', 'Cuidado de la Piel', 'Baño', 'Alimentación', 'Lactancia',
+    'Ropa', 'Accesorios', 'Higiene Adulto', 'Juguetes', 'Salud', 'Hogar',
+)
+
+# Exponente de la ley de Zipf para la popularidad de productos (1.0 ~ comercio minorista)
+EXPONENTE_ZIPF = 1.07
+
+# Peso extra de las ventas en sábado y domingo
+PESO_FIN_DE_SEMANA = 1.6
+
+
+def _en_lotes(total, lote):
+    hechos = 0
+    while hechos < total:
+        tamano = min(lote, total - hechos)
+        yield tamano
+        hechos += tamano
+
+
+def limpiar_inventario():
+    """ Borra ventas, resúmenes, productos y categorías con DELETE directos (sin señales). """
+    with transaction.atomic(), connection.cursor() as cursor:
+        for modelo in (CorteStock, MovimientoStock, VentaDiaria, VentaArchivada, Venta, Producto, Categoria):
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+
+
+def crear_categorias(cantidad):
+    nombres = list(CATEGORIAS[:cantidad])
+    nombres += [f"{CATEGORIAS[i % len(CATEGORIAS)]} {i // len(CATEGORIAS) + 1}" for i in range(len(nombres), cantidad)]
+    existentes = set(Categoria.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+    Categoria.objects.bulk_create([
+        Categoria(nombre=nombre, descripcion="Generada para pruebas de carga") for nombre in nombres if nombre not in existentes
+    ])
+    return list(Categoria.objects.filter(nombre__in=nombres).values_list('id', flat=True))
+
+
+def crear_productos(cantidad, categorias, azar, lote=5000, progreso=None):
+    """ Inserta `cantidad` productos repartidos (también con sesgo) entre las categorías. """
+    pesos_categoria = list(accumulate(1 / (posicion + 1) for posicion in range(len(categorias))))
+    creados = 0
+    for tamano in _en_lotes(cantidad, lote):
+        with transaction.atomic():
+            nuevos = Producto.objects.bulk_create([
+                Producto(
+                    nombre=f"{azar.choice(TIPOS)} {azar.choice(MARCAS)} {azar.choice(LINEAS)} {creados + i:06d}",
+                    variacion=azar.choice(VARIACIONES),
+                    categoria_id=azar.choices(categorias, cum_weights=pesos_categoria)[0] if azar.random() > 0.03 else None,
+                    precio=azar.randrange(2000, 180000, 100),
+                    stock=int(azar.expovariate(1 / 120)),
+                )
+                for i in range(tamano)
+            ])
+            # El stock inicial entra al libro como recepción (las ventas generadas son historia)
+            MovimientoStock.objects.bulk_create([
+                MovimientoStock(producto_id=producto.pk, tipo=MovimientoStock.RECEPCION, cantidad=producto.stock, nota='Sintético')
+                for producto in nuevos if producto.stock
+            ])
+        creados += tamano
+        if progreso:
+            progreso('productos', creados, cantidad)
+    return creados
+
+
+def crear_ventas(cantidad, dias, azar, lote=5000, progreso=None):
+    """ Inserta `cantidad` ventas de los últimos `dias` días con sesgo por producto y fecha. """
+    productos = list(Producto.objects.order_by('id').values_list('id', 'precio'))
+    if not productos:
+        return 0
+    # El orden de popularidad no sigue al id: se baraja una vez con la semilla
+    azar.shuffle(productos)
+    pesos_producto = list(accumulate(1 / (posicion + 1) ** EXPONENTE_ZIPF for posicion in range(len(productos))))
+
+    hoy = date.today()
+    fechas = [hoy - timedelta(days=atras) for atras in range(dias)]
+    pesos_fecha = list(accumulate(
+        (1 + (dias - atras) / dias) * (PESO_FIN_DE_SEMANA if fecha.weekday() >= 5 else 1)
+        for atras, fecha in enumerate(fechas)
+    ))
+
+    creadas = 0
+    for tamano in _en_lotes(cantidad, lote):
+        elegidos = azar.choices(productos, cum_weights=pesos_producto, k=tamano)
+        dias_elegidos = azar.choices(fechas, cum_weights=pesos_fecha, k=tamano)
+        with transaction.atomic():
+            Venta.objects.bulk_create([
+                Venta(
+                    producto_id=producto_id,
+                    cantidad=1 if azar.random() < 0.7 else azar.randint(2, 6),
+                    precio_unitario=precio,
+                    fecha_venta=fecha,
+                )
+                for (producto_id, precio), fecha in zip(elegidos, dias_elegidos)
+            ])
+        creadas += tamano
+        if progreso:
+            progreso('ventas', creadas, cantidad)
+    return creadas
+
+
+def poblar(categorias=30, productos=100_000, ventas=1_000_000, dias=730, semilla=42, lote=5000, progreso=None):
+    """
+    Genera el volumen pedido y deja los datos derivados al día.
+    Devuelve un diccionario con lo creado. `progreso(etapa, hechos, total)` es opcional.
+    """
+    azar = random.Random(semilla)
+    ids_categorias = crear_categorias(categorias)
+    creados = crear_productos(productos, ids_categorias, azar, lote, progreso)
+    creadas = crear_ventas(ventas, dias, azar, lote, progreso)
+    if progreso:
+        progreso('resumen diario', 0, 1)
+    filas_resumen = reconstruir_resumen(lote=lote)
+    # bulk_create no mantiene los contadores de las categorías: se calculan de una vez
+    recalcular_contadores()
+    with transaction.atomic():
+        marcar_cambio_catalogo()
+    invalidar_kpis()
+    return {
+        'categorias': len(ids_categorias),
+        'productos': creados,
+        'ventas': creadas,
+        'filas_resumen': filas_resumen,
+    }
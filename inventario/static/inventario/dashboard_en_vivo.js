@@ -0,0 +1,60 @@
+// KPIs y alerta de stock bajo del dashboard en vivo (ver inventario.eventos).
+// 'inicio' trae todo; 'cambios' solo lo que cambió. Si el servidor no tiene
+// flujo (WSGI responde 204) EventSource se detiene y la página queda estática.
+(function () {
+    const script = document.currentScript;
+    if (!window.EventSource || !script) return;
+
+    const alertas = new Map();
+    const caja = document.querySelector('[data-alertas]');
+    const lista = document.querySelector('[data-alertas-lista]');
+    const total = document.querySelector('[data-alertas-total]');
+
+    function mostrarKpis(kpis) {
+        Object.entries(kpis).forEach(([campo, valor]) => {
+            document.querySelectorAll(`[data-kpi="${campo}"]`).forEach((elemento) => {
+                elemento.textContent = 'redondear' in elemento.dataset ? Math.round(Number(valor)) : valor;
+            });
+        });
+    }
+
+    function mostrarAlertas() {
+        lista.innerHTML = '';
+        // Mismo orden que la página: de menor a mayor stock
+        [...alertas.values()].sort((a, b) => a.stock - b.stock).forEach((producto) => {
+            const item = document.createElement('li');
+            item.append(`${producto.nombre} (${producto.variacion}) - `);
+            const fuerte = document.createElement('strong');
+            fuerte.textContent = `Stock actual: ${producto.stock}`;
+            item.appendChild(fuerte);
+            lista.appendChild(item);
+        });
+        total.textContent = alertas.size;
+        caja.classList.toggle('hidden', alertas.size === 0);
+    }
+
+    const fuente = new EventSource(script.dataset.eventos);
+
+    fuente.addEventListener('inicio', (evento) => {
+        const datos = JSON.parse(evento.data);
+        alertas.clear();
+        datos.alerta_stock_bajo.forEach((producto) => alertas.set(producto.id, producto));
+        delete datos.alerta_stock_bajo;
+        mostrarKpis(datos);
+        mostrarAlertas();
+    });
+
+    fuente.addEventListener('cambios', (evento) => {
+        const datos = JSON.parse(evento.data);
+        if (datos.kpis) mostrarKpis(datos.kpis);
+        if (datos.stock_bajo) {
+            datos.stock_bajo.salen.forEach((id) => alertas.delete(id));
+            datos.stock_bajo.entran.forEach((producto) => alertas.set(producto.id, producto));
+            Object.entries(datos.stock_bajo.cambian).forEach(([id, stock]) => {
+                const producto = alertas.get(Number(id));
+                if (producto) producto.stock = stock;
+            });
+            mostrarAlertas();
+        }
+    });
+})();
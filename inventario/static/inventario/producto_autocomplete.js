@@ -0,0 +1,84 @@
+// Selector de productos con búsqueda en el servidor (ver ProductoAutocompleteWidget).
+// Consulta el endpoint mientras el cajero escribe; un lector de código de barras
+// termina con Enter y, si hay una sola coincidencia, se elige directamente.
+(function () {
+    const ESPERA_MS = 200;
+
+    function iniciar(contenedor) {
+        const valor = contenedor.querySelector('[data-valor]');
+        const texto = contenedor.querySelector('[data-texto]');
+        const opciones = contenedor.querySelector('[data-opciones]');
+        let temporizador = null;
+        let pendiente = null;
+        let resultados = [];
+
+        function etiqueta(producto) {
+            return producto.variacion ? `${producto.nombre} (${producto.variacion})` : producto.nombre;
+        }
+
+        function elegir(producto) {
+            valor.value = producto.id;
+            texto.value = etiqueta(producto);
+            opciones.classList.add('hidden');
+        }
+
+        function mostrar(lista) {
+            resultados = lista;
+            opciones.innerHTML = '';
+            lista.forEach((producto) => {
+                const item = document.createElement('li');
+                item.className = 'px-3 py-2 cursor-pointer hover:bg-yellow-100 flex justify-between gap-2';
+                item.textContent = etiqueta(producto);
+                const stock = document.createElement('span');
+                stock.className = 'text-xs text-gray-500';
+                stock.textContent = `stock ${producto.stock}`;
+                item.appendChild(stock);
+                item.addEventListener('mousedown', (evento) => {
+                    evento.preventDefault();
+                    elegir(producto);
+                });
+                opciones.appendChild(item);
+            });
+            opciones.classList.toggle('hidden', lista.length === 0);
+        }
+
+        function buscar() {
+            const consulta = texto.value.trim();
+            if (!consulta) {
+                mostrar([]);
+                return Promise.resolve([]);
+            }
+            // Solo importa la última respuesta: se cancela la anterior
+            if (pendiente) pendiente.abort();
+            pendiente = new AbortController();
+            const url = `${contenedor.dataset.url}?q=${encodeURIComponent(consulta)}`;
+            return fetch(url, {signal: pendiente.signal, headers: {'Accept': 'application/json'}})
+                .then((respuesta) => respuesta.ok ? respuesta.json() : {resultados: []})
+                .then((datos) => {
+                    mostrar(datos.resultados);
+                    return datos.resultados;
+                })
+                .catch(() => []);
+        }
+
+        texto.addEventListener('input', () => {
+            valor.value = '';
+            clearTimeout(temporizador);
+            temporizador = setTimeout(buscar, ESPERA_MS);
+        });
+        texto.addEventListener('keydown', (evento) => {
+            if (evento.key !== 'Enter' || valor.value) return;
+            evento.preventDefault();
+            clearTimeout(temporizador);
+            buscar().then((lista) => {
+                if (lista.length === 1) elegir(lista[0]);
+            });
+        });
+        texto.addEventListener('blur', () => opciones.classList.add('hidden'));
+        texto.addEventListener('focus', () => opciones.classList.toggle('hidden', resultados.length === 0 || !!valor.value));
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('[data-autocompletar-producto]').forEach(iniciar);
+    });
+})();
@@ -0,0 +1,276 @@
+"""
+Cola de tareas en segundo plano sobre la propia base de datos (modelo Tarea).
+
+Las vistas encolan el trabajo pesado (exportaciones grandes, importaciones,
+variantes de imagen) y responden enseguida con una página de estado que se
+consulta hasta que la tarea termina; la latencia de la petición ya no
+depende del tamaño del trabajo. Sin Redis ni Celery:
+
+- encolar() inserta una fila en Tarea.
+- `manage.py procesar_tareas` (uno o varios procesos, con N hilos cada uno)
+  toma la siguiente tarea disponible con un UPDATE condicional, así dos
+  trabajadores nunca ejecutan la misma. Un fallo se reintenta con espera
+  creciente hasta max_intentos; una tarea sin latido durante
+  ABANDONO_SEGUNDOS (el trabajador murió) vuelve a la cola.
+- Los archivos generados se guardan en TAREAS_DIR/<id>/ y se descargan por
+  una vista de staff (no quedan públicos en MEDIA).
+
+Sin TAREAS_TRABAJADOR_EXTERNO (desarrollo), las tareas encoladas se ejecutan
+además en un pool de hilos del propio proceso web, con el mismo registro de
+estado, para no depender de un proceso aparte.
+
+Los tipos de tarea se registran con el decorador @tarea (ver inventario.trabajos).
+"""
+import logging
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarea
+
+# Sin latido durante este tiempo, una tarea en curso se considera abandonada
+ABANDONO_SEGUNDOS = 600
+
+# Espera antes del primer reintento (se duplica en cada intento)
+ESPERA_REINTENTO_SEGUNDOS = 30
+
+# Mínimo entre dos escrituras de progreso de la misma tarea
+INTERVALO_PROGRESO_SEGUNDOS = 1.0
+
+logger = logging.getLogger(__name__)
+
+TIPOS = {}
+
+_pool = None
+_candado_pool = threading.Lock()
+
+
+def tarea(nombre, max_intentos=3):
+    """
+    Registra una función como tipo de tarea. Se llama con un Progreso y los
+    parámetros de encolar(); puede devolver un mensaje final. Las tareas que
+    no se pueden repetir sin efectos dobles deben usar max_intentos=1.
+    """
+    def registrar(funcion):
+        TIPOS[nombre] = (funcion, max_intentos)
+        return funcion
+    return registrar
+
+
+def directorio_tareas():
+    return Path(getattr(settings, 'TAREAS_DIR', Path(settings.BASE_DIR) / 'tareas'))
+
+
+def ruta_resultado(tarea_obj):
+    """ Ruta absoluta del archivo de resultado de la tarea, o None. """
+    return directorio_tareas() / tarea_obj.resultado if tarea_obj.resultado else None
+
+
+def guardar_entrada(archivo):
+    """ Copia un archivo subido a TAREAS_DIR/entradas/ (por bloques) y devuelve su ruta relativa para la tarea. """
+    carpeta = directorio_tareas() / 'entradas'
+    carpeta.mkdir(parents=True, exist_ok=True)
+    nombre = f'{uuid.uuid4().hex}{Path(archivo.name).suffix.lower()}'
+    with open(carpeta / nombre, 'wb') as destino:
+        for bloque in archivo.chunks():
+            destino.write(bloque)
+    return f'entradas/{nombre}'
+
+
+# =======================================================
+# --- PROGRESO (lo que recibe cada tarea) ---
+# =======================================================
+
+class Progreso:
+    """ Permite a una tarea informar su avance y guardar su archivo de resultado. """
+
+    def __init__(self, tarea_obj):
+        self.tarea = tarea_obj
+        self.mensaje = ''
+        self.resultado = ''
+        self._ultima_escritura = 0.0
+
+    @property
+    def directorio(self):
+        return directorio_tareas() / str(self.tarea.pk)
+
+    def avanzar(self, hechos=None, total=None, mensaje=''):
+        """ Guarda el porcentaje y/o un mensaje (como mucho una vez por segundo) y renueva el latido. """
+        self.mensaje = mensaje or self.mensaje
+        ahora = time.monotonic()
+        if ahora - self._ultima_escritura < INTERVALO_PROGRESO_SEGUNDOS:
+            return
+        self._ultima_escritura = ahora
+        cambios = {'latido': timezone.now(), 'mensaje': self.mensaje[:200]}
+        if hechos is not None and total:
+            cambios['progreso'] = min(99, hechos * 100 // total)
+        Tarea.objects.filter(pk=self.tarea.pk).update(**cambios)
+
+    @contextmanager
+    def archivo(self, nombre):
+        """ Abre (binario) el archivo de resultado TAREAS_DIR/<id>/<nombre>; queda como resultado de la tarea. """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        with open(self.directorio / nombre, 'wb') as destino:
+            yield destino
+        self.resultado = f'{self.tarea.pk}/{nombre}'
+
+
+# =======================================================
+# --- ENCOLAR Y TOMAR ---
+# =======================================================
+
+def trabajador_externo():
+    return getattr(settings, 'TAREAS_TRABAJADOR_EXTERNO', False)
+
+
+def encolar(tipo, usuario=None, **parametros):
+    """ Crea una tarea pendiente (parámetros serializables en JSON) y devuelve la Tarea. """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    nueva = Tarea.objects.create(tipo=tipo, parametros=parametros, usuario=usuario, max_intentos=TIPOS[tipo][1])
+    if not trabajador_externo():
+        transaction.on_commit(lambda: _ejecutor().submit(_ejecutar_en_proceso, nueva.pk))
+    return nueva
+
+
+def tomar_tarea(pk=None):
+    """
+    Marca como en curso la siguiente tarea disponible (o la indicada) y la
+    devuelve; None si no hay. El UPDATE es condicional al estado pendiente:
+    si otro trabajador la tomó primero, aquí no se toma.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        disponibles = Tarea.objects.filter(estado=Tarea.PENDIENTE, disponible_desde__lte=ahora)
+        if pk is not None:
+            disponibles = disponibles.filter(pk=pk)
+        siguiente = disponibles.order_by('disponible_desde', 'id').values_list('pk', flat=True).first()
+        if siguiente is None:
+            return None
+        tomada = Tarea.objects.filter(pk=siguiente, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EN_CURSO, intentos=F('intentos') + 1, iniciada=ahora, latido=ahora,
+        )
+    return Tarea.objects.get(pk=siguiente) if tomada else None
+
+
+def recuperar_abandonadas():
+    """ Devuelve a la cola (o da por fallidas) las tareas en curso sin latido reciente. """
+    limite = timezone.now() - timedelta(seconds=ABANDONO_SEGUNDOS)
+    abandonadas = Tarea.objects.filter(estado=Tarea.EN_CURSO, latido__lt=limite)
+    error = "El trabajador dejó de responder."
+    reintentos = abandonadas.filter(intentos__lt=F('max_intentos')).update(
+        estado=Tarea.PENDIENTE, disponible_desde=timezone.now(), error=error,
+    )
+    fallidas = abandonadas.update(estado=Tarea.FALLIDA, terminada=timezone.now(), error=error)
+    return reintentos + fallidas
+
+
+# =======================================================
+# --- EJECUCIÓN ---
+# =======================================================
+
+def ejecutar_tarea(tarea_obj):
+    """ Ejecuta una tarea ya tomada y guarda su resultado, o programa el reintento. Devuelve el estado final. """
+    progreso = Progreso(tarea_obj)
+    funcion, _ = TIPOS.get(tarea_obj.tipo, (None, 0))
+    try:
+        if funcion is None:
+            raise LookupError(f"Tipo de tarea desconocido: {tarea_obj.tipo}")
+        mensaje = funcion(progreso, **tarea_obj.parametros)
+    except Exception as error:
+        logger.exception("Falló la tarea %s (intento %s de %s)", tarea_obj, tarea_obj.intentos, tarea_obj.max_intentos)
+        shutil.rmtree(progreso.directorio, ignore_errors=True)
+        cambios = {'error': traceback.format_exc(), 'mensaje': str(error)[:200], 'latido': timezone.now()}
+        if tarea_obj.intentos < tarea_obj.max_intentos:
+            espera = ESPERA_REINTENTO_SEGUNDOS * 2 ** (tarea_obj.intentos - 1)
+            cambios.update(estado=Tarea.PENDIENTE, disponible_desde=timezone.now() + timedelta(seconds=espera))
+        else:
+            cambios.update(estado=Tarea.FALLIDA, terminada=timezone.now())
+    else:
+        cambios = {
+            'estado': Tarea.TERMINADA,
+            'progreso': 100,
+            'mensaje': (mensaje or progreso.mensaje)[:200],
+            'resultado': progreso.resultado,
+            'error': '',
+            'terminada': timezone.now(),
+        }
+    Tarea.objects.filter(pk=tarea_obj.pk).update(**cambios)
+    return cambios['estado']
+
+
+def ejecutar_pendientes(limite=None):
+    """ Ejecuta en este hilo las tareas disponibles hasta vaciar la cola (o `limite`). Devuelve cuántas ejecutó. """
+    ejecutadas = 0
+    while limite is None or ejecutadas < limite:
+        siguiente = tomar_tarea()
+        if siguiente is None:
+            break
+        ejecutar_tarea(siguiente)
+        ejecutadas += 1
+    return ejecutadas
+
+
+def trabajar(detener, espera=2.0):
+    """ Bucle de un hilo trabajador: toma y ejecuta tareas hasta que se active el evento `detener`. """
+    while not detener.is_set():
+        try:
+            siguiente = tomar_tarea()
+            if siguiente is not None:
+                ejecutar_tarea(siguiente)
+        except Exception:
+            logger.exception("Error en el trabajador de tareas")
+            siguiente = None
+        finally:
+            # Como al final de una petición: conexiones caídas o vencidas se reabren
+            close_old_connections()
+        if siguiente is None:
+            detener.wait(espera)
+
+
+def _ejecutor():
+    global _pool
+    with _candado_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TAREAS_HILOS', 2),
+                thread_name_prefix='tareas',
+            )
+    return _pool
+
+
+def _ejecutar_en_proceso(pk):
+    """ Sin trabajador externo: ejecuta la tarea en este hilo, con sus reintentos. """
+    try:
+        while True:
+            actual = tomar_tarea(pk)
+            if actual is None or ejecutar_tarea(actual) != Tarea.PENDIENTE:
+                return
+            espera = Tarea.objects.values_list('disponible_desde', flat=True).get(pk=pk) - timezone.now()
+            time.sleep(max(espera.total_seconds(), 0))
+    except Exception:
+        logger.exception("Error ejecutando la tarea %s en el proceso web", pk)
+    finally:
+        close_old_connections()
+
+
+def purgar_terminadas(dias):
+    """ Borra las tareas terminadas o fallidas de hace más de `dias` días y sus archivos. """
+    viejas = Tarea.objects.filter(
+        estado__in=[Tarea.TERMINADA, Tarea.FALLIDA], terminada__lt=timezone.now() - timedelta(days=dias)
+    )
+    ids = list(viejas.values_list('pk', flat=True))
+    for pk in ids:
+        shutil.rmtree(directorio_tareas() / str(pk), ignore_errors=True)
+    return Tarea.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,24 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from inventario.imagenes import TAMANOS, ruta_variante, srcset
+
+register = template.Library()
+
+
+@register.inclusion_tag('inventario/_imagen_producto.html')
+def imagen_producto(producto, sizes='(min-width: 1280px) 25vw, (min-width: 640px) 50vw, 100vw'):
+    """
+    <picture> con las variantes WebP y JPEG del producto (srcset) o, si aún no
+    se generaron, la imagen original.
+    """
+    contexto = {'producto': producto, 'sizes': sizes}
+    if producto.imagen and producto.imagen_variantes:
+        nombre, huella = producto.imagen.name, producto.imagen_huella
+        mayor = max(TAMANOS, key=TAMANOS.get)
+        contexto.update({
+            'srcset_webp': srcset(nombre, 'webp', huella),
+            'srcset_jpg': srcset(nombre, 'jpg', huella),
+            'src_respaldo': default_storage.url(ruta_variante(nombre, mayor, 'jpg', huella)),
+        })
+    return contexto
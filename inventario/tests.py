@@ -1,3 +1,890 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+import gzip
+import io
+import os
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+
+from . import urls as inventario_urls
+from .models import Categoria, MovimientoStock, Producto, Tarea, Venta, VentaArchivada, VentaDiaria, VentaSincronizada
+from .archivo import ENCABEZADOS_VENTAS, archivar_ventas, fecha_corte
+from .contadores import diferencias_contadores, valoracion_inventario
+from .eventos import Publicador, instantanea, publicador
+from .busqueda import asegurar_indice, buscar_productos
+from .imagenes import FORMATOS, procesar_producto, ruta_variante
+from .importacion import importar_productos
+from .metricas import MetricasSQLMiddleware
+from .kpis import UMBRAL_STOCK_BAJO, aobtener_kpis, obtener_kpis
+from .perfiles import leer_perfil, listar_perfiles, resumen_funciones
+from .paginacion import codificar_cursor
+from .movimientos import diferencias_stock, guardar_producto, registrar_movimiento, stock_al, tomar_corte
+from .resumenes import reconstruir_resumen
+from .tareas import TIPOS, encolar, ejecutar_pendientes
+from .ventas import StockInsuficiente, registrar_carrito, registrar_venta, sincronizar_ventas
+from .routers import (
+    COOKIE_LECTURA_PROPIA, ReplicaRouter, alias_lectura, lectura_en_replica, leer_de_primaria, leer_de_replica,
+)
+
+
+def sembrar_inventario(categorias=20, productos=5000, ventas=20000, dias=365):
+    """ Crea un volumen realista de datos con inserciones masivas (deterministas). """
+    cats = Categoria.objects.bulk_create([
+        Categoria(nombre=f"Categoría {i:03d}") for i in range(categorias)
+    ])
+    prods = Producto.objects.bulk_create([
+        Producto(
+            nombre=f"Producto {(i * 7919) % productos:05d}",
+            categoria=cats[i % categorias] if i % 11 else None,
+            variacion=f"Talla {i % 5}",
+            precio=1000 + (i % 90) * 100,
+            stock=(i * 37) % 200,
+        )
+        for i in range(productos)
+    ], batch_size=1000)
+    hoy = date.today()
+    ventas_creadas = Venta.objects.bulk_create([
+        Venta(producto=prods[(i * i) % productos], cantidad=1 + i % 4, precio_unitario=1500)
+        for i in range(ventas)
+    ], batch_size=1000)
+    # Se crean con la fecha de hoy: se reparte el historial en `dias` días
+    for desplazamiento in range(1, min(dias, 60)):
+        Venta.objects.filter(id__in=[v.id for v in ventas_creadas[desplazamiento::60]]).update(
+            fecha_venta=hoy - timedelta(days=desplazamiento * dias // 60)
+        )
+    reconstruir_resumen()
+    return cats, prods
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN es específico de SQLite")
+class PlanesDeConsultaTests(TestCase):
+    """
+    Ejecuta cada vista sobre un volumen realista de datos y comprueba con
+    EXPLAIN QUERY PLAN que ninguna consulta a las tablas del inventario
+    recorre la tabla completa sin índice.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categorias, cls.productos = sembrar_inventario()
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True, is_superuser=True)
+        cls.tarea = Tarea.objects.create(tipo='exportar_ventas')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def _planes(self, consultas):
+        with connection.cursor() as cursor:
+            for consulta in consultas:
+                sql = consulta['sql']
+                if 'inventario_' not in sql or not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                yield sql, [fila[-1] for fila in cursor.fetchall()]
+
+    def assertUsaIndices(self, url, metodo='get', **datos):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(url, datos)
+        self.assertLess(respuesta.status_code, 400, url)
+        for sql, plan in self._planes(consultas.captured_queries):
+            for paso in plan:
+                # Las tablas virtuales (índice FTS5) se recorren por su propio índice; las
+                # categorías son pocas y se leen enteras a propósito (sus contadores)
+                recorrido_completo = (
+                    paso.startswith('SCAN inventario_') and 'USING' not in paso and 'VIRTUAL TABLE' not in paso
+                    and not paso.startswith('SCAN inventario_categoria')
+                )
+                self.assertFalse(recorrido_completo, f"{url}: recorrido completo en\n{sql}\n{plan}")
+        return respuesta
+
+    def test_catalogo_primera_pagina_y_profunda(self):
+        respuesta = self.assertUsaIndices(reverse('pagina_compra'))
+        cursor = respuesta.context['pagina'].siguiente
+        for _ in range(5):
+            respuesta = self.assertUsaIndices(reverse('pagina_compra'), despues=cursor)
+            cursor = respuesta.context['pagina'].siguiente
+
+    def test_catalogo_con_cursor_alterado(self):
+        # Un cursor manipulado no llega al filtro: se sirve la primera página
+        primera = [p.pk for p in self.client.get(reverse('pagina_compra')).context['pagina']]
+        for valores in (['x', 'abc'], ['x', 10 ** 30], ['x', None], ['x'], {'id': 1}):
+            with self.subTest(cursor=valores):
+                respuesta = self.client.get(reverse('pagina_compra'), {'despues': codificar_cursor(valores)})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual([p.pk for p in respuesta.context['pagina']], primera)
+        self.assertEqual(self.client.get(reverse('pagina_compra'), {'antes': '%%%'}).status_code, 200)
+
+    def test_catalogo_por_categoria(self):
+        self.assertUsaIndices(reverse('pagina_compra'), categoria=self.categorias[3].pk)
+
+    def test_dashboard(self):
+        self.assertUsaIndices(reverse('dashboard'))
+
+    def test_busqueda_catalogo_dashboard_y_admin(self):
+        # Sin tildes y por prefijo: "categoria 00" encuentra "Categoría 003"
+        respuesta = self.assertUsaIndices(reverse('pagina_compra'), q='categoria 003 tal')
+        self.assertTrue(respuesta.context['productos'])
+        respuesta = self.assertUsaIndices(reverse('dashboard'), q='producto 00042')
+        self.assertEqual([p.nombre for p in respuesta.context['productos']], ['Producto 00042'])
+        self.assertUsaIndices(reverse('admin:inventario_producto_changelist'), q='talla 4')
+
+    def test_reporte_por_rango(self):
+        hoy = date.today()
+        rango = {'desde': (hoy - timedelta(days=30)).isoformat(), 'hasta': hoy.isoformat()}
+        respuesta = self.assertUsaIndices(reverse('reporte_ventas'), **rango)
+        self.assertUsaIndices(reverse('reporte_ventas'), despues=respuesta.context['ventas'].siguiente, **rango)
+
+    def test_venta_rapida(self):
+        producto = Producto.objects.filter(stock__gt=0).first()
+        self.assertUsaIndices(reverse('venta_rapida', args=[producto.pk]), metodo='post')
+
+    def test_admin_ventas_filtradas_por_fecha(self):
+        hoy = date.today()
+        self.assertUsaIndices(
+            reverse('admin:inventario_venta_changelist'),
+            fecha_venta__gte=(hoy - timedelta(days=7)).isoformat(),
+            fecha_venta__lt=(hoy + timedelta(days=1)).isoformat(),
+        )
+
+
+# Consultas máximas por vista (GET) con el volumen de sembrar_inventario(), sin
+# caché. Toda URL de inventario.urls debe declarar el suyo: una vista nueva sin
+# presupuesto hace fallar la prueba. Incluye sesión y usuario (2 consultas).
+PRESUPUESTO_CONSULTAS = {
+    'login': 2,
+    'logout': 4,
+    'register': 0,
+    # Versión del catálogo (ETag), página y categorías
+    'pagina_compra': 5,
+    'venta_rapida': 3,
+    'dashboard': 8,
+    # Sesión + usuario: bajo WSGI (el cliente de pruebas) el flujo SSE responde 204
+    'dashboard_eventos': 2,
+    # Historial y exportación: una consulta a Venta y otra a VentaArchivada
+    'reporte_ventas': 6,
+    # Exportación: tamaño estimado (resumen diario) y un bloque por cada 2000 ventas de
+    # cada tabla (con 5000 ventas, 3 de Venta y 1 de VentaArchivada)
+    'reporte_ventas_exportar': 7,
+    'reporte_valoracion': 4,
+    'registrar_venta': 2,
+    'carrito': 2,
+    'sincronizar_ventas': 2,
+    'producto_crear': 3,
+    'producto_editar': 4,
+    'producto_eliminar': 3,
+    'importar_productos': 2,
+    'producto_buscar': 2,
+    'categoria_list': 3,
+    'categoria_crear': 2,
+    'categoria_editar': 3,
+    'categoria_eliminar': 3,
+    'api_productos': 2,
+    'api_producto_detalle': 2,
+    'api_categorias': 2,
+    'api_stock': 2,
+    'tarea_estado': 3,
+    'tarea_descargar': 3,
+    'perfil_list': 2,
+    'perfil_detalle': 2,
+    'perfil_descargar': 2,
+}
+
+
+def directorio_temporal(caso, ajuste):
+    """ Apunta el ajuste `ajuste` a un directorio temporal mientras dure la prueba. """
+    directorio = tempfile.TemporaryDirectory()
+    caso.addCleanup(directorio.cleanup)
+    ajustes = override_settings(**{ajuste: directorio.name})
+    ajustes.enable()
+    caso.addCleanup(ajustes.disable)
+    return directorio.name
+
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Falla si alguna vista supera su presupuesto de consultas con un volumen
+    realista de datos: un N+1 (p. ej. recorrer producto.categoria sin
+    select_related) hace crecer la cuenta con el número de filas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categorias, cls.productos = sembrar_inventario(productos=2000, ventas=5000)
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True, is_superuser=True)
+        cls.tarea = Tarea.objects.create(tipo='exportar_ventas')
+
+    def setUp(self):
+        cache.clear()
+        directorio_temporal(self, 'PERFILES_DIR')
+        self.client.force_login(self.staff)
+        self.client.get(reverse('reporte_valoracion'), {'perfilar': '1'})
+        self.perfil = listar_perfiles()[0]['nombre']
+
+    def _argumentos(self, patron):
+        argumentos = {}
+        for nombre in patron.pattern.converters:
+            if nombre == 'formato':
+                argumentos[nombre] = 'csv'
+            elif patron.name.startswith('categoria'):
+                argumentos[nombre] = self.categorias[0].pk
+            elif patron.name.startswith('tarea'):
+                argumentos[nombre] = self.tarea.pk
+            elif patron.name.startswith('perfil'):
+                argumentos[nombre] = self.perfil
+            else:
+                argumentos[nombre] = Producto.objects.filter(stock__gt=0).values_list('pk', flat=True).first()
+        return argumentos
+
+    def assertPresupuesto(self, url, presupuesto, metodo='get', **opciones):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(url, **opciones)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 400, url)
+        if len(consultas) > presupuesto:
+            detalle = '\n'.join(consulta['sql'] for consulta in consultas.captured_queries)
+            self.fail(f"{url}: {len(consultas)} consultas, presupuesto {presupuesto}\n{detalle}")
+        return respuesta
+
+    def test_todas_las_vistas_tienen_presupuesto(self):
+        nombres = {patron.name for patron in inventario_urls.urlpatterns}
+        self.assertEqual(nombres - set(PRESUPUESTO_CONSULTAS), set(), "Vistas sin presupuesto de consultas")
+
+    def test_vistas_dentro_del_presupuesto(self):
+        for patron in inventario_urls.urlpatterns:
+            with self.subTest(vista=patron.name):
+                # logout cierra la sesión: se vuelve a entrar antes de cada vista
+                self.client.force_login(self.staff)
+                url = reverse(patron.name, kwargs=self._argumentos(patron))
+                self.assertPresupuesto(url, PRESUPUESTO_CONSULTAS[patron.name])
+
+    def test_ventas_dentro_del_presupuesto(self):
+        self.client.force_login(self.staff)
+        producto = Producto.objects.filter(stock__gt=5).first()
+        # sesión + usuario + savepoints + UPDATE + lectura + INSERT + libro de stock + resumen diario
+        # + contadores de la categoría + versión del catálogo
+        self.assertPresupuesto(reverse('venta_rapida', args=[producto.pk]), 12, metodo='post')
+        # Dos escrituras por línea (stock y resumen diario); el resto es fijo
+        lineas = [{'producto': p.pk, 'cantidad': 1} for p in Producto.objects.filter(stock__gt=5)[:10]]
+        self.assertPresupuesto(
+            reverse('carrito'), 30, metodo='post',
+            data=json.dumps({'lineas': lineas}), content_type='application/json',
+        )
+        # Sincronización de una caja: un único UPDATE de stock para todo el lote; por línea solo el resumen diario
+        lote = [dict(linea, clave=f"caja1-{numero}") for numero, linea in enumerate(lineas)]
+        self.assertPresupuesto(
+            reverse('sincronizar_ventas'), 22, metodo='post',
+            data=json.dumps({'terminal': 'caja1', 'lineas': lote}), content_type='application/json',
+        )
+
+    async def test_vistas_async_bajo_asgi(self):
+        # AsyncClient recorre el manejador ASGI: las vistas corren en el bucle de eventos
+        respuesta = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertIn('next=', respuesta.url)
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        for nombre in ('pagina_compra', 'dashboard', 'reporte_ventas'):
+            with self.subTest(vista=nombre):
+                respuesta = await self.async_client.get(reverse(nombre))
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertTrue(respuesta.context['productos' if nombre != 'reporte_ventas' else 'ventas'])
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """ Decisiones del router de réplica (sin tocar la base de datos). """
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.vista = lectura_en_replica(lambda request: (alias_lectura(), self.router.db_for_read(Producto)))
+
+    @mock.patch('inventario.routers.replica_configurada', return_value=True)
+    def test_lecturas_de_vistas_marcadas_van_a_la_replica(self, _):
+        self.assertIsNone(self.router.db_for_read(Producto))
+        self.assertEqual(self.vista(RequestFactory().get('/')), ('replica', 'replica'))
+        # Sesiones, usuarios y escrituras quedan en la primaria
+        with leer_de_replica():
+            self.assertIsNone(self.router.db_for_read(User))
+            self.assertEqual(self.router.db_for_write(Producto), 'default')
+            with leer_de_primaria():
+                self.assertIsNone(self.router.db_for_read(Producto))
+
+    @mock.patch('inventario.routers.replica_configurada', return_value=True)
+    def test_quien_acaba_de_escribir_lee_de_la_primaria(self, _):
+        request = RequestFactory().get('/')
+        request.COOKIES[COOKIE_LECTURA_PROPIA] = '1'
+        self.assertEqual(self.vista(request), ('default', None))
+
+    def test_sin_replica_configurada(self):
+        self.assertEqual(self.vista(RequestFactory().get('/')), ('default', None))
+
+
+class LibroStockTests(TestCase):
+    """ Producto.stock debe ser siempre el último corte más los movimientos posteriores. """
+
+    def test_stock_materializado_coincide_con_el_libro(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=10))
+        antes = timezone.now()
+        registrar_carrito([(producto.pk, 3)])
+        self.assertEqual(tomar_corte(), 1)
+        registrar_movimiento(producto.pk, MovimientoStock.DEVOLUCION, 1)
+        producto.stock = 20
+        guardar_producto(producto, stock_anterior=8)
+
+        self.assertEqual(Producto.objects.get(pk=producto.pk).stock, 20)
+        self.assertEqual(diferencias_stock(), [])
+        self.assertEqual(
+            list(producto.movimientos.order_by('id').values_list('tipo', 'cantidad')),
+            [('recepcion', 10), ('venta', -3), ('devolucion', 1), ('ajuste', 12)],
+        )
+        # A una fecha anterior al corte: solo cuenta lo que había entonces
+        self.assertEqual(stock_al(producto.pk, antes), 10)
+        self.assertEqual(stock_al(producto.pk, timezone.now()), 20)
+
+
+@skipUnless(connection.vendor == 'sqlite', "El índice FTS5 es específico de SQLite")
+class IndiceBusquedaTests(TestCase):
+    """ Las migraciones dejan el índice y sus triggers completos (ninguna señal los repara). """
+
+    def test_triggers_creados_por_las_migraciones(self):
+        self.assertFalse(asegurar_indice())
+        higiene = Categoria.objects.create(nombre="Higiene")
+        producto = Producto.objects.create(nombre="Pañal Huggies", categoria=higiene, precio=1000, stock=1)
+        self.assertEqual(list(buscar_productos(Producto.objects.all(), 'panal')), [producto])
+        Categoria.objects.filter(pk=higiene.pk).update(nombre="Cuidado")
+        self.assertEqual(list(buscar_productos(Producto.objects.all(), 'cuidado')), [producto])
+
+    def test_filtro_del_queryset_antes_del_tope(self):
+        panales, ropa = Categoria.objects.bulk_create([Categoria(nombre="Pañales"), Categoria(nombre="Ropa")])
+        # Muchas coincidencias más relevantes (en el nombre) fuera de la categoría buscada
+        Producto.objects.bulk_create([
+            Producto(nombre=f"Pañal {numero}", categoria=panales, precio=1000, stock=1) for numero in range(30)
+        ])
+        body = Producto.objects.create(nombre="Body", variacion="Con cambiador de pañal", categoria=ropa, precio=500, stock=1)
+        Producto.objects.create(nombre="Pañal agotado", categoria=ropa, precio=500, stock=0)
+
+        encontrados = buscar_productos(Producto.objects.filter(categoria=ropa, stock__gt=0), 'panal', limite=5)
+        self.assertEqual(list(encontrados), [body])
+        primeros = list(buscar_productos(Producto.objects.all(), 'panal', limite=5))
+        self.assertEqual(len(primeros), 5)
+        self.assertNotIn(body, primeros)
+
+
+@override_settings(METRICAS_SQL=True)
+class MetricasSQLTests(TestCase):
+    """ Server-Timing cuenta las consultas de la petición, también bajo ASGI sin pasarla a un hilo. """
+
+    def test_consultas_contadas_bajo_wsgi(self):
+        guardar_producto(Producto(nombre="Pañal", precio=1000, stock=5))
+        with CaptureQueriesContext(connection) as consultas, self.assertLogs('inventario.metricas', 'INFO') as log:
+            respuesta = self.client.get(reverse('api_productos'))
+        self.assertIn(f'desc="{len(consultas)} consultas"', respuesta['Server-Timing'])
+        self.assertIn(f'"consultas": {len(consultas)}', log.output[0])
+
+    async def test_middleware_async_bajo_asgi(self):
+        self.assertTrue(iscoroutinefunction(MetricasSQLMiddleware(self._vista_async)))
+        await sync_to_async(guardar_producto)(Producto(nombre="Pañal", precio=1000, stock=5))
+        with self.assertLogs('inventario.metricas', 'INFO'):
+            respuesta = await self.async_client.get(reverse('pagina_compra'))
+        self.assertEqual(respuesta.status_code, 200)
+        # Estado del catálogo, página y categorías (sin sesión)
+        self.assertIn('desc="3 consultas"', respuesta['Server-Timing'])
+
+    @staticmethod
+    async def _vista_async(request):
+        return HttpResponse()
+
+
+class VentasAtomicasTests(TestCase):
+    """ Una venta que no puede completarse no deja rastro: ni stock descontado ni filas escritas. """
+
+    def test_venta_sin_stock_no_descuenta(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=2))
+        with self.assertRaises(StockInsuficiente) as contexto:
+            registrar_venta(producto.pk, 3)
+        self.assertEqual((contexto.exception.cantidad, contexto.exception.producto.stock), (3, 2))
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 2)
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(registrar_venta(producto.pk, 2).producto.stock, 0)
+
+    def test_canasta_se_revierte_entera(self):
+        panal = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=5))
+        toalla = guardar_producto(Producto(nombre="Toalla", precio=500, stock=1))
+        with self.assertRaises(StockInsuficiente):
+            registrar_carrito([(panal.pk, 2), (toalla.pk, 1), (toalla.pk, 1)])
+        self.assertEqual(list(Producto.objects.order_by('id').values_list('stock', flat=True)), [5, 1])
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(VentaDiaria.objects.exists())
+        self.assertFalse(MovimientoStock.objects.filter(tipo=MovimientoStock.VENTA).exists())
+
+    def test_carrito_json_invalido_es_400(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=5))
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        for cuerpo in (
+            '{"lineas": [',
+            '[1, 2]',
+            '{"lineas": [{"producto": "x", "cantidad": 1}]}',
+            '{"lineas": [{"producto": %d, "cantidad": 1}]}' % 10 ** 30,
+            '{"lineas": [{"producto": %d, "cantidad": %d}]}' % (producto.pk, 10 ** 30),
+            '{"lineas": [{"producto": %d, "cantidad": Infinity}]}' % producto.pk,
+            '{"lineas": [{"producto": %d, "cantidad": 1e400}]}' % producto.pk,
+            '{"lineas": [{"producto": %d, "cantidad": 1.5}]}' % producto.pk,
+            '{"lineas": [{"producto": %d, "cantidad": true}]}' % producto.pk,
+            '{"lineas": [{"producto": "%d", "cantidad": 1}]}' % producto.pk,
+        ):
+            with self.subTest(cuerpo=cuerpo):
+                respuesta = self.client.post(reverse('carrito'), cuerpo, content_type='application/json')
+                self.assertEqual(respuesta.status_code, 400)
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 5)
+
+
+class ResumenVentasTests(TestCase):
+    """ VentaDiaria solo cambia junto con Venta: por la caja, nunca a mano en el admin. """
+
+    def test_resumen_incremental_y_admin_de_solo_lectura(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=10))
+        registrar_carrito([(producto.pk, 2), (producto.pk, 1)])
+        resumen = list(VentaDiaria.objects.values_list('producto', 'unidades', 'ingresos', 'transacciones'))
+        self.assertEqual(resumen, [(producto.pk, 3, 3000, 2)])
+        reconstruir_resumen()
+        self.assertEqual(
+            list(VentaDiaria.objects.values_list('producto', 'unidades', 'ingresos', 'transacciones')), resumen,
+        )
+
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        venta = Venta.objects.first()
+        self.assertEqual(self.client.get(reverse('admin:inventario_venta_add')).status_code, 403)
+        self.assertEqual(self.client.post(reverse('admin:inventario_venta_delete', args=[venta.pk])).status_code, 403)
+        self.client.post(reverse('admin:inventario_venta_change', args=[venta.pk]), {'cantidad': 9})
+        self.assertEqual(Venta.objects.get(pk=venta.pk).cantidad, venta.cantidad)
+        self.assertEqual(self.client.get(reverse('admin:inventario_venta_changelist')).status_code, 200)
+
+
+class ImportacionTests(TestCase):
+    """ Una celda inválida es un error de su fila, nunca aborta la importación. """
+
+    def test_valores_no_finitos_o_fuera_de_rango(self):
+        filas = [
+            {'nombre': 'Cantidad infinita', 'precio': '100', 'cantidad': 'Infinity'},
+            {'nombre': 'Cantidad NaN', 'precio': '100', 'cantidad': 'NaN'},
+            {'nombre': 'Cantidad enorme', 'precio': '100', 'cantidad': '1e30'},
+            {'nombre': 'Precio NaN', 'precio': 'NaN', 'cantidad': '1'},
+            {'nombre': 'Precio infinito', 'precio': '-Infinity', 'cantidad': '1'},
+            {'nombre': 'Precio enorme', 'precio': '12345678901', 'cantidad': '1'},
+            {'nombre': 'Precio sin contexto', 'precio': '1e40', 'cantidad': '1'},
+            {'nombre': 'Válido', 'precio': '$ 9999999999', 'cantidad': '2.0'},
+        ]
+        resultado = importar_productos(filas)
+        self.assertEqual([numero for numero, _ in resultado.errores], list(range(2, 9)))
+        self.assertIn('fuera de rango', dict(resultado.errores)[7])
+        self.assertEqual(list(Producto.objects.values_list('nombre', 'precio', 'stock')), [('Válido', 9999999999, 2)])
+
+
+class ContadoresCategoriaTests(TestCase):
+    """ Los contadores de Categoria deben coincidir con un recálculo tras cada tipo de escritura. """
+
+    def test_contadores_siguen_a_los_productos(self):
+        panales, toallas = Categoria.objects.bulk_create([Categoria(nombre="Pañales"), Categoria(nombre="Toallas")])
+        producto = guardar_producto(Producto(nombre="Pañal", categoria=panales, precio=1000, stock=2))
+        registrar_carrito([(producto.pk, 2)])
+        importar_productos([{'nombre': 'Toalla', 'categoria': 'Toallas', 'precio': '500', 'cantidad': '4'}])
+        producto.refresh_from_db()
+        producto.categoria, producto.precio = toallas, 2000
+        guardar_producto(producto, stock_anterior=0)
+        Producto.objects.create(nombre="Sin clase", precio=100, stock=1)
+
+        self.assertEqual(diferencias_contadores(), [])
+        toallas.refresh_from_db()
+        self.assertEqual((toallas.productos_total, toallas.productos_con_stock, toallas.unidades_stock), (2, 1, 4))
+        _, totales = valoracion_inventario()
+        self.assertEqual((totales['unidades_stock'], totales['valor_stock']), (5, 2100))
+
+    def test_editar_categoria_no_pisa_contadores(self):
+        panales = Categoria.objects.create(nombre="Pañales")
+        leida = Categoria.objects.get(pk=panales.pk)
+        # Una venta confirmada después de leer la categoría (como en el formulario o el admin)
+        producto = guardar_producto(Producto(nombre="Pañal", categoria=panales, precio=1000, stock=3))
+        registrar_carrito([(producto.pk, 1)])
+        leida.descripcion = "Todas las tallas"
+        leida.save()
+
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        self.client.post(reverse('categoria_editar', args=[panales.pk]), {'nombre': 'Pañales', 'descripcion': 'Tallas'})
+        panales.refresh_from_db()
+        self.assertEqual((panales.descripcion, panales.productos_total, panales.unidades_stock), ('Tallas', 1, 2))
+        self.assertEqual(diferencias_contadores(), [])
+
+
+class ArchivoVentasTests(TestCase):
+    """ Archivar no debe perder ventas: el reporte y el resumen leen ambas tablas. """
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_inventario(categorias=3, productos=50, ventas=600, dias=200)
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def test_archivar_y_leer_a_traves_del_corte(self):
+        total = Venta.objects.count()
+        resumen = list(VentaDiaria.objects.order_by('fecha', 'producto').values_list('fecha', 'producto', 'unidades'))
+        corte = fecha_corte(3)
+        viejas = Venta.objects.filter(fecha_venta__lt=corte).count()
+        self.assertGreater(viejas, 0)
+
+        # Lotes pequeños: varios por mes
+        self.assertEqual(archivar_ventas(corte, lote=7), viejas)
+        self.assertFalse(Venta.objects.filter(fecha_venta__lt=corte).exists())
+        self.assertEqual(VentaArchivada.objects.count() + Venta.objects.count(), total)
+        self.assertEqual(archivar_ventas(corte), 0)
+
+        # El resumen reconstruido no cambia
+        reconstruir_resumen()
+        self.assertEqual(
+            list(VentaDiaria.objects.order_by('fecha', 'producto').values_list('fecha', 'producto', 'unidades')), resumen
+        )
+
+        # El historial recorre ambas tablas en orden, sin saltos ni repetidos
+        self.client.force_login(self.staff)
+        vistas, cursor = [], None
+        while True:
+            pagina = self.client.get(reverse('reporte_ventas'), {'despues': cursor} if cursor else {}).context['ventas']
+            vistas += [(venta.fecha_venta, venta.id) for venta in pagina]
+            if not pagina.tiene_siguiente:
+                break
+            cursor = pagina.siguiente
+        self.assertEqual(len(vistas), total)
+        self.assertEqual(vistas, sorted(vistas, reverse=True))
+
+        # Y hacia atrás desde la última página
+        anterior = self.client.get(reverse('reporte_ventas'), {'antes': pagina.anterior}).context['ventas']
+        self.assertEqual([(venta.fecha_venta, venta.id) for venta in anterior], vistas[-len(pagina) - len(anterior):-len(pagina)])
+
+        respuesta = self.client.get(reverse('reporte_ventas_exportar', args=['csv']))
+        filas = b''.join(respuesta.streaming_content).decode('utf-8').splitlines()[1:]
+        self.assertEqual(len(filas), total)
+        self.assertEqual([fila.split(',')[0] for fila in filas], sorted(fila.split(',')[0] for fila in filas))
+
+        # El XLSX tiene las mismas filas y lo abre un lector estándar
+        respuesta = self.client.get(reverse('reporte_ventas_exportar', args=['xlsx']))
+        libro = load_workbook(io.BytesIO(b''.join(respuesta.streaming_content)), read_only=True)
+        filas = list(libro['Ventas'].iter_rows(values_only=True))
+        self.assertEqual(list(filas[0]), list(ENCABEZADOS_VENTAS))
+        self.assertEqual(len(filas), total + 1)
+        libro.close()
+
+
+class SincronizacionCajasTests(TestCase):
+    """ Un lote reenviado no debe registrar dos veces ninguna venta. """
+
+    def test_reintento_no_duplica(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=5))
+        ayer = (date.today() - timedelta(days=1)).isoformat()
+        lote = [
+            {'clave': 'a', 'producto': producto.pk, 'cantidad': 2, 'fecha': ayer},
+            {'clave': 'b', 'producto': producto.pk, 'cantidad': 4},
+            {'clave': 'c', 'producto': producto.pk, 'cantidad': 3},
+            {'clave': 'a', 'producto': producto.pk, 'cantidad': 2},
+            {'clave': 'd', 'producto': 999999, 'cantidad': 1},
+            {'clave': 'e', 'producto': producto.pk, 'cantidad': 0},
+            {'clave': 'f', 'producto': 10 ** 30, 'cantidad': 1},
+            {'clave': 'g', 'producto': producto.pk, 'cantidad': float('inf')},
+            {'clave': 'h', 'producto': producto.pk, 'cantidad': 2.7},
+            {'clave': 'i', 'producto': str(producto.pk), 'cantidad': 1},
+        ]
+        estados = [resultado['estado'] for resultado in sincronizar_ventas(lote)]
+        self.assertEqual(estados, ['registrada', 'sin_stock', 'registrada', 'duplicada', 'producto_inexistente'] + ['invalida'] * 5)
+
+        reintento = sincronizar_ventas(lote)
+        self.assertEqual([resultado['estado'] for resultado in reintento][:4], ['duplicada', 'sin_stock', 'duplicada', 'duplicada'])
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 0)
+        self.assertEqual(Venta.objects.get(pk=reintento[0]['venta']).fecha_venta.isoformat(), ayer)
+        self.assertEqual(VentaSincronizada.objects.count(), 2)
+        self.assertEqual((diferencias_stock(), diferencias_contadores()), ([], []))
+
+        # Un número no entero en el cuerpo invalida solo su línea, no el lote
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        respuesta = self.client.post(
+            reverse('sincronizar_ventas'), '{"lineas": [{"clave": "j", "producto": %d, "cantidad": 1e400}]}' % producto.pk,
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.json()['resultados'], [{'clave': 'j', 'estado': 'invalida'}])
+
+
+class DashboardEnVivoTests(TestCase):
+    """ Cada cambio se calcula una vez y llega como diferencias a todos los dashboards abiertos. """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_un_calculo_por_cambio(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=UMBRAL_STOCK_BAJO + 1))
+        local = Publicador()
+        primero, segundo = [], []
+        local.suscribir(lambda *evento: primero.append(evento))
+        local.suscribir(lambda *evento: segundo.append(evento))
+        local.revisar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_carrito([(producto.pk, 2)])
+        with mock.patch('inventario.eventos.obtener_kpis', wraps=obtener_kpis) as calculo:
+            local.revisar()
+            local.revisar()
+        self.assertEqual(calculo.call_count, 1)
+
+        self.assertEqual(primero, segundo)
+        self.assertEqual([nombre for nombre, _ in primero], ['inicio', 'cambios'])
+        cambios = primero[1][1]
+        self.assertEqual(cambios['kpis']['transacciones_hoy'], 1)
+        self.assertNotIn('productos_totales', cambios['kpis'])
+        self.assertEqual([fila['id'] for fila in cambios['stock_bajo']['entran']], [producto.pk])
+
+    async def test_flujo_sse_bajo_asgi(self):
+        staff = await sync_to_async(User.objects.create_user)('staff', password='x', is_staff=True)
+        await sync_to_async(self.async_client.force_login)(staff)
+        with mock.patch.object(publicador, 'iniciar'), override_settings(EVENTOS_DURACION_SEGUNDOS=1):
+            publicador.ultima = instantanea(await aobtener_kpis())
+            respuesta = await self.async_client.get(reverse('dashboard_eventos'))
+            cuerpo = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        self.assertIn('event: inicio\ndata: {"productos_totales": 0', cuerpo)
+        # Al cerrar el flujo se desuscribe y la instantánea se descarta
+        self.assertIsNone(publicador.ultima)
+
+
+@override_settings(TAREAS_TRABAJADOR_EXTERNO=True)
+class TareasSegundoPlanoTests(TestCase):
+    """ Lo encolado por una vista lo ejecuta el trabajador y su resultado se descarga. """
+
+    def setUp(self):
+        directorio_temporal(self, 'TAREAS_DIR')
+
+    def test_exportacion_en_segundo_plano(self):
+        sembrar_inventario(categorias=2, productos=20, ventas=300, dias=30)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+        respuesta = self.client.get(reverse('reporte_ventas_exportar', args=['csv']), {'segundo_plano': '1'})
+        tarea = Tarea.objects.get()
+        self.assertRedirects(respuesta, reverse('tarea_estado', args=[tarea.pk]))
+        self.assertEqual(self.client.get(reverse('tarea_estado', args=[tarea.pk]), {'formato': 'json'}).json()['estado'], 'pendiente')
+
+        self.assertEqual(ejecutar_pendientes(), 1)
+        estado = self.client.get(reverse('tarea_estado', args=[tarea.pk]), {'formato': 'json'}).json()
+        self.assertEqual((estado['estado'], estado['progreso']), ('terminada', 100))
+        descarga = self.client.get(estado['descarga'])
+        self.assertEqual(len(b''.join(descarga.streaming_content).decode('utf-8').splitlines()), 301)
+
+    def test_reintentos_hasta_fallar(self):
+        def falla(progreso):
+            raise RuntimeError("sin conexión")
+
+        with mock.patch.dict(TIPOS, {'falla': (falla, 2)}), self.assertLogs('inventario.tareas', 'ERROR'):
+            tarea = encolar('falla')
+            self.assertEqual(ejecutar_pendientes(), 1)
+            tarea.refresh_from_db()
+            # Reintento programado para más tarde: todavía no se vuelve a tomar
+            self.assertEqual((tarea.estado, tarea.intentos, tarea.mensaje), ('pendiente', 1, 'sin conexión'))
+            self.assertEqual(ejecutar_pendientes(), 0)
+
+            Tarea.objects.filter(pk=tarea.pk).update(disponible_desde=timezone.now())
+            self.assertEqual(ejecutar_pendientes(), 1)
+            tarea.refresh_from_db()
+            self.assertEqual((tarea.estado, tarea.intentos), ('fallida', 2))
+
+
+class PerfiladoTests(TransactionTestCase):
+    """
+    ?perfilar=1 de un staff guarda el perfil completo (también de las vistas
+    async, cuya corrutina corre en otro hilo) y el log SQL; sin la marca, nada.
+    TransactionTestCase: bajo ASGI la petición perfilada usa otra conexión.
+    """
+
+    def setUp(self):
+        self.directorio = directorio_temporal(self, 'PERFILES_DIR')
+        cache.clear()
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        guardar_producto(Producto(nombre="Pañal", precio=1000, stock=10))
+
+    def assertPerfilCompleto(self, respuesta, vista, tabla='inventario_producto'):
+        nombre = respuesta['X-Perfil'].rstrip('/').rsplit('/', 1)[-1]
+        self.assertIn(vista, resumen_funciones(nombre, limite=None))
+        self.assertTrue(any(tabla in consulta['sql'] for consulta in leer_perfil(nombre)['consultas']))
+        return nombre
+
+    def test_perfil_bajo_wsgi_y_retencion(self):
+        self.client.get(reverse('dashboard'), {'perfilar': '1'})
+        self.assertEqual(listar_perfiles(), [])  # sin sesión: no se perfila
+
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Perfil', self.client.get(reverse('dashboard')))
+        with override_settings(PERFILES_MAXIMO=2):
+            self.assertPerfilCompleto(self.client.get(reverse('dashboard'), HTTP_X_PERFILAR='1'), 'dashboard_view')
+            self.assertPerfilCompleto(self.client.get(reverse('dashboard'), {'perfilar': '1'}), 'dashboard_view')
+            nombre = self.assertPerfilCompleto(
+                self.client.get(reverse('categoria_list'), {'perfilar': '1'}), 'categoria_list_view', 'inventario_categoria',
+            )
+        self.assertEqual(len(listar_perfiles()), 2)
+        self.assertEqual(listar_perfiles()[0]['nombre'], nombre)
+        descarga = self.client.get(reverse('perfil_descargar', args=[nombre]))
+        self.assertTrue(b''.join(descarga.streaming_content))
+        self.assertEqual(self.client.get(reverse('perfil_detalle', args=['no-existe'])).status_code, 404)
+
+    async def test_perfil_bajo_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        respuesta = await self.async_client.get(reverse('dashboard'), {'perfilar': '1'})
+        self.assertEqual(respuesta.status_code, 200)
+        await sync_to_async(self.assertPerfilCompleto)(respuesta, 'dashboard_view')
+
+
+class ApiCatalogoTests(TestCase):
+    """ Paginación por cursor, límite y respuestas condicionales de la API del catálogo. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categorias, cls.productos = sembrar_inventario(categorias=3, productos=30, ventas=0)
+
+    def test_paginacion_por_cursor_y_limite(self):
+        ids, cursor = [], None
+        while True:
+            datos = self.client.get(reverse('api_productos'), {'limite': 7, **({'despues': cursor} if cursor else {})}).json()
+            self.assertLessEqual(len(datos['resultados']), 7)
+            ids += [producto['id'] for producto in datos['resultados']]
+            cursor = datos['siguiente']
+            if cursor is None:
+                break
+        self.assertEqual(ids, sorted(p.pk for p in self.productos))
+
+        # Límite fuera de rango o no numérico: se acota o se usa el de por defecto
+        self.assertEqual(len(self.client.get(reverse('api_stock'), {'limite': 0}).json()['resultados']), 1)
+        self.assertEqual(len(self.client.get(reverse('api_stock'), {'limite': 'x'}).json()['resultados']), 30)
+
+    def test_cursor_invalido_es_400(self):
+        for valores in (['abc'], [10 ** 30], [1, 2]):
+            with self.subTest(cursor=valores):
+                respuesta = self.client.get(reverse('api_productos'), {'despues': codificar_cursor(valores)})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json(), {'error': 'Cursor inválido.'})
+        self.assertEqual(self.client.get(reverse('api_categorias'), {'despues': '%%%'}).status_code, 400)
+
+    def test_etag_y_304_hasta_que_cambia_el_catalogo(self):
+        respuesta = self.client.get(reverse('api_productos'))
+        self.assertEqual(respuesta['Cache-Control'], 'public, no-cache')
+        with self.assertNumQueries(1):
+            revalidacion = self.client.get(reverse('api_productos'), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(revalidacion.status_code, 304)
+        # Otra URL es otra representación
+        self.assertNotEqual(self.client.get(reverse('api_stock'))['ETag'], respuesta['ETag'])
+
+        guardar_producto(Producto(nombre="Nuevo", precio=1000, stock=3))
+        self.assertEqual(
+            self.client.get(reverse('api_productos'), HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200,
+        )
+
+
+class CacheHttpTests(TestCase):
+    """ Catálogo revalidable con 304, compresión solo de texto y media inmutable con Range. """
+
+    def test_catalogo_responde_304_hasta_que_cambia(self):
+        producto = guardar_producto(Producto(nombre="Pañal", precio=1000, stock=5))
+        respuesta = self.client.get(reverse('pagina_compra'))
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=60')
+        self.assertIn('Cookie', respuesta['Vary'])
+
+        # Revalidar cuesta una consulta (la versión del catálogo), sin sesión ni productos
+        with self.assertNumQueries(1):
+            revalidacion = self.client.get(reverse('pagina_compra'), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(revalidacion.status_code, 304)
+        self.assertEqual(revalidacion['ETag'], respuesta['ETag'])
+
+        registrar_carrito([(producto.pk, 1)])
+        cambiado = self.client.get(reverse('pagina_compra'), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(cambiado.status_code, 200)
+        self.assertNotEqual(cambiado['ETag'], respuesta['ETag'])
+
+        # Con sesión la página lleva el nombre del usuario: no va a cachés compartidas
+        self.client.force_login(User.objects.create_user('cliente', password='x'))
+        self.assertEqual(self.client.get(reverse('pagina_compra'))['Cache-Control'], 'private, no-cache')
+
+    def test_compresion_solo_de_texto(self):
+        guardar_producto(Producto(nombre="Pañal", precio=1000, stock=5))
+        respuesta = self.client.get(reverse('pagina_compra'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertIn('Pañal', gzip.decompress(respuesta.content).decode())
+
+        media = directorio_temporal(self, 'MEDIA_ROOT')
+        with open(os.path.join(media, 'foto.jpg'), 'wb') as archivo:
+            archivo.write(b'\xff\xd8' * 500)
+        imagen = self.client.get('/media/foto.jpg', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', imagen)
+
+    def test_media_con_range_y_revalidacion(self):
+        media = directorio_temporal(self, 'MEDIA_ROOT')
+        os.makedirs(os.path.join(media, 'productos'))
+        with open(os.path.join(media, 'productos', 'foto.jpg'), 'wb') as archivo:
+            archivo.write(bytes(range(100)))
+
+        # Un original puede reemplazarse con el mismo nombre: se revalida
+        respuesta = self.client.get('/media/productos/foto.jpg')
+        self.assertEqual(b''.join(respuesta.streaming_content), bytes(range(100)))
+        self.assertEqual(respuesta['Cache-Control'], 'public, no-cache')
+        self.assertEqual(respuesta['Accept-Ranges'], 'bytes')
+
+        franja = self.client.get('/media/productos/foto.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(franja.status_code, 206)
+        self.assertEqual(franja['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(franja.streaming_content), bytes(range(10, 20)))
+        final = self.client.get('/media/productos/foto.jpg', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(final.streaming_content), bytes(range(95, 100)))
+        fuera = self.client.get('/media/productos/foto.jpg', HTTP_RANGE='bytes=200-')
+        self.assertEqual((fuera.status_code, fuera['Content-Range']), (416, 'bytes */100'))
+        # If-Range con un ETag viejo: el archivo entero
+        viejo = self.client.get('/media/productos/foto.jpg', HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(viejo.status_code, 200)
+
+        self.assertEqual(
+            self.client.get('/media/productos/foto.jpg', HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304,
+        )
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+        with override_settings(MEDIA_ENTREGA='x-accel'):
+            proxy = self.client.get('/media/productos/foto.jpg')
+        self.assertEqual(proxy['X-Accel-Redirect'], '/media-interna/productos/foto.jpg')
+        self.assertEqual(proxy['Content-Type'], 'image/jpeg')
+
+    def test_variantes_con_huella_son_inmutables(self):
+        directorio_temporal(self, 'MEDIA_ROOT')
+        imagen = io.BytesIO()
+        Image.new('RGB', (800, 600), (200, 40, 40)).save(imagen, 'PNG')
+        producto = Producto.objects.create(nombre="Pañal", precio=1000, stock=1)
+        Producto.objects.filter(pk=producto.pk).update(imagen=default_storage.save('productos/foto.png', ContentFile(imagen.getvalue())))
+
+        procesar_producto(producto.pk)
+        producto.refresh_from_db()
+        self.assertTrue(producto.imagen_variantes)
+        variante = ruta_variante(producto.imagen.name, 'mini', 'webp', producto.imagen_huella)
+        self.assertEqual(variante, f'productos/variantes/foto-mini.{producto.imagen_huella}.webp')
+        respuesta = self.client.get(default_storage.url(variante))
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        # Regenerar con otra calidad no reescribe la URL que los navegadores guardan
+        with mock.patch.dict(FORMATOS, {'webp': ('WEBP', {'quality': 40})}):
+            procesar_producto(producto.pk)
+        huella = Producto.objects.values_list('imagen_huella', flat=True).get(pk=producto.pk)
+        self.assertNotEqual(huella, producto.imagen_huella)
+        self.assertTrue(default_storage.exists(variante))
+        self.assertTrue(default_storage.exists(ruta_variante(producto.imagen.name, 'mini', 'webp', huella)))
@@ -0,0 +1,82 @@
+"""
+Tipos de tarea en segundo plano (ver inventario.tareas). Se registran al
+cargar la app (InventarioConfig.ready).
+"""
+import csv
+import io
+from datetime import date
+from pathlib import Path
+
+from django.db.models import Sum
+
+from .archivo import ENCABEZADOS_VENTAS, filas_ventas
+from .exportacion import escribir_exportacion
+from .imagenes import procesar_producto
+from .importacion import importar_productos, leer_archivo
+from .models import VentaDiaria
+from .tareas import directorio_tareas, tarea
+
+
+def _fecha(valor):
+    return date.fromisoformat(valor) if valor else None
+
+
+def ventas_estimadas(desde=None, hasta=None):
+    """ Ventas del rango según el resumen diario (sin recorrer Venta). """
+    resumen = VentaDiaria.objects.all()
+    if desde:
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta:
+        resumen = resumen.filter(fecha__lte=hasta)
+    return resumen.aggregate(total=Sum('transacciones'))['total'] or 0
+
+
+@tarea('exportar_ventas')
+def exportar_ventas(progreso, formato='csv', desde=None, hasta=None):
+    """ Genera el CSV/XLSX de ventas del rango en TAREAS_DIR (repetible: se reescribe entero). """
+    desde, hasta = _fecha(desde), _fecha(hasta)
+    total = ventas_estimadas(desde, hasta)
+
+    def con_progreso(filas):
+        for numero, fila in enumerate(filas, start=1):
+            if numero % 1000 == 0:
+                progreso.avanzar(numero, total, f"{numero:,} de {total:,} ventas")
+            yield fila
+
+    nombre = f"ventas_{desde or 'inicio'}_{hasta or 'hoy'}.{formato}"
+    with progreso.archivo(nombre) as destino:
+        escribir_exportacion(destino, formato, ENCABEZADOS_VENTAS, con_progreso(filas_ventas(desde, hasta)), hoja='Ventas')
+    return f"{total:,} ventas exportadas."
+
+
+# Un reintento volvería a sumar el stock de los lotes ya aplicados
+@tarea('importar_productos', max_intentos=1)
+def importar_archivo(progreso, archivo, nombre):
+    """
+    Importa un archivo subido (guardado en TAREAS_DIR/entradas) y lo borra al
+    terminar. Si hubo filas con errores, quedan como CSV de resultado.
+    """
+    ruta = directorio_tareas() / archivo
+    try:
+        with open(ruta, 'rb') as origen:
+            resultado = importar_productos(
+                leer_archivo(origen, nombre),
+                progreso=lambda parcial: progreso.avanzar(mensaje=f"{parcial.filas:,} filas procesadas"),
+            )
+    finally:
+        Path(ruta).unlink(missing_ok=True)
+
+    if resultado.errores:
+        texto = io.StringIO()
+        escritor = csv.writer(texto)
+        escritor.writerow(['Fila', 'Motivo'])
+        escritor.writerows(resultado.errores)
+        with progreso.archivo('errores.csv') as destino:
+            destino.write(('\ufeff' + texto.getvalue()).encode('utf-8'))
+    return f"Importación terminada. {resultado}"
+
+
+@tarea('variantes_imagen')
+def variantes_imagen(progreso, producto_id):
+    """ Miniaturas WebP/JPEG de la imagen de un producto. """
+    procesar_producto(producto_id)
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views 
-from . import views
+from . import api, views
 
 urlpatterns = [
     # --------------------------------------------------------
@@ -24,17 +24,41 @@ urlpatterns = [
     
     # 1. DASHBOARD y REPORTES
     path('dashboard/', views.dashboard_view, name='dashboard'), 
+    path('dashboard/eventos/', views.dashboard_eventos_view, name='dashboard_eventos'),
     path('reporte/ventas/', views.reporte_ventas_view, name='reporte_ventas'),
+    path('reporte/ventas/exportar/<str:formato>/', views.reporte_ventas_exportar_view, name='reporte_ventas_exportar'),
+    path('reporte/valoracion/', views.reporte_valoracion_view, name='reporte_valoracion'),
     path('venta/registrar/', views.registrar_venta_view, name='registrar_venta'),
+    path('venta/carrito/', views.carrito_view, name='carrito'),
+    path('venta/sincronizar/', views.sincronizar_ventas_view, name='sincronizar_ventas'),
 
     # 2. CRUD DE PRODUCTOS
     path('producto/nuevo/', views.producto_crear_view, name='producto_crear'), 
     path('producto/editar/<int:pk>/', views.producto_crear_view, name='producto_editar'), 
     path('producto/eliminar/<int:pk>/', views.producto_eliminar_view, name='producto_eliminar'),
+    path('producto/importar/', views.importar_productos_view, name='importar_productos'),
+    path('producto/buscar/', views.producto_buscar_view, name='producto_buscar'),
 
     # 3. CRUD DE CATEGORÍAS
     path('categorias/', views.categoria_list_view, name='categoria_list'), 
     path('categoria/nuevo/', views.categoria_crear_view, name='categoria_crear'), 
     path('categoria/editar/<int:pk>/', views.categoria_crear_view, name='categoria_editar'), 
     path('categoria/eliminar/<int:pk>/', views.categoria_eliminar_view, name='categoria_eliminar'),
+
+    # 4. TAREAS EN SEGUNDO PLANO (exportaciones grandes, importaciones)
+    path('tarea/<int:pk>/', views.tarea_estado_view, name='tarea_estado'),
+    path('tarea/<int:pk>/descargar/', views.tarea_descargar_view, name='tarea_descargar'),
+
+    # 5. PERFILES DE PETICIONES (staff; se crean con ?perfilar=1)
+    path('perfiles/', views.perfil_list_view, name='perfil_list'),
+    path('perfiles/<str:nombre>/', views.perfil_detalle_view, name='perfil_detalle'),
+    path('perfiles/<str:nombre>/descargar/', views.perfil_descargar_view, name='perfil_descargar'),
+
+    # --------------------------------------------------------
+    # API JSON DE SOLO LECTURA (TIENDA EN LÍNEA Y QUIOSCOS)
+    # --------------------------------------------------------
+    path('api/v1/productos/', api.productos_api, name='api_productos'),
+    path('api/v1/productos/<int:pk>/', api.producto_detalle_api, name='api_producto_detalle'),
+    path('api/v1/categorias/', api.categorias_api, name='api_categorias'),
+    path('api/v1/stock/', api.stock_api, name='api_stock'),
 ]
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Registro de ventas con descuento de stock atómico.
+
+El stock se descuenta con un único UPDATE condicional
+(`stock = stock - n WHERE stock >= n`), de modo que la base de datos decide
+si hay unidades suficientes: dos cajas vendiendo el mismo producto a la vez
+nunca pueden dejarlo en negativo ni pisarse la actualización. La inserción
+de la Venta y la actualización del resumen diario ocurren en la misma
+transacción que el descuento, igual que el movimiento de salida en el libro
+de stock (inventario.movimientos).
+
+Las cajas que trabajan sin conexión envían luego sus ventas en lote con
+sincronizar_ventas(): cada línea trae una clave de idempotencia, así un
+reintento tras un corte de red no registra dos veces la misma venta.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .contadores import aplicar_deltas, sumar_producto
+from .kpis import invalidar_kpis
+from .models import MovimientoStock, Producto, Venta, VentaSincronizada
+from .movimientos import anotar_movimientos
+from .resumenes import acumular_ventas
+from .version_catalogo import marcar_cambio_catalogo
+
+
+# Enteros que aceptan las columnas: cantidad es IntegerField (32 bits en
+# PostgreSQL y MySQL) y los id, 64 bits con signo como máximo. Un valor mayor
+# llegado de una caja haría fallar al driver con OverflowError.
+MAXIMA_CANTIDAD = 2 ** 31 - 1
+MAXIMO_ID = 2 ** 63 - 1
+
+
+def entero_json(valor):
+    """
+    `valor` si es un entero de JSON; ValueError si no. Rechaza bool y float
+    (1.9 no debe vender 1 unidad; Infinity o 1e400 harían fallar a int()) y
+    también los textos.
+    """
+    if type(valor) is not int:
+        raise ValueError(f"Se esperaba un número entero: {valor!r}.")
+    return valor
+
+
+class StockInsuficiente(Exception):
+    """ El producto no tiene unidades suficientes para la venta solicitada. """
+
+    def __init__(self, producto, cantidad):
+        self.producto = producto
+        self.cantidad = cantidad
+        super().__init__(
+            f"Stock insuficiente para {producto.nombre}: se pidieron {cantidad} y hay {producto.stock}."
+        )
+
+
+class LoteEnConflicto(Exception):
+    """ El stock cambió entre la lectura y el descuento de un lote sincronizado; se puede reintentar. """
+
+
+def descontar_stock(producto_id, cantidad):
+    """
+    Descuenta `cantidad` unidades del producto con un UPDATE condicional.
+    Devuelve True si se descontó y False si no había stock suficiente.
+    Debe llamarse dentro de una transacción.
+    """
+    actualizados = Producto.objects.filter(
+        pk=producto_id, stock__gte=cantidad
+    ).update(stock=F('stock') - cantidad)
+    return actualizados == 1
+
+
+def registrar_venta(producto_id, cantidad):
+    """
+    Registra la venta de `cantidad` unidades del producto y descuenta su stock.
+
+    Devuelve la Venta creada (con `venta.producto` ya actualizado).
+    Lanza StockInsuficiente si no hay unidades y Producto.DoesNotExist si el
+    producto no existe; en ambos casos no se escribe nada.
+    """
+    return registrar_carrito([(producto_id, cantidad)])[0]
+
+
+def registrar_carrito(lineas):
+    """
+    Registra una canasta completa: `lineas` es una lista de (producto_id, cantidad).
+
+    Lanza ValueError si la canasta está vacía o alguna línea trae una cantidad
+    no positiva o un valor fuera de rango (ver MAXIMA_CANTIDAD y MAXIMO_ID).
+
+    Todo ocurre en una sola transacción: un UPDATE condicional por producto
+    (en orden de id, para que dos cajas no se bloqueen mutuamente), una lectura
+    de precios y un único INSERT masivo con todas las ventas. Si alguna línea
+    no tiene stock suficiente se revierte la canasta entera.
+    """
+    if not lineas:
+        raise ValueError("La canasta está vacía.")
+
+    totales = {}
+    for producto_id, cantidad in lineas:
+        if cantidad <= 0:
+            raise ValueError("La cantidad vendida debe ser mayor que cero.")
+        if not -MAXIMO_ID <= producto_id <= MAXIMO_ID:
+            raise ValueError("Id de producto fuera de rango.")
+        totales[producto_id] = totales.get(producto_id, 0) + cantidad
+        if totales[producto_id] > MAXIMA_CANTIDAD:
+            raise ValueError("Cantidad fuera de rango.")
+
+    with transaction.atomic():
+        # Primero se escribe: así la transacción toma el bloqueo de escritura
+        # antes de leer y no queda a medias esperando a otra caja.
+        for producto_id in sorted(totales):
+            if not descontar_stock(producto_id, totales[producto_id]):
+                producto = Producto.objects.only('nombre', 'variacion', 'precio', 'stock').get(pk=producto_id)
+                raise StockInsuficiente(producto, totales[producto_id])
+
+        productos = Producto.objects.only('nombre', 'variacion', 'precio', 'stock', 'categoria').in_bulk(list(totales))
+
+        ventas = Venta.objects.bulk_create([
+            Venta(
+                producto=productos[producto_id],
+                cantidad=cantidad,
+                precio_unitario=productos[producto_id].precio,
+            )
+            for producto_id, cantidad in lineas
+        ])
+        _completar_ventas(ventas, productos, totales)
+    return ventas
+
+
+def _completar_ventas(ventas, productos, totales):
+    """
+    Lo que acompaña a toda venta insertada, en su misma transacción: salida en
+    el libro de stock, resumen diario, contadores de categoría y versión del
+    catálogo. `productos` ya tiene el stock descontado; `totales` son las
+    unidades descontadas por producto.
+    """
+    anotar_movimientos([
+        MovimientoStock(producto_id=venta.producto_id, tipo=MovimientoStock.VENTA, cantidad=-venta.cantidad, venta=venta)
+        for venta in ventas
+    ])
+    acumular_ventas(ventas)
+    contadores = {}
+    for producto_id, cantidad in totales.items():
+        producto = productos[producto_id]
+        sumar_producto(contadores, producto.categoria_id, producto.stock + cantidad, producto.precio, signo=-1)
+        sumar_producto(contadores, producto.categoria_id, producto.stock, producto.precio)
+    aplicar_deltas(contadores)
+    marcar_cambio_catalogo()
+    # UPDATE y bulk_create no emiten señales: se invalida a mano al confirmar
+    transaction.on_commit(invalidar_kpis)
+
+
+# =======================================================
+# --- SINCRONIZACIÓN DE CAJAS SIN CONEXIÓN ---
+# =======================================================
+
+# Líneas máximas por petición (la caja parte su cola en varios envíos)
+LIMITE_SINCRONIZACION = 500
+
+REGISTRADA = 'registrada'
+DUPLICADA = 'duplicada'
+SIN_STOCK = 'sin_stock'
+PRODUCTO_INEXISTENTE = 'producto_inexistente'
+INVALIDA = 'invalida'
+
+
+def _leer_linea(dato):
+    """ Valida {"clave", "producto", "cantidad", "fecha" (opcional)}; lanza ValueError (o KeyError/TypeError) si no sirve. """
+    clave = dato['clave']
+    if not isinstance(clave, str) or not clave or len(clave) > VentaSincronizada._meta.get_field('clave').max_length:
+        raise ValueError("Clave de idempotencia inválida.")
+    cantidad = entero_json(dato['cantidad'])
+    if not 0 < cantidad <= MAXIMA_CANTIDAD:
+        raise ValueError("La cantidad vendida debe ser mayor que cero y estar en rango.")
+    producto_id = entero_json(dato['producto'])
+    if not -MAXIMO_ID <= producto_id <= MAXIMO_ID:
+        raise ValueError("Id de producto fuera de rango.")
+    fecha = date.fromisoformat(dato['fecha']) if dato.get('fecha') else date.today()
+    if fecha > date.today():
+        raise ValueError("La fecha de venta no puede ser futura.")
+    return clave, producto_id, cantidad, fecha
+
+
+def claves_registradas(claves):
+    """ {clave: venta_id} de las claves dadas que ya se registraron. """
+    if not claves:
+        return {}
+    return dict(VentaSincronizada.objects.filter(clave__in=list(claves)).values_list('clave', 'venta_id'))
+
+
+def sincronizar_ventas(datos, terminal=''):
+    """
+    Registra un lote de ventas hechas sin conexión. `datos` es la lista de
+    líneas de la caja; devuelve un resultado por línea, en el mismo orden:
+    {'clave', 'estado'} más 'venta' (id) si quedó registrada.
+
+    - Una clave ya registrada (un reintento) responde 'duplicada' con la venta
+      original, sin volver a descontar stock.
+    - Una línea sin stock suficiente se rechaza sola ('sin_stock'); las líneas
+      de un mismo producto se aceptan en el orden en que llegan. Su clave no
+      se guarda: la caja puede reenviarla tras un ajuste de stock.
+    - Todo lo aceptado se escribe en una transacción: un único UPDATE (con CASE)
+      descuenta el stock de todos los productos y las ventas, el libro y las
+      claves se insertan en bloque.
+    """
+    if not isinstance(datos, list) or len(datos) > LIMITE_SINCRONIZACION:
+        raise ValueError(f"El lote debe ser una lista de hasta {LIMITE_SINCRONIZACION} líneas.")
+
+    resultados = [None] * len(datos)
+    lineas = []
+    for posicion, dato in enumerate(datos):
+        try:
+            lineas.append((posicion, *_leer_linea(dato)))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            clave = dato.get('clave') if isinstance(dato, dict) else None
+            resultados[posicion] = {'clave': clave, 'estado': INVALIDA}
+
+    with transaction.atomic():
+        # Con el perfil de producción (BEGIN IMMEDIATE) la transacción ya tiene el
+        # candado de escritura: otro envío de las mismas claves espera y luego las
+        # encuentra aquí. La restricción única de la clave es la red de seguridad.
+        previas = claves_registradas({linea[1] for linea in lineas})
+        nuevas, primeras, repetidas = [], {}, []
+        for linea in lineas:
+            posicion, clave = linea[:2]
+            if clave in previas:
+                resultados[posicion] = {'clave': clave, 'estado': DUPLICADA, 'venta': previas[clave]}
+            elif clave in primeras:
+                repetidas.append((posicion, primeras[clave]))
+            else:
+                primeras[clave] = posicion
+                nuevas.append(linea)
+
+        productos = Producto.objects.only('precio', 'stock', 'categoria').in_bulk({linea[2] for linea in nuevas})
+        totales, aceptadas = {}, []
+        for posicion, clave, producto_id, cantidad, fecha in nuevas:
+            producto = productos.get(producto_id)
+            if producto is None:
+                resultados[posicion] = {'clave': clave, 'estado': PRODUCTO_INEXISTENTE}
+            elif producto.stock - totales.get(producto_id, 0) < cantidad:
+                resultados[posicion] = {'clave': clave, 'estado': SIN_STOCK}
+            else:
+                totales[producto_id] = totales.get(producto_id, 0) + cantidad
+                aceptadas.append((posicion, clave, producto_id, cantidad, fecha))
+
+        if aceptadas:
+            descuento = Case(
+                *[When(pk=pk, then=Value(cantidad)) for pk, cantidad in totales.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            # Condicional como descontar_stock(): si otra escritura se coló tras la lectura, no queda negativo
+            actualizados = Producto.objects.filter(pk__in=list(totales), stock__gte=descuento).update(
+                stock=F('stock') - descuento
+            )
+            if actualizados != len(totales):
+                raise LoteEnConflicto("El stock cambió durante la sincronización.")
+            for producto_id, cantidad in totales.items():
+                productos[producto_id].stock -= cantidad
+
+            ventas = Venta.objects.bulk_create([
+                Venta(
+                    producto=productos[producto_id],
+                    cantidad=cantidad,
+                    precio_unitario=productos[producto_id].precio,
+                    fecha_venta=fecha,
+                )
+                for _, _, producto_id, cantidad, fecha in aceptadas
+            ])
+            VentaSincronizada.objects.bulk_create([
+                VentaSincronizada(clave=clave, terminal=terminal, venta=venta)
+                for (_, clave, *_), venta in zip(aceptadas, ventas)
+            ])
+            _completar_ventas(ventas, productos, totales)
+            for (posicion, clave, *_), venta in zip(aceptadas, ventas):
+                resultados[posicion] = {'clave': clave, 'estado': REGISTRADA, 'venta': venta.pk}
+
+    # Una clave repetida dentro del mismo lote corre la suerte de su primera aparición
+    for posicion, primera in repetidas:
+        resultado = dict(resultados[primera])
+        if resultado['estado'] == REGISTRADA:
+            resultado['estado'] = DUPLICADA
+        resultados[posicion] = resultado
+    return resultados
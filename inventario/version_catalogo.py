@@ -0,0 +1,33 @@
+"""
+Versión del catálogo para las respuestas condicionales de la API.
+
+Una sola fila (EstadoCatalogo, pk=1) con un contador y la fecha del último
+cambio. Sube en la misma transacción que cualquier escritura de productos,
+categorías o stock (señales para save/delete y llamada explícita desde los
+servicios que escriben en masa). La API calcula ETag y Last-Modified con
+una lectura por clave primaria de esa fila, sin tocar la tabla de productos.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EstadoCatalogo
+
+ESTADO_PK = 1
+
+
+def obtener_estado():
+    """ Devuelve (version, modificado) del catálogo. """
+    fila = EstadoCatalogo.objects.filter(pk=ESTADO_PK).values_list('version', 'modificado').first()
+    if fila is None:
+        estado, _ = EstadoCatalogo.objects.get_or_create(pk=ESTADO_PK)
+        fila = (estado.version, estado.modificado)
+    return fila
+
+
+def marcar_cambio_catalogo():
+    """ Sube la versión del catálogo. Llamar dentro de la transacción del cambio. """
+    actualizados = EstadoCatalogo.objects.filter(pk=ESTADO_PK).update(
+        version=F('version') + 1, modificado=timezone.now()
+    )
+    if not actualizados:
+        EstadoCatalogo.objects.get_or_create(pk=ESTADO_PK, defaults={'version': 1})
@@ -1,12 +1,40 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import urlencode
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, DecimalField, F
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Sum, Count, DecimalField, F, Q
 from django.contrib import messages
 from django import forms 
-from .models import Producto, Venta, Categoria # Importa todos los modelos necesarios
-from .forms import CustomUserCreationForm, ProductoForm, VentaForm # Asegúrate de que estos forms existan
+from .models import Producto, Venta, Categoria, VentaDiaria, Tarea # Importa todos los modelos necesarios
+from .forms import CustomUserCreationForm, ProductoForm, VentaForm, CarritoFormSet, FiltroReporteForm, ImportacionProductosForm # Asegúrate de que estos forms existan
+from .paginacion import PaginaKeyset, apaginar_keyset
+from .busqueda import LIMITE_RESULTADOS, buscar_productos
+from .exportacion import respuesta_csv, respuesta_xlsx
+from .kpis import aobtener_kpis
+from .eventos import flujo_eventos
+from .routers import alias_lectura, lectura_en_replica
+from .movimientos import guardar_producto
+from .contadores import valoracion_inventario
+from .archivo import ENCABEZADOS_VENTAS, filas_ventas, ventas_en_rango
+from .importacion import COLUMNAS
+from .tareas import encolar, guardar_entrada, ruta_resultado
+from .perfiles import leer_perfil, listar_perfiles, resumen_funciones, ruta_perfil
+from .cache_http import etag_catalogo, no_modificado, politica_catalogo
+from .version_catalogo import obtener_estado
+from .trabajos import ventas_estimadas
+from .ventas import (
+    LIMITE_SINCRONIZACION, LoteEnConflicto, StockInsuficiente, claves_registradas, entero_json, registrar_carrito,
+    registrar_venta, sincronizar_ventas,
+)
+from asgiref.sync import sync_to_async
 from datetime import date 
+from functools import wraps
 import datetime # Se usa para datetime.date.today()
+import json
 
 # -----------------------------------------------------------------
 # --- Definición de Formularios Auxiliares ---
@@ -19,15 +47,104 @@ class CategoriaForm(forms.ModelForm):
 # -----------------------------------------------------------------
 
 
+# Tamaño de página del catálogo público
+PRODUCTOS_POR_PAGINA = 24
+
+# Transacciones por página en el historial del reporte de ventas
+VENTAS_POR_PAGINA = 50
+
+# Sugerencias del buscador de productos de la caja (y columnas que devuelve)
+LIMITE_AUTOCOMPLETAR = 20
+CAMPOS_AUTOCOMPLETAR = ('id', 'nombre', 'variacion', 'precio', 'stock')
+
+
+# =======================================================
+# --- SOPORTE PARA VISTAS ASYNC ---
+# =======================================================
+# Catálogo, dashboard y reporte son vistas async: bajo ASGI esperan a la base
+# de datos sin ocupar un hilo por petición. Sus consultas se esperan una tras
+# otra: el ORM async de Django las corre con sync_to_async en un único hilo,
+# así que lanzarlas juntas (asyncio.gather) no las solaparía. Todo lo que la
+# plantilla recorre se materializa antes de render() (el ORM síncrono no se
+# puede usar dentro del bucle de eventos).
+
+def _cargar_usuario(request):
+    # Sesión y usuario se leen con el ORM síncrono: se resuelven una vez, fuera del bucle
+    return sync_to_async(lambda: request.user.is_authenticated)()
+
+def login_requerido_async(vista):
+    """ login_required para vistas async (el de Django 4.2 solo envuelve vistas síncronas). """
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        if not await _cargar_usuario(request):
+            return redirect_to_login(request.get_full_path())
+        return await vista(request, *args, **kwargs)
+    return envoltura
+
+async def _en_lista(filas):
+    """ Materializa un queryset (o un aiterator) con el ORM async. """
+    return [fila async for fila in filas]
+
+def _buscar_async(queryset, texto, limite):
+    # La búsqueda FTS ejecuta SQL crudo con un cursor síncrono
+    return sync_to_async(lambda: list(buscar_productos(queryset, texto, limite)))()
+
+
 # =======================================================
 # --- VISTAS PÚBLICAS Y DE AUTENTICACIÓN ---
 # =======================================================
 
-def pagina_compra_view(request):
-    """ Muestra el catálogo de productos disponibles para los compradores (público). """
-    productos_disponibles = Producto.objects.filter(stock__gt=0).order_by('nombre')
-    context = {'productos': productos_disponibles}
-    return render(request, 'inventario/pagina_compra.html', context)
+@lectura_en_replica
+async def pagina_compra_view(request):
+    """
+    Muestra el catálogo de productos disponibles para los compradores (público).
+    Paginado por (nombre, id) con cursores, filtrable por categoría y con la
+    categoría traída en la misma consulta (sin una consulta extra por tarjeta).
+    Con ?q= muestra los resultados del índice de búsqueda, por relevancia.
+
+    Cacheable (ver inventario.cache_http): si el cliente ya tiene la versión
+    actual del catálogo recibe 304 sin consultar productos.
+    """
+    version, _ = await sync_to_async(obtener_estado)()
+    # La cabecera de la plantilla (y el ETag) usan request.user
+    await _cargar_usuario(request)
+    etag = etag_catalogo(request, version)
+    respuesta = no_modificado(request, etag)
+    if respuesta is not None:
+        return politica_catalogo(request, respuesta, etag)
+
+    productos_disponibles = Producto.objects.filter(stock__gt=0).select_related('categoria')
+
+    categoria_actual = None
+    categoria_id = request.GET.get('categoria', '')
+    if categoria_id.isdigit():
+        categoria_actual = int(categoria_id)
+        productos_disponibles = productos_disponibles.filter(categoria_id=categoria_actual)
+
+    busqueda = request.GET.get('q', '').strip()
+    if busqueda:
+        # Una sola página con los más relevantes (el orden no es por nombre)
+        pagina = PaginaKeyset(await _buscar_async(productos_disponibles, busqueda, PRODUCTOS_POR_PAGINA * 2))
+    else:
+        pagina = await apaginar_keyset(
+            productos_disponibles,
+            ('nombre', 'id'),
+            despues=request.GET.get('despues'),
+            antes=request.GET.get('antes'),
+            tamano=PRODUCTOS_POR_PAGINA,
+        )
+
+    categorias = await _en_lista(Categoria.objects.order_by('nombre').only('id', 'nombre'))
+
+    context = {
+        'productos': pagina,
+        'pagina': pagina,
+        'categorias': categorias,
+        'categoria_actual': categoria_actual,
+        'busqueda': busqueda,
+    }
+    respuesta = render(request, 'inventario/pagina_compra.html', context)
+    return politica_catalogo(request, respuesta, etag)
 
 def register_view(request):
     """ Vista de Registro de Usuario. """
@@ -48,8 +165,9 @@ def register_view(request):
 # --- VISTAS PROTEGIDAS (DASHBOARD y PRODUCTOS) ---
 # =======================================================
 
-@login_required
-def dashboard_view(request):
+@login_requerido_async
+@lectura_en_replica
+async def dashboard_view(request):
     """
     Vista principal del Dashboard con KPIs.
     CRÍTICO: REDIRECCIÓN a 'pagina_compra' si el usuario NO es staff.
@@ -57,39 +175,50 @@ def dashboard_view(request):
     if not request.user.is_staff:
         return redirect('pagina_compra')
     
-    # --- 1. Datos de Productos ---
-    productos = Producto.objects.all().order_by('nombre')
-    
-    # --- 2. Alerta de Stock Bajo (CRÍTICO: QuerySet para ser iterable) ---
-    # ESTO ES LO QUE ARREGLA EL TypeError 'int' object is not iterable
-    alerta_stock_bajo = Producto.objects.filter(stock__lt=50).order_by('stock')
-    
-    # --- 3. KPIs y Métricas ---
-    productos_totales = productos.count()
-    categorias_totales = Categoria.objects.count()
+    # --- 1. Datos de Productos (la categoría viene en la misma consulta) ---
+    productos = Producto.objects.select_related('categoria').order_by('nombre')
+    busqueda = request.GET.get('q', '').strip()
+    if busqueda:
+        productos = await _buscar_async(productos, busqueda, LIMITE_RESULTADOS)
+    else:
+        productos = await _en_lista(productos.aiterator(chunk_size=2000))
     
-    # Cálculo robusto del total de ventas monetario de hoy
-    try:
-        ventas_hoy_qs = Venta.objects.filter(fecha_venta=date.today()).aggregate(
-            total_sum=Sum(F('cantidad') * F('precio_unitario'), output_field=DecimalField())
-        )
-        total_ventas_hoy = ventas_hoy_qs['total_sum'] if ventas_hoy_qs['total_sum'] is not None else 0
-        transacciones_hoy = Venta.objects.filter(fecha_venta=date.today()).count()
-    except Exception as e:
-        print(f"Error al calcular ventas del día: {e}")
-        total_ventas_hoy = 0
-        transacciones_hoy = 0
+    # --- 2. KPIs, métricas y alerta de stock bajo (desde la caché) ---
+    kpis = await aobtener_kpis()
     
     context = {
         'productos': productos,
-        'alerta_stock_bajo': alerta_stock_bajo,  # QuerySet de productos (iterable)
-        'productos_totales': productos_totales,
-        'categorias_totales': categorias_totales,
-        'total_ventas_hoy': total_ventas_hoy,  # Valor monetario
-        'transacciones_hoy': transacciones_hoy, # Cantidad de ventas
+        'alerta_stock_bajo': kpis['alerta_stock_bajo'],  # Lista de productos (iterable)
+        'productos_totales': kpis['productos_totales'],
+        'categorias_totales': kpis['categorias_totales'],
+        'total_ventas_hoy': kpis['total_ventas_hoy'],  # Valor monetario
+        'transacciones_hoy': kpis['transacciones_hoy'], # Cantidad de ventas
+        'valor_inventario': kpis['valor_inventario'],
+        'unidades_inventario': kpis['unidades_inventario'],
+        'busqueda': busqueda,
     }
     return render(request, 'inventario/dashboard.html', context)
 
+@login_requerido_async
+async def dashboard_eventos_view(request):
+    """
+    Flujo Server-Sent Events del dashboard: los cambios de KPIs y de la alerta
+    de stock bajo llegan sin recargar la página (ver inventario.eventos).
+    Requiere ASGI: bajo WSGI cada conexión ocuparía un hilo durante minutos,
+    así que responde 204 y el navegador deja de intentarlo (la página sigue
+    funcionando como antes, con recarga manual).
+    """
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    respuesta = StreamingHttpResponse(flujo_eventos(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # nginx no debe acumular el flujo en su búfer
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
 @login_required
 def producto_crear_view(request, pk=None):
     """ Vista para Crear y Editar Productos - Protegida """
@@ -101,7 +230,8 @@ def producto_crear_view(request, pk=None):
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES, instance=producto) 
         if form.is_valid():
-            form.save()
+            # El cambio de stock entra al libro como ajuste (no se sobrescribe la columna)
+            guardar_producto(form.save(commit=False), form.initial.get('stock'))
             messages.success(request, "Producto guardado correctamente.")
             return redirect('dashboard')
     else:
@@ -127,6 +257,29 @@ def producto_eliminar_view(request, pk):
         return redirect('dashboard')
     return render(request, 'inventario/producto_confirm_delete.html', {'producto': producto})
 
+@login_required
+def importar_productos_view(request):
+    """
+    Carga masiva de productos y entradas de stock desde CSV/XLSX - Protegida.
+    El archivo se importa como tarea en segundo plano; se redirige a su estado.
+    """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+
+    if request.method == 'POST':
+        form = ImportacionProductosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            nueva = encolar(
+                'importar_productos', usuario=request.user, archivo=guardar_entrada(archivo), nombre=archivo.name,
+            )
+            messages.info(request, "Archivo recibido: la importación sigue en segundo plano.")
+            return redirect('tarea_estado', pk=nueva.pk)
+    else:
+        form = ImportacionProductosForm()
+
+    return render(request, 'inventario/importar_productos.html', {'form': form, 'columnas': COLUMNAS})
+
 @login_required
 def registrar_venta_view(request):
     """ Vista para el registro manual de ventas - Protegida """
@@ -136,21 +289,18 @@ def registrar_venta_view(request):
     if request.method == 'POST':
         form = VentaForm(request.POST)
         if form.is_valid():
-            venta = form.save(commit=False)
-            producto_vendido = venta.producto
-            cantidad_vendida = venta.cantidad
-            
-            if cantidad_vendida > producto_vendido.stock:
+            producto_vendido = form.cleaned_data['producto']
+            cantidad_vendida = form.cleaned_data['cantidad']
+
+            # El descuento es un UPDATE condicional: la base de datos decide si hay stock
+            try:
+                venta = registrar_venta(producto_vendido.pk, cantidad_vendida)
+            except StockInsuficiente as error:
                 messages.error(request, 
-                              f"Error: Stock insuficiente para {producto_vendido.nombre} ({producto_vendido.variacion}). Stock actual: {producto_vendido.stock}.")
+                              f"Error: Stock insuficiente para {error.producto.nombre} ({error.producto.variacion}). Stock actual: {error.producto.stock}.")
                 return redirect('registrar_venta')
-                
-            venta.precio_unitario = producto_vendido.precio 
-            venta.save()
-            producto_vendido.stock -= cantidad_vendida
-            producto_vendido.save()
             
-            messages.success(request, f"Venta registrada con éxito. Se descontaron {cantidad_vendida} unidades de {producto_vendido.nombre}.")
+            messages.success(request, f"Venta registrada con éxito. Se descontaron {cantidad_vendida} unidades de {venta.producto.nombre}.")
             return redirect('dashboard')
     else:
         form = VentaForm()
@@ -168,31 +318,135 @@ def venta_rapida_view(request, pk):
         messages.error(request, "Acceso denegado. Solo personal autorizado puede registrar ventas.")
         return redirect('pagina_compra')
 
-    producto = get_object_or_404(Producto, pk=pk)
-
     if request.method == 'POST':
         cantidad_vendida = 1
-        
-        if producto.stock >= cantidad_vendida:
-            # 1. Crear el registro de venta
-            Venta.objects.create(
-                producto=producto,
-                cantidad=cantidad_vendida,
-                precio_unitario=producto.precio,
-                fecha_venta=date.today()
-            )
-            
-            # 2. Descontar el stock
-            producto.stock -= cantidad_vendida
-            producto.save()
-            
-            messages.success(request, f"Venta rápida de 1 unidad de '{producto.nombre}' registrada. Stock restante: {producto.stock}.")
+
+        # Venta + descuento de stock en una sola transacción (sin leer-comparar-guardar)
+        try:
+            venta = registrar_venta(pk, cantidad_vendida)
+        except Producto.DoesNotExist:
+            raise Http404("Producto no encontrado.")
+        except StockInsuficiente as error:
+            messages.error(request, f"Error: '{error.producto.nombre}' está agotado o tiene stock insuficiente.")
         else:
-            messages.error(request, f"Error: '{producto.nombre}' está agotado o tiene stock insuficiente.")
+            messages.success(request, f"Venta rápida de 1 unidad de '{venta.producto.nombre}' registrada. Stock restante: {venta.producto.stock}.")
+    else:
+        get_object_or_404(Producto, pk=pk)
             
     # Redirige a la página del catálogo después de la acción
     return redirect('pagina_compra')
 
+@login_required
+def producto_buscar_view(request):
+    """
+    Búsqueda JSON para el selector de productos de la caja.
+    Un texto numérico se prueba primero como código de barras o ID exacto;
+    después, búsqueda por prefijo en el índice de texto. Solo productos con stock.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Acceso denegado.'}, status=403)
+
+    texto = request.GET.get('q', '').strip()[:100]
+    disponibles = Producto.objects.filter(stock__gt=0).values(*CAMPOS_AUTOCOMPLETAR)
+
+    resultados = []
+    if texto.isdigit():
+        exacto = Q(codigo_barras=texto)
+        if len(texto) <= 18:  # cabe en un entero de 64 bits
+            exacto |= Q(pk=int(texto))
+        resultados = list(disponibles.filter(exacto)[:LIMITE_AUTOCOMPLETAR])
+
+    if texto and len(resultados) < LIMITE_AUTOCOMPLETAR:
+        vistos = {producto['id'] for producto in resultados}
+        for producto in buscar_productos(disponibles, texto, LIMITE_AUTOCOMPLETAR):
+            if producto['id'] not in vistos and len(resultados) < LIMITE_AUTOCOMPLETAR:
+                resultados.append(producto)
+
+    return JsonResponse({'resultados': resultados})
+
+def _lineas_desde_json(cuerpo):
+    """ Convierte {"lineas": [{"producto": id, "cantidad": n}, ...]} en [(id, n), ...]. """
+    datos = json.loads(cuerpo)
+    return [(entero_json(linea['producto']), entero_json(linea['cantidad'])) for linea in datos['lineas']]
+
+@login_required
+def carrito_view(request):
+    """
+    Registra una canasta de varios productos en una sola transacción.
+    Acepta el formulario HTML o un cuerpo JSON (para las cajas) y responde igual.
+    """
+    es_json = request.content_type == 'application/json'
+    if not request.user.is_staff:
+        if es_json:
+            return JsonResponse({'error': 'Acceso denegado.'}, status=403)
+        return redirect('pagina_compra')
+
+    if request.method == 'POST' and es_json:
+        try:
+            lineas = _lineas_desde_json(request.body)
+            ventas = registrar_carrito(lineas)
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Canasta inválida.'}, status=400)
+        except Producto.DoesNotExist:
+            return JsonResponse({'error': 'Alguno de los productos no existe.'}, status=404)
+        except StockInsuficiente as error:
+            return JsonResponse({
+                'error': 'Stock insuficiente.',
+                'producto': error.producto.pk,
+                'solicitado': error.cantidad,
+                'disponible': error.producto.stock,
+            }, status=409)
+        return JsonResponse({
+            'ventas': [venta.pk for venta in ventas],
+            'total': sum(venta.total_venta for venta in ventas),
+        }, status=201)
+
+    if request.method == 'POST':
+        formset = CarritoFormSet(request.POST)
+        if formset.is_valid():
+            lineas = [
+                (form.cleaned_data['producto'].pk, form.cleaned_data['cantidad'])
+                for form in formset if form.cleaned_data
+            ]
+            try:
+                ventas = registrar_carrito(lineas)
+            except StockInsuficiente as error:
+                messages.error(request,
+                              f"Canasta rechazada: stock insuficiente para {error.producto.nombre} ({error.producto.variacion}). Stock actual: {error.producto.stock}.")
+            else:
+                total = sum(venta.total_venta for venta in ventas)
+                messages.success(request, f"Canasta registrada: {len(ventas)} líneas por un total de ${total:,.0f}.")
+                return redirect('dashboard')
+    else:
+        formset = CarritoFormSet()
+
+    return render(request, 'inventario/carrito.html', {'formset': formset})
+
+@login_required
+def sincronizar_ventas_view(request):
+    """
+    Recibe en lote las ventas que una caja registró sin conexión:
+    {"terminal": "...", "lineas": [{"clave", "producto", "cantidad", "fecha"}, ...]}.
+    Responde el resultado de cada línea; reenviar el mismo lote es seguro.
+    Con GET (?clave=...&clave=...) la caja consulta qué claves ya están registradas.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Acceso denegado.'}, status=403)
+
+    if request.method != 'POST':
+        claves = request.GET.getlist('clave')[:LIMITE_SINCRONIZACION]
+        return JsonResponse({'registradas': claves_registradas(claves)})
+
+    try:
+        datos = json.loads(request.body)
+        resultados = sincronizar_ventas(datos['lineas'], terminal=str(datos.get('terminal', ''))[:50])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'error': f'Lote inválido (hasta {LIMITE_SINCRONIZACION} líneas).'}, status=400)
+    except LoteEnConflicto:
+        # No se escribió nada: el reintento es seguro gracias a las claves
+        return JsonResponse({'error': 'El stock cambió durante la sincronización; reintenta.'}, status=409)
+    return JsonResponse({'resultados': resultados})
+
 # =======================================================
 # --- VISTAS DE CATEGORÍA ---
 # =======================================================
@@ -248,29 +502,171 @@ def categoria_eliminar_view(request, pk):
     return render(request, 'inventario/categoria_confirm_delete.html', {'categoria': categoria})
 
 @login_required
-def reporte_ventas_view(request):
-    """ Vista de Reporte de Ventas. """
+@lectura_en_replica
+def reporte_valoracion_view(request):
+    """ Valoración del inventario por categoría, leída de los contadores de Categoria. """
     if not request.user.is_staff:
         return redirect('pagina_compra')
-        
-    ventas = Venta.objects.all().order_by('-fecha_venta')
-    
-    # Cálculo del total vendido (eficiente)
-    total_vendido = Venta.objects.aggregate(
-        total_sum=Sum(F('cantidad') * F('precio_unitario'), output_field=DecimalField())
-    )['total_sum'] or 0
 
-    ventas_agrupadas = Venta.objects.values(
+    filas, totales = valoracion_inventario()
+    for fila in filas:
+        fila['porcentaje'] = fila['valor_stock'] * 100 / totales['valor_stock'] if totales['valor_stock'] else 0
+    return render(request, 'inventario/reporte_valoracion.html', {'filas': filas, 'totales': totales})
+
+def _filtro_fechas(request):
+    """ Devuelve (form, desde, hasta) a partir de ?desde=&hasta= (fechas vacías si no son válidas). """
+    form = FiltroReporteForm(request.GET or None)
+    if form.is_bound and form.is_valid():
+        return form, form.cleaned_data['desde'], form.cleaned_data['hasta']
+    return form, None, None
+
+@login_requerido_async
+@lectura_en_replica
+async def reporte_ventas_view(request):
+    """
+    Vista de Reporte de Ventas, filtrable por fechas y con historial paginado.
+    """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+
+    form, desde, hasta = _filtro_fechas(request)
+
+    # Totales y agrupación desde el resumen diario, no desde toda la tabla Venta
+    resumen = VentaDiaria.objects.all()
+    if desde:
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta:
+        resumen = resumen.filter(fecha__lte=hasta)
+
+    # Historial paginado por cursor (fecha, id) descendente, sobre ventas activas y archivadas
+    ventas = await apaginar_keyset(
+        [ventas.select_related('producto') for ventas in ventas_en_rango(desde, hasta)],
+        ('-fecha_venta', '-id'),
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        tamano=VENTAS_POR_PAGINA,
+    )
+    totales = await resumen.aaggregate(
+        total_sum=Sum('ingresos'),
+        total_transacciones=Sum('transacciones'),
+    )
+    ventas_agrupadas = await _en_lista(resumen.values(
         'producto__nombre', 
         'producto__variacion'
     ).annotate(
-        total_cantidad_vendida=Sum('cantidad')
-    ).order_by('-total_cantidad_vendida')
+        total_cantidad_vendida=Sum('unidades')
+    ).order_by('-total_cantidad_vendida'))
+    total_vendido = totales['total_sum'] or 0
+
+    filtros = {clave: valor.isoformat() for clave, valor in (('desde', desde), ('hasta', hasta)) if valor}
     
     context = {
+        'form': form,
         'ventas': ventas,
         'total_general_vendido': total_vendido,
         'ventas_agrupadas': ventas_agrupadas,
-        'cantidad_transacciones': ventas.count()
+        'cantidad_transacciones': totales['total_transacciones'] or 0,
+        'filtros': urlencode(filtros),
     }
-    return render(request, 'inventario/reporte_ventas.html', context)
\ No newline at end of file
+    return render(request, 'inventario/reporte_ventas.html', context)
+
+@login_required
+@lectura_en_replica
+def reporte_ventas_exportar_view(request, formato):
+    """ Exporta en streaming (CSV o XLSX) todas las ventas del rango, con memoria constante. """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+    if formato not in ('csv', 'xlsx'):
+        raise Http404("Formato de exportación no soportado.")
+
+    _, desde, hasta = _filtro_fechas(request)
+    # Un rango grande ocuparía este worker durante minutos: se genera como tarea
+    maximo = getattr(settings, 'EXPORTACION_MAXIMA_EN_LINEA', 50000)
+    if request.GET.get('segundo_plano') or ventas_estimadas(desde, hasta) > maximo:
+        nueva = encolar(
+            'exportar_ventas', usuario=request.user, formato=formato,
+            desde=desde and desde.isoformat(), hasta=hasta and hasta.isoformat(),
+        )
+        return redirect('tarea_estado', pk=nueva.pk)
+
+    # El cuerpo se genera después de retornar: la base de lectura se fija ya
+    filas = filas_ventas(desde, hasta, alias=alias_lectura())
+    encabezados = ENCABEZADOS_VENTAS
+    nombre = f"ventas_{desde or 'inicio'}_{hasta or 'hoy'}.{formato}"
+
+    if formato == 'csv':
+        return respuesta_csv(encabezados, filas, nombre)
+    return respuesta_xlsx(encabezados, filas, nombre, hoja='Ventas')
+
+# =======================================================
+# --- TAREAS EN SEGUNDO PLANO ---
+# =======================================================
+
+@login_required
+def tarea_estado_view(request, pk):
+    """
+    Estado de una tarea en segundo plano. La página se recarga sola mientras la
+    tarea sigue activa; con ?formato=json responde el estado para consultarlo desde JS o una caja.
+    """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+
+    tarea = get_object_or_404(Tarea, pk=pk)
+    descarga = reverse('tarea_descargar', args=[tarea.pk]) if tarea.estado == Tarea.TERMINADA and tarea.resultado else None
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'id': tarea.pk,
+            'tipo': tarea.tipo,
+            'estado': tarea.estado,
+            'progreso': tarea.progreso,
+            'mensaje': tarea.mensaje,
+            'intentos': tarea.intentos,
+            'descarga': descarga,
+        })
+    return render(request, 'inventario/tarea_estado.html', {'tarea': tarea, 'descarga': descarga})
+
+@login_required
+def tarea_descargar_view(request, pk):
+    """ Descarga el archivo generado por una tarea terminada (si aún no está, vuelve a su estado). """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+
+    tarea = get_object_or_404(Tarea, pk=pk)
+    ruta = ruta_resultado(tarea)
+    if tarea.estado != Tarea.TERMINADA or ruta is None or not ruta.exists():
+        return redirect('tarea_estado', pk=pk)
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=ruta.name)
+
+# =======================================================
+# --- PERFILES DE PETICIONES (inventario.perfiles) ---
+# =======================================================
+
+@login_required
+def perfil_list_view(request):
+    """ Perfiles guardados (pedir cualquier página con ?perfilar=1 crea uno nuevo). """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+    return render(request, 'inventario/perfil_list.html', {'perfiles': listar_perfiles()})
+
+@login_required
+def perfil_detalle_view(request, nombre):
+    """ Funciones con más tiempo acumulado y log SQL de un perfil, con su .prof para descargar. """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+    try:
+        perfil = leer_perfil(nombre)
+        funciones = resumen_funciones(nombre)
+    except FileNotFoundError:
+        raise Http404("El perfil no existe o ya se purgó.")
+    return render(request, 'inventario/perfil_detalle.html', {'perfil': perfil, 'funciones': funciones})
+
+@login_required
+def perfil_descargar_view(request, nombre):
+    """ Descarga el .prof (pstats) para verlo como flame graph en snakeviz o speedscope. """
+    if not request.user.is_staff:
+        return redirect('pagina_compra')
+    try:
+        ruta = ruta_perfil(nombre, 'prof')
+    except FileNotFoundError:
+        raise Http404("El perfil no existe o ya se purgó.")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=ruta.name)
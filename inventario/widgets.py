@@ -0,0 +1,31 @@
+"""
+Widgets de formulario del inventario.
+"""
+from django import forms
+from django.urls import reverse_lazy
+
+
+class ProductoAutocompleteWidget(forms.Widget):
+    """
+    Selector de producto que consulta `producto_buscar` mientras se escribe,
+    en lugar de un <select> con todo el catálogo. El valor enviado sigue siendo
+    el id del producto (campo oculto), así que el ModelChoiceField valida igual;
+    al renderizar solo se consulta el producto ya elegido, si lo hay.
+    """
+    template_name = 'inventario/widgets/producto_autocomplete.html'
+    url = reverse_lazy('producto_buscar')
+
+    class Media:
+        js = ('inventario/producto_autocomplete.js',)
+
+    def get_context(self, name, value, attrs):
+        from .models import Producto
+
+        context = super().get_context(name, value, attrs)
+        etiqueta = ''
+        if value not in (None, ''):
+            elegido = Producto.objects.filter(pk=value).values('nombre', 'variacion').first() if str(value).isdigit() else None
+            if elegido:
+                etiqueta = f"{elegido['nombre']} ({elegido['variacion']})" if elegido['variacion'] else elegido['nombre']
+        context['widget'].update({'etiqueta': etiqueta, 'url': str(self.url)})
+        return context
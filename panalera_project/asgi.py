@@ -3,6 +3,11 @@ ASGI config for panalera_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Es el punto de entrada recomendado en producción (p. ej.
+``uvicorn panalera_project.asgi:application``): las vistas async del
+catálogo, el dashboard y los reportes solo liberan el hilo mientras esperan
+a la base de datos cuando se sirven por ASGI. Ver README, sección 4.2.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
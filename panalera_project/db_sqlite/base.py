@@ -0,0 +1,55 @@
+"""
+Backend SQLite para producción.
+
+Igual que django.db.backends.sqlite3, con dos opciones más en OPTIONS:
+
+- 'pragmas': diccionario {pragma: valor} que se aplica a cada conexión nueva
+  (journal_mode=WAL, busy_timeout, synchronous=NORMAL, mmap_size, cache_size...).
+- 'transaction_mode': 'DEFERRED' (lo de siempre), 'IMMEDIATE' o 'EXCLUSIVE'.
+  Con IMMEDIATE cada transaction.atomic() toma el bloqueo de escritura al
+  empezar: si otra conexión está escribiendo, espera (busy_timeout) en lugar
+  de fallar con "database is locked" al intentar pasar de lectura a escritura.
+
+En modo WAL los lectores no bloquean a los escritores ni al revés, así que el
+catálogo y los reportes no frenan las ventas. Ver la sección BASE DE DATOS de
+settings.py y el comando `benchmark_sqlite`.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+MODOS_TRANSACCION = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+_VALOR_SEGURO = re.compile(r'^-?[\w.]+$')
+
+
+def aplicar_pragmas(conexion, pragmas):
+    """ Ejecuta PRAGMA nombre = valor sobre una conexión sqlite3 abierta. """
+    for nombre, valor in pragmas.items():
+        # Los valores vienen de variables de entorno: solo identificadores y números
+        if not _VALOR_SEGURO.match(str(nombre)) or not _VALOR_SEGURO.match(str(valor)):
+            raise ImproperlyConfigured(f"PRAGMA inválido: {nombre} = {valor!r}")
+        conexion.execute(f'PRAGMA {nombre} = {valor}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Opciones propias: no se le pasan a sqlite3.connect()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in MODOS_TRANSACCION:
+            raise ImproperlyConfigured(
+                f"transaction_mode debe ser uno de {', '.join(MODOS_TRANSACCION)}, no {self.transaction_mode!r}."
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        conexion = super().get_new_connection(conn_params)
+        aplicar_pragmas(conexion, self.pragmas)
+        return conexion
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,148 @@
+"""
+Benchmark de concurrencia de escritura en SQLite: configuración por defecto
+de Django ("antes") frente al perfil de producción de settings ("después").
+
+Trabaja con sqlite3 directamente sobre un archivo temporal (nunca sobre la
+base real) y aplica los PRAGMA con la misma función que el backend. Cada hilo
+escritor alterna dos formas de transacción del inventario:
+- venta: UPDATE condicional del stock + INSERT de la venta (escribe primero).
+- ajuste: lee el producto y luego lo actualiza (como la importación o el
+  admin). Con BEGIN diferido, dos ajustes a la vez terminan en
+  "database is locked" sin esperar: SQLite no puede pasar ambos a escritura.
+Hilos lectores consultan a la vez, como el catálogo y los reportes.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .base import aplicar_pragmas
+
+ANTES = {
+    'descripcion': "Django por defecto: journal DELETE, synchronous FULL, BEGIN diferido",
+    'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'transaction_mode': 'DEFERRED',
+}
+
+PRODUCTOS = 1000
+
+
+def _preparar(ruta):
+    conexion = sqlite3.connect(ruta, isolation_level=None)
+    conexion.executescript("""
+        CREATE TABLE producto (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL, stock INTEGER NOT NULL, precio INTEGER NOT NULL);
+        CREATE TABLE venta (
+            id INTEGER PRIMARY KEY, producto_id INTEGER NOT NULL REFERENCES producto(id),
+            cantidad INTEGER NOT NULL, precio_unitario INTEGER NOT NULL, fecha TEXT NOT NULL
+        );
+        CREATE INDEX venta_producto ON venta(producto_id);
+        CREATE INDEX producto_nombre ON producto(nombre, id);
+    """)
+    conexion.executemany(
+        "INSERT INTO producto (id, nombre, stock, precio) VALUES (?, ?, ?, ?)",
+        [(i, f"Producto {i:05d}", 10**9, 1000 + i) for i in range(1, PRODUCTOS + 1)],
+    )
+    conexion.close()
+
+
+def _conectar(ruta, perfil):
+    # isolation_level=None: autocommit, las transacciones se abren a mano (como hace Django)
+    conexion = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False)
+    conexion.execute("PRAGMA foreign_keys = ON")
+    aplicar_pragmas(conexion, perfil['pragmas'])
+    return conexion
+
+
+def _venta(conexion, azar, modo):
+    producto_id = azar.randint(1, PRODUCTOS)
+    conexion.execute(f"BEGIN {modo}")
+    try:
+        conexion.execute("UPDATE producto SET stock = stock - 1 WHERE id = ? AND stock >= 1", (producto_id,))
+        precio = conexion.execute("SELECT precio FROM producto WHERE id = ?", (producto_id,)).fetchone()[0]
+        conexion.execute(
+            "INSERT INTO venta (producto_id, cantidad, precio_unitario, fecha) VALUES (?, 1, ?, date('now'))",
+            (producto_id, precio),
+        )
+        conexion.execute("COMMIT")
+    except BaseException:
+        conexion.execute("ROLLBACK")
+        raise
+
+
+def _ajuste(conexion, azar, modo):
+    producto_id = azar.randint(1, PRODUCTOS)
+    conexion.execute(f"BEGIN {modo}")
+    try:
+        stock = conexion.execute("SELECT stock FROM producto WHERE id = ?", (producto_id,)).fetchone()[0]
+        conexion.execute("UPDATE producto SET stock = ? WHERE id = ?", (stock + 1, producto_id))
+        conexion.execute("COMMIT")
+    except BaseException:
+        conexion.execute("ROLLBACK")
+        raise
+
+
+def _lectura(conexion, azar):
+    desde = f"Producto {azar.randint(1, PRODUCTOS):05d}"
+    conexion.execute("SELECT id, nombre, stock FROM producto WHERE nombre > ? ORDER BY nombre, id LIMIT 24", (desde,)).fetchall()
+    conexion.execute(
+        "SELECT count(*), sum(cantidad * precio_unitario) FROM venta WHERE producto_id = ?", (azar.randint(1, PRODUCTOS),)
+    ).fetchone()
+
+
+def medir(perfil, escritores=8, lectores=4, duracion=5.0, semilla=42, directorio=None):
+    """ Corre la carga con un perfil {'pragmas', 'transaction_mode'} y devuelve los contadores. """
+    with tempfile.TemporaryDirectory(dir=directorio) as carpeta:
+        ruta = os.path.join(carpeta, 'benchmark.sqlite3')
+        _preparar(ruta)
+        # El modo WAL se guarda en el archivo: se fija una vez antes de abrir los hilos
+        _conectar(ruta, perfil).close()
+
+        contadores = {'escrituras': 0, 'bloqueos': 0, 'lecturas': 0, 'lecturas_bloqueadas': 0}
+        candado = threading.Lock()
+        fin = time.perf_counter() + duracion
+        modo = perfil['transaction_mode']
+
+        def escribir(numero):
+            azar = random.Random(semilla + numero)
+            conexion = _conectar(ruta, perfil)
+            hechas = bloqueadas = 0
+            while time.perf_counter() < fin:
+                try:
+                    (_ajuste if azar.random() < 0.2 else _venta)(conexion, azar, modo)
+                    hechas += 1
+                except sqlite3.OperationalError:
+                    bloqueadas += 1
+            conexion.close()
+            with candado:
+                contadores['escrituras'] += hechas
+                contadores['bloqueos'] += bloqueadas
+
+        def leer(numero):
+            azar = random.Random(semilla + 1000 + numero)
+            conexion = _conectar(ruta, perfil)
+            hechas = bloqueadas = 0
+            while time.perf_counter() < fin:
+                try:
+                    _lectura(conexion, azar)
+                    hechas += 1
+                except sqlite3.OperationalError:
+                    bloqueadas += 1
+            conexion.close()
+            with candado:
+                contadores['lecturas'] += hechas
+                contadores['lecturas_bloqueadas'] += bloqueadas
+
+        hilos = [threading.Thread(target=escribir, args=(n,)) for n in range(escritores)]
+        hilos += [threading.Thread(target=leer, args=(n,)) for n in range(lectores)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        transcurrido = time.perf_counter() - inicio
+
+    contadores['escrituras_por_s'] = round(contadores['escrituras'] / transcurrido, 1)
+    contadores['lecturas_por_s'] = round(contadores['lecturas'] / transcurrido, 1)
+    return contadores
@@ -0,0 +1,28 @@
+"""
+Sustituto local de la replicación: copia la base primaria sobre el archivo
+de la réplica con la API de backup de SQLite (copia consistente aunque haya
+ventas en curso; en modo WAL no frena a los escritores).
+
+La copia se hace en el mismo archivo y no con un renombrado: las conexiones
+persistentes de la réplica siguen abiertas sobre ese archivo y verían para
+siempre el archivo viejo si se reemplazara.
+"""
+import sqlite3
+import time
+
+
+def copiar_base(origen, destino, paginas=-1, espera_ms=5000):
+    """
+    Copia `origen` sobre `destino`. `paginas` por paso (-1: todo de una vez;
+    con pasos pequeños los lectores de la réplica esperan menos cada vez).
+    Devuelve los segundos que tardó.
+    """
+    inicio = time.monotonic()
+    fuente = sqlite3.connect(str(origen), timeout=espera_ms / 1000)
+    objetivo = sqlite3.connect(str(destino), timeout=espera_ms / 1000)
+    try:
+        fuente.backup(objetivo, pages=paginas)
+    finally:
+        objetivo.close()
+        fuente.close()
+    return time.monotonic() - inicio
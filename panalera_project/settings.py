@@ -59,6 +59,14 @@ INSTALLED_APPS = [
 # ============================
 
 MIDDLEWARE = [
+    # Primero, para que su tiempo total cubra a todos los demás (se desactiva solo si METRICAS_SQL es False)
+    'inventario.metricas.MetricasSQLMiddleware',
+    # GZip de HTML/JSON/CSV (no de imágenes ni del flujo SSE del dashboard)
+    'inventario.cache_http.CompresionMiddleware',
+    # ETag y 304 para las respuestas que no traen validadores propios
+    'django.middleware.http.ConditionalGetMiddleware',
+    # Tras una escritura, el cliente lee de la primaria un rato (réplica de lectura)
+    'inventario.routers.LecturaPropiaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +74,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Al final (necesita request.user): perfila las peticiones de staff con ?perfilar=1
+    'inventario.perfiles.PerfiladoMiddleware',
 ]
 
 
@@ -78,7 +88,9 @@ ROOT_URLCONF = 'panalera_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + tiempo de render para las métricas por petición
+        'BACKEND': 'inventario.metricas.DjangoTemplatesMedidas',
+        'NAME': 'django',
         'DIRS': [],     
         'APP_DIRS': True,
         'OPTIONS': {
@@ -100,14 +112,127 @@ WSGI_APPLICATION = 'panalera_project.wsgi.application'
 # BASE DE DATOS
 # ============================
 
+# Perfil de producción de SQLite (panalera_project/db_sqlite): WAL, espera ante
+# bloqueos, BEGIN IMMEDIATE para escrituras y conexiones persistentes.
+# Cada ajuste se puede cambiar con variables de entorno.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'panalera_project.db_sqlite',
+        'NAME': os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+        # Segundos que se reutiliza una conexión entre peticiones (0 = una por petición)
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {
+            # DEFERRED, IMMEDIATE o EXCLUSIVE
+            'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            'pragmas': {
+                # WAL: lectores y escritor no se bloquean entre sí
+                'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+                # Milisegundos que una conexión espera un bloqueo antes de "database is locked"
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+                # NORMAL es seguro con WAL (un corte de luz puede perder la última transacción, no corromper)
+                'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+                # Bytes de la base mapeados en memoria (0 lo desactiva)
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+                # Negativo = KiB de caché de páginas por conexión
+                'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-65536')),
+                'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+            },
+        },
     }
 }
 
 
+# Réplica de lectura opcional (inventario.routers): reportes, catálogo, dashboard y
+# API leen de ella. En local es otra copia SQLite que se actualiza con
+# `manage.py sincronizar_replica --intervalo 5`.
+SQLITE_REPLICA_PATH = os.getenv('SQLITE_REPLICA_PATH', '')
+
+if SQLITE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': SQLITE_REPLICA_PATH,
+        'OPTIONS': {
+            'transaction_mode': 'DEFERRED',
+            # query_only: cualquier escritura por esta conexión falla
+            'pragmas': {**DATABASES['default']['OPTIONS']['pragmas'], 'query_only': 'ON'},
+        },
+        # En las pruebas la réplica es la misma base de datos de prueba
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['inventario.routers.ReplicaRouter']
+
+# Segundos que un cliente que acaba de escribir sigue leyendo de la primaria
+# (debe cubrir el atraso máximo de la réplica)
+REPLICA_RETRASO_SEGUNDOS = int(os.getenv('REPLICA_RETRASO_SEGUNDOS', '30'))
+
+# Meses (incluido el actual) que se quedan en la tabla Venta; lo anterior lo
+# mueve a VentaArchivada `manage.py archivar_ventas`
+VENTAS_MESES_ACTIVOS = int(os.getenv('VENTAS_MESES_ACTIVOS', '12'))
+
+
+# ============================
+# CACHÉ (KPIs del dashboard)
+# ============================
+
+# CACHE_BACKEND: 'locmem' (por defecto, en memoria del proceso) o 'file' (compartida entre procesos)
+cache_backend = os.getenv('CACHE_BACKEND', 'locmem')
+
+if cache_backend == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'panalera',
+        }
+    }
+
+# Segundos que un cálculo de KPIs puede servirse sin cambios
+KPIS_CACHE_TIMEOUT = int(os.getenv('KPIS_CACHE_TIMEOUT', '300'))
+
+# Segundos que dura cada conexión SSE del dashboard antes de que el navegador reconecte
+EVENTOS_DURACION_SEGUNDOS = int(os.getenv('EVENTOS_DURACION_SEGUNDOS', '300'))
+
+
+# ============================
+# MÉTRICAS POR PETICIÓN Y LOGS
+# ============================
+
+# Cuenta consultas SQL y tiempos por petición (cabecera Server-Timing y log JSON).
+# Activado por defecto en desarrollo (DEBUG).
+METRICAS_SQL = os.getenv('METRICAS_SQL', str(DEBUG)) == 'True'
+
+# Repeticiones de una misma SQL en una petición que se registran como posible N+1
+METRICAS_SQL_UMBRAL_REPETIDAS = int(os.getenv('METRICAS_SQL_UMBRAL_REPETIDAS', '5'))
+
+# Perfilado a pedido (?perfilar=1, solo staff): sin la marca no cuesta nada.
+# PERFILES=False quita el middleware; se guardan los PERFILES_MAXIMO más recientes.
+PERFILES = os.getenv('PERFILES', 'True') == 'True'
+PERFILES_DIR = Path(os.getenv('PERFILES_DIR', str(BASE_DIR / 'perfiles')))
+PERFILES_MAXIMO = int(os.getenv('PERFILES_MAXIMO', '50'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'inventario': {
+            'handlers': ['consola'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+
 # ============================
 # VALIDACIONES DE CONTRASEÑA
 # ============================
@@ -153,6 +278,31 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Quién envía los bytes de media (inventario.cache_http.servir_media):
+# 'django' (la propia app, con Range), 'x-accel' (nginx) o 'x-sendfile' (Apache/lighttpd)
+MEDIA_ENTREGA = os.getenv('MEDIA_ENTREGA', 'django')
+# Location `internal` de nginx que apunta a MEDIA_ROOT (solo con MEDIA_ENTREGA='x-accel')
+MEDIA_ACCEL_PREFIJO = os.getenv('MEDIA_ACCEL_PREFIJO', '/media-interna/')
+
+# Segundos que navegadores y CDN guardan el catálogo público (anónimo) sin revalidar
+CATALOGO_MAX_AGE = int(os.getenv('CATALOGO_MAX_AGE', '60'))
+
+
+# ============================
+# TAREAS EN SEGUNDO PLANO (inventario.tareas)
+# ============================
+
+# Archivos generados por las tareas (exportaciones) y archivos subidos a la espera de importarse
+TAREAS_DIR = Path(os.getenv('TAREAS_DIR', str(BASE_DIR / 'tareas')))
+
+# True en producción, con `manage.py procesar_tareas` corriendo aparte; si no,
+# el propio proceso web ejecuta las tareas en TAREAS_HILOS hilos
+TAREAS_TRABAJADOR_EXTERNO = os.getenv('TAREAS_TRABAJADOR_EXTERNO', 'False') == 'True'
+TAREAS_HILOS = int(os.getenv('TAREAS_HILOS', '2'))
+
+# Exportaciones de más ventas que esto se generan como tarea en lugar de en la petición
+EXPORTACION_MAXIMA_EN_LINEA = int(os.getenv('EXPORTACION_MAXIMA_EN_LINEA', '50000'))
+
 
 # ============================
 # CONFIGURACIÓN POR DEFECTO
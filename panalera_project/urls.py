@@ -1,8 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include 
+from django.urls import path, include, re_path
 from django.views.generic import RedirectView
 from django.conf import settings
-from django.conf.urls.static import static
+from inventario.cache_http import servir_media
 
 # Las importaciones necesarias están aquí arriba. No se necesita importar nada más.
 
@@ -21,6 +21,8 @@ urlpatterns = [
     path('', include('inventario.urls')), 
 ]
 
-# CÓDIGO CRÍTICO para servir archivos media (imágenes) en modo DEBUG
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Archivos media (imágenes) con caché inmutable y Range, también en producción;
+# con MEDIA_ENTREGA='x-accel' o 'x-sendfile' los bytes los envía el proxy
+urlpatterns += [
+    re_path(r'^%s(?P<ruta>.+)$' % settings.MEDIA_URL.lstrip('/'), servir_media, name='media'),
+]
\ No newline at end of file